@@ -0,0 +1,88 @@
+"""
+Compare decoding numeric arrays posted to `jsrope.flask.ajax_handler`.
+
+"loop" declares nothing and converts the list of strings in the view, "arrays" declares the field
+(`arrays={"xs": Int}`), and "packed" sends it as one base64 string (`Ajax(..., packed={"xs": "int32"})`).
+For each of `--sizes`, reports bytes of the body and the time to parse the form, decode and convert
+(best of `--repeat`).
+
+    python benchmarks/bench_arrays.py --sizes 1000 10000 100000 1000000
+"""
+
+import argparse
+import base64
+import os
+import random
+import sys
+import time
+from urllib.parse import urlencode
+
+import flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jsrope.flask
+from jsrope import Ajax, Array, Int
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def app_for(case):
+    app = flask.Flask(__name__)
+    if case == "packed":
+        ajax = Ajax("/data", {"method": "POST", "data": {"xs": Array()}}, packed={"xs": "int32"})
+        options = {}
+    else:
+        ajax = Ajax("/data", {"method": "POST", "data": {"xs": Array()}})
+        options = {"arrays": {"xs": Int}} if case == "arrays" else {}
+
+    @app.route("/data", methods=["POST"])
+    @jsrope.flask.ajax_handler(ajax, **options)
+    def data(ajax_data):
+        xs = ajax_data["xs"]
+        if case == "loop":
+            xs = [int(x) for x in xs]
+        return xs
+
+    return app
+
+
+def body(case, values):
+    if case == "packed":
+        packed = numpy.array(values, dtype="<i4").tobytes() if numpy else b"".join(
+            x.to_bytes(4, "little", signed=True) for x in values)
+        return urlencode({"xs": base64.b64encode(packed).decode()})
+    return urlencode([("xs[]", x) for x in values])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each case")
+    args = parser.parse_args()
+
+    print("NumPy {}".format(numpy.__version__ if numpy else "is not installed (array.array)"))
+    print("{:>9} {:<8} {:>12} {:>12}".format("size", "case", "body bytes", "decode ms"))
+    rng = random.Random(0)
+    for size in args.sizes:
+        values = [rng.randint(-2 ** 31, 2 ** 31 - 1) for _ in range(size)]
+        for case in ("loop", "arrays", "packed"):
+            app = app_for(case)
+            data = body(case, values)
+            best = None
+            for _ in range(args.repeat):
+                with app.test_request_context("/data", method="POST", data=data,
+                                              content_type="application/x-www-form-urlencoded"):
+                    start = time.perf_counter()
+                    result = app.view_functions["data"]()
+                    elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            assert list(result) == values
+            print("{:>9} {:<8} {:>12} {:>12.1f}".format(size, case, len(data), best * 1000))
+
+
+if __name__ == "__main__":
+    main()
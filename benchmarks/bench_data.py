@@ -0,0 +1,77 @@
+"""
+Compare embedding data with `jsrope.Data` against `jsrope.util.escape` (object literal).
+
+For payloads of `--sizes` rows, reports Python encode time (best of `--repeat`) and bytes of the code, and with
+node, the time the engine takes to compile and run the code (best of `--repeat`).
+
+    python benchmarks/bench_data.py --sizes 10 1000 100000
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jsrope import Data
+from jsrope.util import escape
+
+# compiles and runs each code `repeat` times and prints the best milliseconds
+PARSE = """
+var codes = JSON.parse(require("fs").readFileSync(0, "utf8")), repeat = %d, result = [];
+codes.forEach(function (code) {
+    var best = Infinity;
+    for (var i = 0; i < repeat; i++) {
+        var start = process.hrtime.bigint();
+        new Function("return " + code)();
+        best = Math.min(best, Number(process.hrtime.bigint() - start) / 1e6);
+    }
+    result.push(best);
+});
+console.log(JSON.stringify(result));
+"""
+
+
+def payload(rows):
+    # no bool or None, which `escape` writes as Python
+    return {"rows": [{"id": i, "name": "user {}".format(i), "score": i * 0.5, "tags": ["a", "b"], "active": i % 2}
+                     for i in range(rows)]}
+
+
+def best(f, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        code = f()
+        times.append(time.perf_counter() - start)
+    return min(times), str(code)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000], help="rows of payloads")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each case")
+    args = parser.parse_args()
+    has_node = shutil.which("node") is not None
+
+    cases = [("escape", escape), ("Data", Data)]
+    print("{:>8} {:<8} {:>10} {:>12} {:>10}".format("rows", "case", "encode ms", "bytes", "parse ms"))
+    for rows in args.sizes:
+        obj = payload(rows)
+        results = [(name,) + best(lambda: f(obj), args.repeat) for name, f in cases]
+        if has_node:
+            out = subprocess.run(["node", "-e", PARSE % args.repeat], input=json.dumps([x[2] for x in results]),
+                                 capture_output=True, text=True, check=True).stdout
+            parse = ["{:.2f}".format(x) for x in json.loads(out)]
+        else:
+            parse = ["-"] * len(results)
+        for (name, elapsed, code), parsed in zip(results, parse):
+            print("{:>8} {:<8} {:>10.2f} {:>12} {:>10}".format(rows, name, elapsed * 1000, len(code.encode()), parsed))
+
+
+if __name__ == "__main__":
+    main()
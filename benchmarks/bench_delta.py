@@ -0,0 +1,102 @@
+"""
+Compare bytes on the wire of `Ajax(..., delta=True)` with sending the whole form.
+
+A form of `--fields` fields of `--size` characters is sent after each of `--edits` edits of one field. The generated
+client runs in node, and each request body is posted to a Flask app with `jsrope.flask.ajax_handler`, which checks
+that the view gets the whole form.
+
+    python benchmarks/bench_delta.py --fields 20 --size 40 --edits 200
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+from urllib.parse import urlencode
+
+import flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jsrope import Ajax, Object, Str
+from jsrope.flask import ajax_handler
+
+STUB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "jquery_stub.js")
+
+
+def _requests(ajax, fields, size, edits, seed):
+    """
+    Return data of the requests the client sends, running it with node
+    """
+    with open(STUB) as f:
+        stub = f.read()
+    form = {name: "x" * size for name in fields}
+    script = ("var form = {form}, edits = {edits};function send(){{{ajax}}}"
+              "send();requests[0].resolve('ok');"
+              "edits.forEach(function (e, i) {{ form[e[0]] = e[1];send();requests[i + 1].resolve('ok'); }});"
+              "console.log(JSON.stringify(requests.map(function (r) {{ return r.options.data; }})));")
+    rng = random.Random(seed)
+    changes = [[rng.choice(fields), "".join(rng.choice("abcdef") for _ in range(size))] for _ in range(edits)]
+    script = stub + script.format(form=json.dumps(form), edits=json.dumps(changes), ajax=ajax)
+    out = subprocess.run(["node", "-e", script], capture_output=True, text=True, check=True).stdout
+    return json.loads(out), form, changes
+
+
+def _body(data):
+    # the way jQuery.param encodes arrays
+    pairs = []
+    for k, v in data.items():
+        if isinstance(v, list):
+            pairs.extend((k + "[]", x) for x in v)
+        else:
+            pairs.append((k, v))
+    return urlencode(pairs)
+
+
+def run(delta, fields, size, edits, seed):
+    ajax = Ajax("/save", {"method": "POST", "data": {name: Object("form." + name) for name in fields}}, delta=delta)
+    app = flask.Flask(__name__)
+    seen = []
+
+    @app.route("/save", methods=["POST"])
+    @ajax_handler(Ajax("/save", {"method": "POST", "data": {name: Str(name) for name in fields}}, delta=delta))
+    def save(ajax_data):
+        seen.append(ajax_data)
+        return "ok"
+
+    sent, form, changes = _requests(ajax, fields, size, edits, seed)
+    client = app.test_client()
+    total = 0
+    for data in sent:
+        body = _body(data)
+        total += len(body.encode())
+        assert client.post("/save", data=body, content_type="application/x-www-form-urlencoded").status_code == 200
+    expected = dict(form)
+    for name, value in changes:
+        expected[name] = value
+    assert seen[-1] == expected
+    return len(sent), total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fields", type=int, default=20, help="fields in the form")
+    parser.add_argument("--size", type=int, default=40, help="characters of each field")
+    parser.add_argument("--edits", type=int, default=200, help="edits of one field, each followed by a request")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if shutil.which("node") is None:
+        sys.exit("node is required to run the generated client")
+
+    fields = ["field{}".format(i) for i in range(args.fields)]
+    print("{:<8} {:>9} {:>12} {:>16}".format("mode", "requests", "body bytes", "bytes / request"))
+    for name, delta in (("full", False), ("delta", True)):
+        count, total = run(delta, fields, args.size, args.edits, args.seed)
+        print("{:<8} {:>9} {:>12} {:>16.1f}".format(name, count, total, total / count))
+
+
+if __name__ == "__main__":
+    main()
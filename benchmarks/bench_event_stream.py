@@ -0,0 +1,156 @@
+"""
+Compare `jsrope.flask.event_stream` with polling for pushing updates to a client.
+
+The server makes an update every `--interval` seconds. The SSE client keeps one stream open, and the polling client
+asks the latest update every `--poll` seconds. Reports requests, bytes received, updates seen and delivery latency.
+
+    python benchmarks/bench_event_stream.py --interval 0.05 --poll 0.5 --duration 5
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+import flask
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jsrope.flask import event_stream, no_event
+from jsrope.metrics import percentiles
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class Updates:
+    def __init__(self):
+        self.items = []
+        self.condition = threading.Condition()
+        self.running = True
+
+    def run(self, interval, duration):
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            time.sleep(interval)
+            with self.condition:
+                self.items.append({"seq": len(self.items), "t": time.perf_counter(), "value": "x" * 40})
+                self.condition.notify_all()
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def follow(self):
+        seen = 0
+        while True:
+            with self.condition:
+                if seen == len(self.items) and self.running:
+                    self.condition.wait(timeout=1)
+                items = self.items[seen:]
+                running = self.running
+            if items:
+                for item in items:
+                    yield "update", item, item["seq"]
+                seen += len(items)
+            elif not running:
+                return
+            else:
+                yield no_event
+
+
+def make_app(updates):
+    app = flask.Flask(__name__)
+
+    @app.route("/events")
+    def events():
+        return event_stream(updates.follow())
+
+    @app.route("/latest")
+    def latest():
+        with updates.condition:
+            item = updates.items[-1] if updates.items else None
+        return flask.jsonify(item)
+
+    return app
+
+
+def response_bytes(response, body):
+    return len(body) + sum(len(k) + len(v) + 4 for k, v in response.getheaders()) + 17
+
+
+def sse_client(port, received, stats):
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    connection.request("GET", "/events")
+    response = connection.getresponse()
+    stats["requests"] = 1
+    stats["bytes"] = response_bytes(response, b"")
+    while True:
+        line = response.fp.readline()
+        if not line:
+            break
+        stats["bytes"] += len(line)
+        if line.startswith(b"data: "):
+            item = json.loads(line[6:])
+            received.append(time.perf_counter() - item["t"])
+    connection.close()
+
+
+def poll_client(port, poll, updates, received, stats):
+    last = None
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    while True:
+        with updates.condition:
+            running = updates.running
+        connection.request("GET", "/latest")
+        response = connection.getresponse()
+        body = response.read()
+        stats["requests"] += 1
+        stats["bytes"] += response_bytes(response, body)
+        item = json.loads(body)
+        if item is not None and item["seq"] != last:
+            last = item["seq"]
+            received.append(time.perf_counter() - item["t"])
+        if not running:
+            break
+        time.sleep(poll)
+    connection.close()
+
+
+def run(mode, args):
+    updates = Updates()
+    server = make_server("127.0.0.1", 0, make_app(updates), threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    received, stats = [], {"requests": 0, "bytes": 0}
+    if mode == "sse":
+        client = threading.Thread(target=sse_client, args=(server.server_port, received, stats))
+    else:
+        client = threading.Thread(target=poll_client, args=(server.server_port, args.poll, updates, received, stats))
+    client.start()
+    updates.run(args.interval, args.duration)
+    client.join()
+    server.shutdown()
+    latency = percentiles([x * 1000 for x in received], (50, 95))
+    return [mode, stats["requests"], stats["bytes"], "{}/{}".format(len(received), len(updates.items)),
+            latency[50], latency[95]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between updates")
+    parser.add_argument("--poll", type=float, default=0.5, help="seconds between polls")
+    parser.add_argument("--duration", type=float, default=5, help="seconds to run each mode")
+    args = parser.parse_args()
+
+    print("{:<6} {:>9} {:>9} {:>9} {:>12} {:>12}".format("mode", "requests", "bytes", "updates", "p50 ms", "p95 ms"))
+    for mode in ("sse", "poll"):
+        print("{:<6} {:>9} {:>9} {:>9} {:>12.1f} {:>12.1f}".format(*run(mode, args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Measure `import jsrope` and the first use of its heavy parts with `python -X importtime`.
+
+Each case runs in a new interpreter `--repeat` times, and the best cumulative import time of the listed modules is
+reported, with the milliseconds the whole statement took.
+
+    python benchmarks/bench_import.py --repeat 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+cases = [
+    ("import jsrope", "import jsrope"),
+    ("first public name", "import jsrope; jsrope.Flow"),
+    ("first prettify", "import jsrope; jsrope.Flow(jsrope.Code('a()')).prettify()"),
+    ("flask integration", "import jsrope.flask"),
+]
+
+# modules the interpreter imports before running the code
+_startup = set()
+
+
+def _importtime(code):
+    """
+    Return dict of module and (cumulative microseconds, whether it is imported at top level), and seconds the run took
+    """
+    start = time.perf_counter()
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True,
+                            text=True, check=True).stderr
+    elapsed = time.perf_counter() - start
+    modules = {}
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            # nested imports are indented under the module importing them
+            modules[parts[2].strip()] = (int(parts[1]), not parts[2].startswith("  "))
+    return modules, elapsed
+
+
+def _run(code):
+    modules, elapsed = _importtime(code)
+    new = {name: value for name, value in modules.items() if name not in _startup}
+    imported = sum(us for us, top in new.values() if top)
+    return imported, elapsed, len(new)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each case")
+    args = parser.parse_args()
+
+    _startup.update(_importtime("pass")[0])
+    print("{:<20} {:>12} {:>12} {:>9}".format("case", "import ms", "process ms", "modules"))
+    for name, code in cases:
+        try:
+            runs = [_run(code) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError as e:
+            print("{:<20} failed: {}".format(name, e.stderr.strip().splitlines()[-1]))
+            continue
+        imported, elapsed, count = min(runs)
+        print("{:<20} {:>12.2f} {:>12.1f} {:>9}".format(name, imported / 1000, min(r[1] for r in runs) * 1000, count))
+
+
+if __name__ == "__main__":
+    main()
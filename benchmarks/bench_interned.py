@@ -0,0 +1,65 @@
+"""
+Compare memory and hashing of repeated nodes made with and without `jsrope.interned()`.
+
+The page has `--rows` rows, each making the same few `Int`, `Str` and `Object` nodes of its fields.
+Reports the memory allocated for the nodes (tracemalloc), the time to build them, and the best of `--repeat`
+runs of hashing every node into a set.
+
+    python benchmarks/bench_interned.py --rows 20000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jsrope import Int, Object, Str, interned
+
+fields = ["id", "name", "price", "count", "owner"]
+
+
+def build(rows):
+    nodes = []
+    for i in range(rows):
+        for field in fields:
+            nodes.append(Int("row.{}".format(field), handler=int))
+            nodes.append(Str("'{}'".format(field)))
+            nodes.append(Object("data[{}]".format(i % 10)))
+    return nodes
+
+
+def measure(rows, repeat, intern):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with interned(intern):
+        nodes = build(rows)
+    built = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    hashed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        unique = set(nodes)
+        hashed = min(hashed, time.perf_counter() - start)
+    return size, built, hashed, len({id(x) for x in nodes}), len(unique)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000, help="rows on the page")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of hashing")
+    args = parser.parse_args()
+
+    print("{:<10} {:>10} {:>10} {:>10} {:>10} {:>8}".format("mode", "KB", "build ms", "hash ms", "objects", "unique"))
+    for intern in (False, True):
+        size, built, hashed, objects, unique = measure(args.rows, args.repeat, intern)
+        print("{:<10} {:>10.0f} {:>10.1f} {:>10.1f} {:>10} {:>8}".format(
+            "interned" if intern else "plain", size / 1024, built * 1000, hashed * 1000, objects, unique))
+
+
+if __name__ == "__main__":
+    main()
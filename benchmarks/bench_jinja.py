@@ -0,0 +1,79 @@
+"""
+Compare rendering a jsrope script in every request against rendering it once with `{% jsrope %}`.
+
+The script has `--handlers` click handlers, each sending an `Ajax` with the per-request user id.
+Reports the best of `--repeat` runs of `--requests` template renders each way, and per request.
+
+    python benchmarks/bench_jinja.py --handlers 200 --requests 200 --repeat 3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jinja2
+from markupsafe import Markup
+
+from jsrope import Ajax, Code, Element, Flow, Object, Script
+from jsrope.jinja import JsropeExtension, builder
+
+
+def build(handlers, user_id):
+    events = []
+    for i in range(handlers):
+        ajax = Ajax("/item/{}".format(i), {"method": "POST", "data": {"user": user_id}},
+                    done=Code("function(r){{$('#out{}').html(r)}}".format(i)))
+        events.append(Element("#item{}".format(i)).on("click", Flow(ajax)))
+    return Script(*events)
+
+
+def best(f, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--handlers", type=int, default=200, help="click handlers in the script")
+    parser.add_argument("--requests", type=int, default=200, help="template renders per run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each way")
+    args = parser.parse_args()
+
+    env = jinja2.Environment(extensions=[JsropeExtension], autoescape=True)
+
+    @builder(env)
+    def page(user_id):
+        return build(args.handlers, user_id)
+
+    per_request = env.from_string("<script>{{ script }}</script>")
+    start = time.perf_counter()
+    compiled = env.from_string('<script>{% jsrope "page", user_id=user_id %}</script>')
+    compile_time = time.perf_counter() - start
+
+    def render_each():
+        for i in range(args.requests):
+            per_request.render(script=Markup(str(build(args.handlers, Object(str(i))))))
+
+    def render_compiled():
+        for i in range(args.requests):
+            compiled.render(user_id=i)
+
+    each = best(render_each, args.repeat)
+    once = best(render_compiled, args.repeat)
+
+    print("{:<12} {:>10} {:>12}".format("way", "total ms", "per request"))
+    print("{:<12} {:>10.1f} {:>10.3f}ms".format("per request", each * 1000, each * 1000 / args.requests))
+    print("{:<12} {:>10.1f} {:>10.3f}ms".format("{% jsrope %}", once * 1000, once * 1000 / args.requests))
+    print()
+    print("compiling the template took {:.1f} ms, renders are {:.0f}x faster".format(compile_time * 1000, each / once))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Measure how `jsrope.render_many` scales with the number of worker processes.
+
+Renders `--scripts` variants of a page (one per tenant and locale) in `--mode`, with each number of `--workers`,
+and reports the time, scripts per second and speedup over one process.
+
+    python benchmarks/bench_parallel.py --scripts 2000 --mode prettify --workers 1 2 4 8
+"""
+
+import argparse
+import functools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jsrope import Ajax, Code, Element, Flow, Function, If, Int, Object, Str, Switch, render_many
+from jsrope.util import js_string
+
+
+def variant(index, forms=10):
+    locale = ("en", "ja", "de", "fr")[index % 4]
+    show = Function("show", {"id": None, "text": None},
+                    Flow(Element.by_id(Object("id")).change_inner_html(Object("text"))))
+    events = [show]
+    for i in range(forms):
+        count = Int("count{}".format(i))
+        ajax = Ajax("/tenant/{}/form/{}".format(index, i), {"method": "POST", "data": {"count": count,
+                                                                                       "locale": Str(locale)}},
+                    done=Code("function(r){{show('out{}',r)}}".format(i)))
+        switch = Switch({Code("'save'"): Flow(ajax), Code("'reset'"): Flow(show(js_string("out{}".format(i)),
+                                                                                js_string(locale)))})
+        events.append(Element.by_id("form{}".format(i)).on("submit", Flow(If(count > Int(0), Flow(switch)))))
+    return Flow(*events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scripts", type=int, default=2000, help="variants to render")
+    parser.add_argument("--mode", default="prettify", choices=("raw", "prettify", "minify"))
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}), help="numbers of processes")
+    args = parser.parse_args()
+
+    builders = [functools.partial(variant, i) for i in range(args.scripts)]
+    print("{} CPUs, {} scripts, mode {}".format(os.cpu_count(), args.scripts, args.mode))
+    print("{:>8} {:>10} {:>14} {:>9}".format("workers", "seconds", "scripts / s", "speedup"))
+    base = None
+    expected = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        codes = render_many(builders, mode=args.mode, workers=workers)
+        elapsed = time.perf_counter() - start
+        expected = expected or codes
+        assert codes == expected
+        base = base or elapsed
+        print("{:>8} {:>10.2f} {:>14.0f} {:>8.1f}x".format(workers, elapsed, args.scripts / elapsed, base / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measure re-rendering a large `Flow` after small changes, with and without the render cache.
+
+"append" adds one action to a `--size` action `Flow` and renders it, `--cycles` times. "nested" changes one
+`Ajax` deep in a tree of `Flow`s and `Switch`es of the same size and renders the root. "uncached" does the same
+after `RenderCache.invalidate_all()`, which renders the whole tree from scratch like before the cache.
+
+    python benchmarks/bench_render_cache.py --size 10000 --cycles 100
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jsrope import Ajax, Code, Element, Flow, Int, Switch
+from jsrope.jsrope import RenderCache
+
+
+def flat(size):
+    return Flow(*[Element.by_id("e{}".format(i)).change_inner_html(Int(i)) for i in range(size)])
+
+
+def nested(size):
+    ajaxes = []
+    groups = []
+    for i in range(0, size, 10):
+        ajax = Ajax("/a/{}".format(i), {"data": {"x": Int(i)}})
+        ajaxes.append(ajax)
+        switch = Switch({Code("'{}'".format(j)): Flow(Code("f{}()".format(i + j))) for j in range(8)})
+        groups.append(Switch({Code("'a'"): Flow(ajax, switch), Code("'b'"): Flow(Code("h{}()".format(i)))}))
+    return Flow(*[Flow(*groups[i:i + 10]) for i in range(0, len(groups), 10)]), ajaxes
+
+
+def run(cycles, step, render, cached):
+    start = time.perf_counter()
+    for i in range(cycles):
+        step(i)
+        if not cached:
+            RenderCache.invalidate_all()
+        render()
+    return (time.perf_counter() - start) / cycles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=10000, help="actions in the flow")
+    parser.add_argument("--cycles", type=int, default=100, help="change and render cycles")
+    args = parser.parse_args()
+
+    print("{:<8} {:>14} {:>14} {:>9}".format("case", "uncached ms", "cached ms", "speedup"))
+    for name in ("append", "nested"):
+        times = []
+        for cached in (False, True):
+            if name == "append":
+                tree = flat(args.size)
+                step = lambda i: tree.add(Code("g{}()".format(i)))
+            else:
+                tree, ajaxes = nested(args.size)
+                step = lambda i: ajaxes[i * 7 % len(ajaxes)].settings["data"].__setitem__("x", Int(i))
+            str(tree)
+            times.append(run(args.cycles, step, lambda: str(tree), cached))
+            final = str(tree)
+        RenderCache.invalidate_all()
+        assert str(tree) == final
+        print("{:<8} {:>14.3f} {:>14.3f} {:>8.0f}x".format(name, times[0] * 1000, times[1] * 1000,
+                                                           times[0] / times[1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare inserting many elements with `Element.render_many` against one `Element.new` and `append` per row.
+
+For each of `--rows`, reports Python render time (best of `--repeat`), bytes of the code (raw and gzipped) and DOM
+statements run in the browser. "compact" builds the HTML in the browser from one template and a data array.
+
+    python benchmarks/bench_render_many.py --rows 1000 10000 100000
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jsrope import Element, Flow
+from jsrope.util import js_string
+
+
+def per_element(rows):
+    items = Element.by_id("items")
+    return Flow(*[items.append(Element.new("li", js_string(row["content"]), class_="item row",
+                                           data_id=js_string(row["data_id"]))) for row in rows]), len(rows)
+
+
+def render_many(rows, compact=False):
+    items = Element.by_id("items")
+    return Flow(items.change_inner_html(Element.render_many("li", rows, compact=compact, class_="item row"))), 1
+
+
+def best(f, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        code = f()
+        times.append(time.perf_counter() - start)
+    return min(times), code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000], help="numbers of rows")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each case")
+    args = parser.parse_args()
+
+    cases = [("per element", per_element), ("render_many", render_many),
+             ("compact", lambda rows: render_many(rows, compact=True))]
+    print("{:>8} {:<12} {:>10} {:>12} {:>12} {:>11}".format("rows", "case", "render ms", "bytes", "gzip bytes",
+                                                           "statements"))
+    for count in args.rows:
+        rows = [{"content": "row <{}> & more".format(i), "data_id": str(i)} for i in range(count)]
+        for name, build in cases:
+            def render():
+                tree, statements = build(rows)
+                return str(tree), statements
+
+            elapsed, (code, statements) = best(render, args.repeat)
+            print("{:>8} {:<12} {:>10.1f} {:>12} {:>12} {:>11}".format(
+                count, name, elapsed * 1000, len(code.encode()), len(gzip.compress(code.encode(), 6)), statements))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare loading a tree saved with `jsrope.dump` against building it again in Python.
+
+The page has `--forms` forms, each with a few handlers, an `Ajax` with typed fields, a `Switch` and a shared
+`Function`. Reports the best of `--repeat` runs of building, dumping and loading, and the size of the dump.
+
+    python benchmarks/bench_serialization.py --forms 500 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jsrope import Ajax, Code, Element, Flow, Function, If, Int, Object, Str, Switch, dumps, loads
+
+
+def build(forms):
+    show = Function("show", {"id": None, "text": None},
+                    Flow(Element.by_id(Object("id")).change_inner_html(Object("text"))))
+    events = [show]
+    for i in range(forms):
+        count = Int("count{}".format(i), handler=int)
+        name = Str("name{}".format(i), handler=str.strip)
+        ajax = Ajax("/form/{}".format(i), {"method": "POST", "data": {"count": count, "name": name}},
+                    done=Code("function(r){{show('out{}',r)}}".format(i)))
+        switch = Switch({Code("'save'"): Flow(ajax), Code("'reset'"): Flow(show(Str("'out{}'".format(i)), "''"))})
+        events.append(Element.by_id("form{}".format(i)).on("submit", Flow(If(count > Int(0), Flow(switch)))))
+        events.append(Element.by_id("name{}".format(i)).on("change", Flow(ajax)))
+    return Flow(*events)
+
+
+def best(f, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = f()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--forms", type=int, default=500, help="forms on the page")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each step")
+    args = parser.parse_args()
+
+    built_time, tree = best(lambda: build(args.forms), args.repeat)
+    dump_time, data = best(lambda: dumps(tree), args.repeat)
+    load_time, loaded = best(lambda: loads(data), args.repeat)
+    assert str(loaded) == str(tree)
+
+    print("{:<10} {:>10}".format("step", "ms"))
+    print("{:<10} {:>10.1f}".format("build", built_time * 1000))
+    print("{:<10} {:>10.1f}".format("dump", dump_time * 1000))
+    print("{:<10} {:>10.1f}".format("load", load_time * 1000))
+    print()
+    print("dump: {} bytes, load is {:.1f}x faster than build".format(len(data), built_time / load_time))
+
+
+if __name__ == "__main__":
+    main()
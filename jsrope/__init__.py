@@ -9,9 +9,39 @@ Powered by [Yamato Nagata](https://twitter.com/514YJ)
     :license: MIT.
 """
 
+import importlib
+
 from .__about__ import __version__
 
-from .jsrope import (Element, find_element_by, Flow, EventHandler, Code, Date, If, Switch, For, Return, While, Function,
-                     true, false, Ajax, Bool, Util, Array, Expression, Object, Str, Int, Float, BaseJS, JS)
+# public names are imported on first use, so `import jsrope` stays cheap
+_lazy_names = {
+    ".jsrope": ("Element", "find_element_by", "Flow", "EventHandler", "Code", "Date", "If", "Switch", "For", "Return",
+                "While", "Function", "true", "false", "Ajax", "Bool", "Util", "Array", "Expression", "Object", "Str",
+                "Int", "Float", "BaseJS", "JS", "Promise", "Batch", "EventSource", "Data",
+                "VirtualList", "interned"),
+    ".util": ("negative", "substitute", "escape", "minify"),
+    ".serialization": ("dump", "dumps", "load", "loads"),
+    ".report": ("size_report", "assert_size"),
+    ".page": ("Script",),
+    ".parallel": ("render_many",),
+}
+_lazy_modules = {name: module for module, names in _lazy_names.items() for name in names}
+_submodules = ("jsrope", "util", "serialization", "report", "page", "parallel", "chunks", "metrics", "telemetry",
+               "service_worker", "jinja", "flask", "django")
+
+__all__ = list(_lazy_modules)
+
+
+def __getattr__(name):
+    if name in _lazy_modules:
+        value = getattr(importlib.import_module(_lazy_modules[name], __name__), name)
+    elif name in _submodules:
+        value = importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    globals()[name] = value
+    return value
+
 
-from .util import negative, substitute, escape
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_modules))
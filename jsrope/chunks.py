@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Chunks of code that are loaded by the page on first use (`Function(..., lazy=True)`, `Flow(..., lazy=True)`).
+
+Chunks are registered when the lazy node is rendered, and served by `jsrope.flask.serve_chunks`.
+Render pages at startup (or `save` chunks as static files) if requests may go to other processes.
+"""
+
+import hashlib
+import os
+import threading
+
+from .util import js_string
+
+# code of `window.__jsrope_load`, which is defined once per page
+loader = ("function(u,i){"
+          "var c=window.__jsrope_chunks=window.__jsrope_chunks||{},"
+          "p=window.__jsrope_loading=window.__jsrope_loading||{};"
+          "return p[i]||(p[i]=new Promise(function(r,j){if(c[i]){return r(c[i])}"
+          "var s=document.createElement(\"script\");s.src=u;s.async=true;"
+          "s.onload=function(){c[i]?r(c[i]):j(new Error(\"jsrope chunk \"+i+\" is not loaded\"))};"
+          "s.onerror=function(e){delete p[i];j(e)};document.head.appendChild(s)}))}")
+
+
+class ChunkRegistry:
+    """
+    Code of chunks keyed by their hash, so urls can be cached forever.
+
+    Attributes
+    -----------
+    url_prefix: url the chunks are served under
+    """
+
+    def __init__(self, url_prefix="/_jsrope/chunks/"):
+        self.url_prefix = url_prefix
+        self._chunks = {}
+        self._lock = threading.Lock()
+
+    def add(self, function):
+        """
+        Register chunk that defines `function` (code of JavaScript function)
+
+        :return: chunk id
+        """
+        chunk_id = hashlib.sha256(function.encode()).hexdigest()[:20]
+        with self._lock:
+            if chunk_id not in self._chunks:
+                self._chunks[chunk_id] = "(window.__jsrope_chunks=window.__jsrope_chunks||{{}})[{}]={};".format(
+                    js_string(chunk_id), function)
+        return chunk_id
+
+    def get(self, chunk_id):
+        """
+        :return: code of the chunk or None
+        """
+        return self._chunks.get(chunk_id)
+
+    def url(self, chunk_id):
+        return "{}{}.js".format(self.url_prefix, chunk_id)
+
+    def load(self, function):
+        """
+        Register `function` and return the code that loads it, which is Promise of the function
+        """
+        from .jsrope import _runtime
+
+        chunk_id = self.add(function)
+        return "{}({},{})".format(_runtime("__jsrope_load", loader), js_string(self.url(chunk_id)),
+                                  js_string(chunk_id))
+
+    def save(self, directory):
+        """
+        Write chunks to `directory` as `<chunk id>.js` to serve them as static files
+        """
+        with self._lock:
+            chunks = dict(self._chunks)
+        for chunk_id, code in chunks.items():
+            with open(os.path.join(directory, "{}.js".format(chunk_id)), "w", encoding="utf-8") as f:
+                f.write(code)
+
+    def __iter__(self):
+        return iter(dict(self._chunks))
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def __bool__(self):
+        # empty registry is still given as `lazy` option
+        return True
+
+
+registry = ChunkRegistry()
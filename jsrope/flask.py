@@ -1,42 +1,451 @@
+import array
+import base64
+import collections
+import datetime
+import json
+import queue
+import select
+import socket
+import sys
+import threading
+import time
 from functools import wraps, reduce
 
 import flask
+from werkzeug.exceptions import HTTPException
 
 import jsrope
+import jsrope.metrics
+import jsrope.telemetry
+from jsrope.jsrope import delta_client_field, delta_base_field, delta_version_field, delta_keys_field, \
+    page_offset_field, page_limit_field
 
 
-def ajax_handler(ajax, data_name="ajax_data"):
+class DeltaStore:
+    """
+    The base class of the store that keeps merged `ajax_data` for `Ajax(..., delta=True)`.
+    Inherit this class and override `get` and `set` to keep states in other place (e.g. Redis).
+    """
+
+    def get(self, key):
+        """
+        :param key: (client id, url)
+        :return: (version, data) or None
+        """
+        raise NotImplementedError
+
+    def set(self, key, version, data):
+        raise NotImplementedError
+
+
+class MemoryDeltaStore(DeltaStore):
+    """
+    DeltaStore that keeps states in memory of the process. Oldest states are dropped above `max_size`.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._states = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+            return state
+
+    def set(self, key, version, data):
+        with self._lock:
+            self._states[key] = (version, data)
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_size:
+                self._states.popitem(last=False)
+
+
+def ajax_handler(ajax, data_name="ajax_data", delta_store=None, etag=None, last_modified=None, conditional=False,
+                 arrays=None, metrics=None):
+    """
+    :param delta_store: DeltaStore used when `ajax.delta` is True. MemoryDeltaStore() by default.
+    :param etag: function that returns ETag from `ajax_data`. View is not called if the client has it.
+    :param last_modified: function that returns last modified datetime from `ajax_data`.
+                          View is not called if the client has newer one.
+    :param conditional: if True, add ETag made from response body and answer 304 if the client has it.
+    :param arrays: dict of key of array in `ajax_data` (tuple for nested key) and jsrope.Int, jsrope.Float or dtype.
+                   The array is decoded at once into numpy.ndarray (array.array without NumPy).
+                   Arrays in `Ajax(..., packed=...)` are decoded the same way without this.
+    :param metrics: jsrope.metrics.Metrics which records decode time, view time, number of fields,
+                    payload size and conversion failures of each request. jsrope.metrics.default by default.
+    """
+    if ajax.delta and delta_store is None:
+        delta_store = MemoryDeltaStore()
+    typed = {(k,) if isinstance(k, str) else tuple(k): (v, False) for k, v in (arrays or {}).items()}
+    typed.update({(k,): (v, True) for k, v in ajax.packed.items()})
+
     def _wrapper(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
-            if "dataType" in ajax.settings and ajax.settings["dataType"] == "script":
-                method = "GET"
-            elif "type" in ajax.settings:
-                method = ajax.settings["type"]
-            elif "method" in ajax.settings:
-                method = ajax.settings["method"]
-            else:
-                method = "GET"
+            sink = metrics if metrics is not None else jsrope.metrics.default
+            if sink.enabled:
+                return measured(sink, args, kwargs)
+            return handle(f, args, kwargs)
+
+        def measured(sink, args, kwargs):
+            timings = {}
+
+            def view(*args, **kwargs):
+                timings["decoded"] = time.perf_counter()
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    timings["viewed"] = time.perf_counter()
+
+            request = flask.request
+            size = len(request.query_string) + (request.content_length or 0)
+            endpoint = request.endpoint or ajax.url
+            failures = 0
+            start = time.perf_counter()
+            try:
+                return handle(view, args, kwargs, timings)
+            except HTTPException:
+                raise
+            except Exception:
+                # errors before the view are values that couldn't be converted
+                if "decoded" not in timings:
+                    failures = 1
+                raise
+            finally:
+                decoded = timings.get("decoded", time.perf_counter())
+                view_time = timings["viewed"] - decoded if "viewed" in timings else None
+                sink.record(jsrope.metrics.Sample(endpoint, decoded - start, view_time, timings.get("fields", 0),
+                                                  size, failures))
+
+        def handle(f, args, kwargs, timings=None):
+            method = ajax.method
 
+            data = None
             if "data" in ajax.settings:
-                data = dig_nest(ajax.settings["data"], method)
+                if ajax.delta:
+                    data = merge_delta(ajax, method, delta_store, typed)
+                    if data is None:
+                        flask.abort(409)
+                else:
+                    data = dig_nest(ajax.settings["data"], method, typed=typed)
                 kwargs.update({data_name: data})
-            return f(*args, **kwargs)
+                if timings is not None:
+                    timings["fields"] = sum(1 for _ in all_keys(data))
+
+            if ajax.latest and client_disconnected():
+                return flask.Response(status=499)
+
+            if not (conditional or etag or last_modified):
+                return f(*args, **kwargs)
+
+            tag = etag(data) if etag else None
+            modified = last_modified(data) if last_modified else None
+            if is_not_modified(tag, modified):
+                response = flask.Response(status=304)
+            else:
+                response = flask.make_response(f(*args, **kwargs))
+            if tag:
+                response.set_etag(tag)
+            elif conditional and response.status_code == 200:
+                response.add_etag()
+            if modified:
+                response.last_modified = modified
+            if response.status_code == 304:
+                return response
+            return response.make_conditional(flask.request)
 
         return wrapper
 
     return _wrapper
 
 
-def dig_nest(target, method):
+def serve_chunks(app, registry=None, max_age=31536000, endpoint="jsrope_chunks"):
+    """
+    Add the route that serves chunks of lazy Functions and Flows. Chunk urls change with their code,
+    so they are cached for `max_age` seconds.
+
+    :param app: Flask or Blueprint
+    :param registry: jsrope.chunks.ChunkRegistry. jsrope.chunks.registry by default.
+    """
+    registry = registry if registry is not None else jsrope.chunks.registry
+
+    def chunk(chunk_id):
+        code = registry.get(chunk_id)
+        if code is None:
+            flask.abort(404)
+        response = flask.Response(code, mimetype="text/javascript")
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response.cache_control.immutable = True
+        response.set_etag(chunk_id)
+        return response.make_conditional(flask.request)
+
+    app.add_url_rule("{}<chunk_id>.js".format(registry.url_prefix), endpoint, chunk)
+
+
+def serve_service_worker(app, worker, endpoint="jsrope_service_worker"):
+    """
+    Add the route that serves `worker` (jsrope.service_worker.ServiceWorker) at `worker.url`.
+    The worker is revalidated on every check, and ETag is its version.
+
+    :param app: Flask or Blueprint
+    """
+
+    def service_worker():
+        response = flask.Response(worker.code(), mimetype="text/javascript")
+        response.headers["Service-Worker-Allowed"] = worker.scope
+        response.cache_control.no_cache = True
+        response.set_etag(worker.version())
+        return response.make_conditional(flask.request)
+
+    app.add_url_rule(worker.url, endpoint, service_worker)
+
+
+def collect_telemetry(app, store=None, url=None, endpoint="jsrope_telemetry", max_items=1000):
+    """
+    Add the route that receives durations sent by pages rendered with `jsrope.telemetry.enable()`.
+
+    :param app: Flask or Blueprint
+    :param store: jsrope.telemetry.TelemetryStore. jsrope.telemetry.store by default.
+    :param url: url of the route. url of jsrope.telemetry.enable() (or its default) by default.
+    :param max_items: max number of durations accepted from one request
+    """
+    store = store if store is not None else jsrope.telemetry.store
+    if url is None:
+        url = jsrope.telemetry.config.url if jsrope.telemetry.config else "/_jsrope/telemetry"
+
+    def collect():
+        items = flask.request.get_json(force=True, silent=True)
+        if not isinstance(items, list) or len(items) > max_items:
+            flask.abort(400)
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get("n"), str) \
+                    or not isinstance(item.get("d"), (int, float)) or isinstance(item.get("d"), bool):
+                flask.abort(400)
+        for item in items:
+            store.record(item["n"][:200], float(item["d"]), bool(item.get("ok", 1)))
+        return flask.Response(status=204)
+
+    app.add_url_rule(url, endpoint, collect, methods=["POST"])
+    return store
+
+
+def paged_response(rows, max_limit=1000):
+    """
+    Return the response of a page of `rows` for `VirtualList(..., url=...)`, which asks it with "offset" and "limit".
+    The response is JSON of {"total": number of rows, "offset": offset, "rows": rows of the page}.
+
+    :param rows: sequence of rows (anything `json` can serialize), or function that takes (offset, limit)
+                 and returns (rows of the page, total)
+    :param max_limit: max number of rows answered at once
+    """
+    try:
+        offset = int(flask.request.args.get(page_offset_field, 0))
+        limit = int(flask.request.args.get(page_limit_field, max_limit))
+    except ValueError:
+        flask.abort(400)
+    if offset < 0 or limit < 0:
+        flask.abort(400)
+    limit = min(limit, max_limit)
+    if callable(rows):
+        page, total = rows(offset, limit)
+    else:
+        page, total = rows[offset:offset + limit], len(rows)
+    return flask.jsonify({"total": total, "offset": offset, "rows": list(page)})
+
+
+def format_event(data, event=None, id_=None):
+    """
+    Return one Server-Sent Event. `data` is sent as JSON.
+    """
+    lines = []
+    if id_ is not None:
+        lines.append("id: {}".format(id_))
+    if event is not None:
+        lines.append("event: {}".format(event))
+    lines.append("data: {}".format(json.dumps(data)))
+    if any(["\n" in x or "\r" in x for x in lines]):
+        raise ValueError("event and id can't contain newline")
+    return "\n".join(lines) + "\n\n"
+
+
+# item which sources of `event_stream` can yield while waiting.
+# Nothing is sent, and the stream stops there if the client is gone.
+no_event = object()
+
+
+def event_stream(source, heartbeat=15, retry=None, max_queue=100):
+    """
+    Return `text/event-stream` response of events from `source`, for `jsrope.EventSource`.
+    `source` is iterated in another thread, so comments are sent as heartbeats while it blocks.
+
+    When the client is gone, `source` is closed (e.g. `finally` of the generator runs) the next time it yields.
+    So `source` mustn't block forever: wait with a timeout and yield `no_event` when nothing happened.
+
+    :param source: iterable, or function that takes Last-Event-ID of reconnecting client (or None) and returns iterable.
+                   Each item is data, (event, data) or (event, data, id).
+    :param heartbeat: seconds of silence after which a comment is sent
+    :param retry: milliseconds the client waits before reconnecting
+    :param max_queue: max number of events waiting to be sent. `source` waits while the queue is full.
+    """
+    if callable(source):
+        source = source(flask.request.headers.get("Last-Event-ID") or flask.request.args.get("lastEventId"))
+
+    items = queue.Queue(maxsize=max_queue)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    @flask.copy_current_request_context
+    def produce():
+        iterator = None
+        try:
+            iterator = iter(source)
+            for item in iterator:
+                if stop.is_set() or item is not no_event and not put((True, item)):
+                    break
+            else:
+                put((False, None))
+        except Exception as e:
+            put((False, e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def stream():
+        threading.Thread(target=produce, daemon=True).start()
+        try:
+            if retry is not None:
+                yield "retry: {}\n\n".format(int(retry))
+            while True:
+                try:
+                    ok, item = items.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                if not ok:
+                    if item is not None:
+                        raise item
+                    return
+                if isinstance(item, tuple):
+                    yield format_event(item[1], item[0], *item[2:3])
+                else:
+                    yield format_event(item)
+        finally:
+            stop.set()
+
+    return flask.Response(stream(), mimetype="text/event-stream",
+                          headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def client_disconnected():
+    """
+    Whether the client of current request has closed the connection (e.g. aborted by `Ajax(..., latest=True)`).
+    Long running views can call this to stop early.
+    Works on servers that expose the socket in environ (Werkzeug development server, gunicorn), otherwise False.
+    """
+    environ = flask.request.environ
+    sock = environ.get("werkzeug.socket") or environ.get("gunicorn.socket")
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK) == b""
+    except ValueError:
+        # the socket can't be probed (e.g. ssl.SSLSocket doesn't allow flags), so it's unknown
+        return False
+    except OSError:
+        return True
+
+
+def is_not_modified(tag, modified):
+    """
+    Whether the client of current GET/HEAD request already has the response with `tag` or `modified`.
+    """
+    request = flask.request
+    if request.method not in ("GET", "HEAD") or (tag is None and modified is None):
+        return False
+    if tag is not None and request.if_none_match:
+        return request.if_none_match.contains(tag)
+    if modified is not None and request.if_modified_since:
+        if modified.tzinfo is None:
+            modified = modified.replace(tzinfo=datetime.timezone.utc)
+        return modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def merge_delta(ajax, method, store, typed=None):
+    """
+    Merge changed keys sent by `Ajax(..., delta=True)` with the state in `store`.
+    Return None if the state the client based on is not in the store.
+    """
+    source = flask.request.args if method == "GET" else flask.request.form
+    client = source.get(delta_client_field)
+    if client is None:
+        return dig_nest(ajax.settings["data"], method, typed=typed)
+
+    try:
+        base = int(source.get(delta_base_field, 0))
+        version = int(source.get(delta_version_field, 0))
+    except ValueError:
+        flask.abort(400)
+    key = (client, ajax.url)
+    state = store.get(key)
+    if base:
+        if state is None or state[0] != base:
+            return None
+        data = dict(state[1])
+    else:
+        data = {}
+
+    data.update(dig_nest(ajax.settings["data"], method, only=set(source.getlist(delta_keys_field + "[]")),
+                         typed=typed))
+    if state is None or version > state[0]:
+        store.set(key, version, data)
+    return data
+
+
+def copy_nest(target):
+    return {k: copy_nest(v) if isinstance(v, dict) else v for k, v in target.items()}
+
+
+def dig_nest(target, method, only=None, typed=None):
+    """
+    :param only: if given, decode only these top-level keys
+    :param typed: dict of key tuple and (dtype, packed) of arrays decoded with `decode_array` or `decode_packed`
+    """
+    if only is not None:
+        target = {k: v for k, v in target.items() if k in only}
+    typed = typed or {}
     keys = list(all_keys(target))
-    data = dict(target)
+    data = copy_nest(target)
+    source = flask.request.args if method == "GET" else flask.request.form
     for k, t in keys:
         if len(k) > 1:
             _k = "{}[{}]".format(k[0], "][".join(k[1:]))
         else:
             _k = k[0]
-        if t == "array":
+        if tuple(k) in typed:
+            dtype, packed = typed[tuple(k)]
+            if packed:
+                value = decode_packed(source.get(_k, ""), dtype)
+            else:
+                value = decode_array(source.getlist(_k + "[]"), dtype)
+            reduce(lambda x, y: x[y], k[:-1], data)[k[-1]] = value
+        elif t == "array":
             _k = _k + "[]"
             if method == "GET":
                 update(data, reduce(lambda x, y: {y: x}, reversed(k), flask.request.args.getlist(_k)))
@@ -50,6 +459,50 @@ def dig_nest(target, method):
     return data
 
 
+# array.array typecodes used without NumPy
+_typecodes = {"int8": "b", "uint8": "B", "int16": "h", "uint16": "H", "int32": "i", "uint32": "I",
+              "int64": "q", "uint64": "Q", "float32": "f", "float64": "d"}
+
+
+def _array_type(dtype):
+    if dtype is jsrope.Int:
+        return "int64"
+    elif dtype is jsrope.Float:
+        return "float64"
+    return dtype
+
+
+def decode_array(values, dtype):
+    """
+    Return numpy.ndarray (or array.array without NumPy) of strings `values`.
+
+    :param dtype: jsrope.Int, jsrope.Float or dtype (e.g. "int32", numpy.float32)
+    """
+    dtype = _array_type(dtype)
+    try:
+        import numpy
+    except ImportError:
+        return array.array(_typecodes[dtype], map(float if dtype.startswith("float") else int, values))
+    return numpy.array(values, dtype=dtype)
+
+
+def decode_packed(text, dtype):
+    """
+    Return numpy.ndarray (or array.array without NumPy) of base64 string sent by `Ajax(..., packed=...)`.
+    """
+    buffer = base64.b64decode(text)
+    dtype = _array_type(dtype)
+    try:
+        import numpy
+    except ImportError:
+        result = array.array(_typecodes[dtype], buffer)
+        if sys.byteorder == "big":
+            result.byteswap()
+        return result
+    # bytearray, so the array is writable like the ones of `decode_array`
+    return numpy.frombuffer(bytearray(buffer), dtype=numpy.dtype(dtype).newbyteorder("<"))
+
+
 def all_keys(a, parent=[]):
     for k, v in a.items():
         if isinstance(v, (jsrope.Array, list)):
@@ -64,6 +517,8 @@ def update(dict_base, other):
     for k, v in other.items():
         if isinstance(v, dict) and k in dict_base:
             update(dict_base[k], v)
+        elif isinstance(v, list):
+            dict_base[k] = list(v)
         else:
             if isinstance(dict_base[k], jsrope.JS):
                 if hasattr(dict_base[k], "handler") and dict_base[k].handler:
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Jinja2 extension that renders jsrope scripts when the template is compiled, instead of in each request.
+
+    env.add_extension(jsrope.jinja.JsropeExtension)   # app.jinja_env for Flask
+
+    @jsrope.jinja.builder(env)
+    def main(user_id):
+        return Script(...)                            # user_id is Object("user_id")
+
+    <script>{% jsrope "main", mode="minify", user_id=current_user.id %}</script>
+
+Builders are called once per template with `Object` of each per-request parameter (other than `mode`),
+and the parameters are passed as JSON in each request. `jsrope("main", ...)` global does the same,
+caching the script per builder, mode and parameter names.
+Changing a builder doesn't recompile templates which are already compiled.
+"""
+
+import threading
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from .jsrope import Object
+from .parallel import modes
+from .util import js_json
+
+
+def builder(environment, name=None):
+    """
+    Decorator that registers the builder of script as `name` (name of the function by default)
+    """
+
+    def _wrapper(f):
+        environment.jsrope_builders[name or f.__name__] = f
+        return f
+
+    return _wrapper
+
+
+class JsropeExtension(Extension):
+    tags = {"jsrope"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(jsrope_builders={})
+        self._scripts = {}
+        self._lock = threading.Lock()
+        environment.globals["jsrope"] = self._global
+
+    def script(self, name, mode="raw", params=()):
+        """
+        Return the code of builder `name`, which is a function of `params` if they are given.
+        """
+        if mode not in modes:
+            raise ValueError("mode has to be one of {}, not {!r}".format(", ".join(modes), mode))
+        build = self.environment.jsrope_builders.get(name)
+        if build is None:
+            raise KeyError("jsrope builder {!r} is not registered".format(name))
+        code = modes[mode](build(**{k: Object(k) for k in params}))
+        if params:
+            return "(function({}){{{}}})".format(",".join(params), code)
+        return code
+
+    def _global(self, name, mode="raw", **params):
+        key = (name, mode, tuple(params))
+        code = self._scripts.get(key)
+        if code is None:
+            code = self.script(name, mode, tuple(params))
+            with self._lock:
+                self._scripts[key] = code
+        if params:
+            code = "{}({})".format(code, ",".join([js_json(v) for v in params.values()]))
+        return Markup(code)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        name = parser.parse_expression()
+        if not isinstance(name, nodes.Const):
+            parser.fail("name of jsrope builder has to be a constant", lineno)
+        mode = "raw"
+        params = {}
+        while parser.stream.current.type != "block_end":
+            parser.stream.expect("comma")
+            key = parser.stream.expect("name").value
+            parser.stream.expect("assign")
+            value = parser.parse_expression()
+            if key == "mode":
+                if not isinstance(value, nodes.Const):
+                    parser.fail("mode of jsrope has to be a constant", lineno)
+                mode = value.value
+            else:
+                params[key] = value
+
+        try:
+            code = self.script(name.value, mode, tuple(params))
+        except (KeyError, ValueError) as e:
+            parser.fail(str(e.args[0]), lineno)
+        if not params:
+            return nodes.Output([nodes.TemplateData(code)], lineno=lineno)
+        output = [nodes.TemplateData(code + "(")]
+        for i, value in enumerate(params.values()):
+            if i:
+                output.append(nodes.TemplateData(","))
+            output.append(self.call_method("_json", [value]))
+        output.append(nodes.TemplateData(")"))
+        return nodes.Output(output, lineno=lineno)
+
+    @staticmethod
+    def _json(value):
+        return Markup(js_json(value))
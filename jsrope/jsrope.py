@@ -1,13 +1,34 @@
 # -*- coding: utf-8 -*-
 
 import datetime
-import collections
+import collections.abc
+import contextlib
+import functools
+import hashlib
+import html
+import json
+import re
+import string
+import threading
+import weakref
+
+from . import chunks, telemetry
+from .util import escape, beautify, js_string, js_json
 
-import jsbeautifier
+element_by_methods = ("css_selector", "id", "tag")
 
-from .util import escape
+delta_client_field = "_jsrope_client"
+delta_base_field = "_jsrope_base"
+delta_version_field = "_jsrope_version"
+delta_keys_field = "_jsrope_keys"
 
-element_by_methods = ("css_selector", "id", "tag")
+# query of pages of `VirtualList(..., url=...)`
+page_offset_field = "offset"
+page_limit_field = "limit"
+
+# dtypes `Ajax(..., packed=...)` can send, and their TypedArray
+packed_types = {"int8": "Int8Array", "uint8": "Uint8Array", "int16": "Int16Array", "uint16": "Uint16Array",
+                "int32": "Int32Array", "uint32": "Uint32Array", "float32": "Float32Array", "float64": "Float64Array"}
 
 
 class JS:
@@ -21,17 +42,22 @@ class JS:
         self.handler = handler
 
     def prettify(self):
-        return jsbeautifier.beautify(self.to_code())
+        return beautify(self.to_code())
 
     def to_code(self):
         return self.code
 
     def _operation(self, operation, *args):
-        args = [x.__str__() for x in args]
-        return self.__class__("{}({})".format(operation, ", ".join([self.to_code(), *args])))
+        code = "{}({})".format(operation, ", ".join([self.to_code(), *[x.__str__() for x in args]]))
+        return _built(self.__class__(code), code, ("call", operation, [self, *args]))
 
     def _operation_with_operator(self, operation, other):
-        return self.__class__("{} {} {}".format(self.to_code(), operation, other))
+        code = "{} {} {}".format(self.to_code(), operation, other)
+        return _built(self.__class__(code), code, ("binary", operation, [self, other]))
+
+    def _comparison(self, operation, other):
+        operation = self._operation_with_operator(operation=operation, other=other)
+        return _wrapped(Bool(operation.to_code(), explicit=False), operation)
 
     def __add__(self, other):
         """
@@ -112,37 +138,37 @@ class JS:
         """
         self === other
         """
-        return Bool(self._operation_with_operator(operation="===", other=other).to_code(), explicit=False)
+        return self._comparison(operation="===", other=other)
 
     def __ge__(self, other):
         """
         self >= other
         """
-        return Bool(self._operation_with_operator(operation=">=", other=other).to_code(), explicit=False)
+        return self._comparison(operation=">=", other=other)
 
     def __le__(self, other):
         """
         self <= other
         """
-        return Bool(self._operation_with_operator(operation="<=", other=other).to_code(), explicit=False)
+        return self._comparison(operation="<=", other=other)
 
     def __gt__(self, other):
         """
         self > other
         """
-        return Bool(self._operation_with_operator(operation=">", other=other).to_code(), explicit=False)
+        return self._comparison(operation=">", other=other)
 
     def __lt__(self, other):
         """
         self < other
         """
-        return Bool(self._operation_with_operator(operation="<", other=other).to_code(), explicit=False)
+        return self._comparison(operation="<", other=other)
 
     def abstract_eq(self, other):
         """
         self == other
         """
-        return Bool(self._operation_with_operator(operation="==", other=other).to_code(), explicit=False)
+        return self._comparison(operation="==", other=other)
 
     def __neg__(self):
         """
@@ -173,7 +199,7 @@ class Code(str, JS):
         return str.__new__(cls, *args, **kwargs)
 
     def prettify(self):
-        return Code(jsbeautifier.beautify(self))
+        return Code(beautify(self))
 
     def to_code(self):
         return self
@@ -184,15 +210,334 @@ class Expression(Code):
         super().__init__(code=code)
 
 
-class EventHandler(JS):
-    def __init__(self, element, event, handler):
+class _RenderStack(threading.local):
+    def __init__(self):
+        self.nodes = []
+        # runtimes required by each page being rendered, as dict of name and code of initial value
+        self.runtimes = []
+
+
+_render_stack = _RenderStack()
+
+
+def _runtime(name, init):
+    """
+    Return the expression of `window.<name>`, which is made from `init` (code of expression) once.
+
+    In a page (`Script`, or Flow rendered at top level), the definition is put once
+    at the beginning of the page, and the expression just refers it. Otherwise, it's made in place.
+    """
+    runtimes = _render_stack.runtimes
+    if runtimes:
+        runtimes[-1].setdefault(name, init)
+        return "window.{}".format(name)
+    return "(window.{0}||(window.{0}={1}))".format(name, init)
+
+
+@contextlib.contextmanager
+def _page_runtimes():
+    """
+    Collect runtimes required in the block into the yielded dict
+    """
+    runtimes = _render_stack.runtimes
+    runtimes.append({})
+    try:
+        yield runtimes[-1]
+    finally:
+        runtimes.pop()
+
+
+def _with_runtimes(code, runtimes):
+    """
+    Return `code` with definitions of `runtimes` at the beginning,
+    or pass them to the page being rendered if there is one.
+    """
+    if _render_stack.runtimes:
+        for name, init in runtimes.items():
+            _render_stack.runtimes[-1].setdefault(name, init)
+        return code
+    if not runtimes:
+        return code
+    return Code("".join(["window.{0}=window.{0}||{1};".format(name, init) for name, init in runtimes.items()]) + code)
+
+
+def _invalidating(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.invalidate()
+        return result
+
+    return wrapper
+
+
+class RenderTracked:
+    """
+    Mixin for nodes whose changes drop rendered code of the `RenderCache` nodes they are rendered in.
+
+    Once the node is rendered, public dict and list attributes are kept as tracked copies, so changes through
+    the attribute (e.g. `ajax.settings["data"]["x"] = Int("y")`) are noticed as well as assignments.
+    Changes of the dict or list given to the constructor, or got from the node before it was rendered, are not.
+    """
+
+    def _track(self):
+        """
+        Register the node being rendered as a parent of self
+        """
+        nodes = _render_stack.nodes
+        if nodes:
+            parent = nodes[-1]
+            parents = self.__dict__.setdefault("_render_parents", {})
+            ref = parents.get(id(parent))
+            if ref is None or ref() is not parent:
+                parents[id(parent)] = weakref.ref(parent)
+                self._watch()
+
+    def _watch(self):
+        """
+        Start tracking changes of self. Nodes which aren't rendered yet are built without the tracking.
+        """
+        state = self.__dict__
+        if "_render_watched" not in state:
+            state["_render_watched"] = True
+            for k, v in list(state.items()):
+                if not k.startswith("_") and (type(v) is dict or type(v) is list):
+                    state[k] = _tracked(v, self)
+
+    def invalidate(self):
+        """
+        Drop rendered code of self and of every node that contains self.
+        Call this after changing a node in place without its methods or attributes.
+        """
+        state = self.__dict__
+        if "_render_parents" not in state and "_render_code" not in state and "_render_inline" not in state:
+            # not rendered in anything
+            return
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            code = node.__dict__.pop("_render_code", None)
+            inline = node.__dict__.pop("_render_inline", None)
+            node.__dict__.pop("_render_runtimes", None)
+            if code is None and inline is None and node is not self:
+                continue
+            parents = node.__dict__.get("_render_parents", {})
+            for key, ref in list(parents.items()):
+                parent = ref()
+                if parent is None:
+                    del parents[key]
+                else:
+                    nodes.append(parent)
+
+    def __setattr__(self, name, value):
+        # nodes being built aren't watched, so they are set as fast as plain objects
+        if "_render_watched" in self.__dict__ and name[0] != "_" and name != "code":
+            object.__setattr__(self, name, _tracked(value, self))
+            self.invalidate()
+        else:
+            object.__setattr__(self, name, value)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for key in ("_render_code", "_render_inline", "_render_runtimes", "_render_generation", "_render_parents",
+                    "_render_watched"):
+            state.pop(key, None)
+        return state
+
+
+class RenderCache(RenderTracked):
+    """
+    Mixin for container nodes that keeps rendered code until the node or a node rendered inside it changes.
+
+    Nodes rendered while rendering this node register it as their parent,
+    so `invalidate()` only drops caches on the path from the changed node to the roots.
+
+    Lists of statements (`_page` is True) rendered at top level are pages, which define runtimes used in them once
+    at the beginning. Other nodes rendered at top level make runtimes in place, so they stay one expression.
+    """
+
+    _page = False
+    # incremented by `invalidate_all()`. Code rendered in older generation is dropped on the next use.
+    _generation = 0
+
+    @staticmethod
+    def invalidate_all():
+        """
+        Drop rendered code of all nodes, e.g. after changing settings which change the code of every node
+        (`jsrope.telemetry.enable()` and `disable()` call this)
+        """
+        RenderCache._generation += 1
+
+    def _render(self):
+        raise NotImplementedError
+
+    def _render_now(self):
+        nodes = _render_stack.nodes
+        nodes.append(self)
+        try:
+            return Code(self._render())
+        finally:
+            nodes.pop()
+
+    def _cached_code(self):
+        self._track()
+        if self.__dict__.get("_render_generation") != RenderCache._generation:
+            for key in ("_render_code", "_render_inline", "_render_runtimes"):
+                self.__dict__.pop(key, None)
+            self.__dict__["_render_generation"] = RenderCache._generation
+        if not _render_stack.runtimes and not self._page:
+            code = self.__dict__.get("_render_inline")
+            if code is None:
+                self._watch()
+                code = self.__dict__["_render_inline"] = self._render_now()
+            return code
+
+        code = self.__dict__.get("_render_code")
+        if code is None:
+            self._watch()
+            with _page_runtimes() as runtimes:
+                code = self._render_now()
+            self.__dict__["_render_code"] = code
+            self.__dict__["_render_runtimes"] = runtimes
+        return _with_runtimes(code, self.__dict__.get("_render_runtimes", {}))
+
+
+def _tracked(value, owner):
+    """
+    Return `value` as tracked container of `owner` if it's dict or list
+    """
+    if type(value) is dict or isinstance(value, _TrackedDict):
+        return value if getattr(value, "_owner", None) is owner else _TrackedDict(owner, value)
+    elif type(value) is list or isinstance(value, _TrackedList):
+        return value if getattr(value, "_owner", None) is owner else _TrackedList(owner, value)
+    return value
+
+
+class _TrackedDict(dict):
+    """
+    dict attribute of RenderTracked node, which invalidates the node when it's changed.
+    Nested dicts and lists are tracked when they are got by key.
+    """
+
+    def __init__(self, owner, *args):
+        super().__init__(*args)
+        self._owner = owner
+
+    def invalidate(self):
+        self._owner.invalidate()
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        tracked = _tracked(value, self._owner)
+        if tracked is not value:
+            dict.__setitem__(self, key, tracked)
+        return tracked
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    __setitem__ = _invalidating(dict.__setitem__)
+    __delitem__ = _invalidating(dict.__delitem__)
+    if hasattr(dict, "__ior__"):
+        __ior__ = _invalidating(dict.__ior__)
+    clear = _invalidating(dict.clear)
+    pop = _invalidating(dict.pop)
+    popitem = _invalidating(dict.popitem)
+    update = _invalidating(dict.update)
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class _TrackedList(list):
+    """
+    list attribute of RenderTracked node, which invalidates the node when it's changed.
+    Nested dicts and lists are tracked when they are got by index.
+    """
+
+    def __init__(self, owner, *args):
+        super().__init__(*args)
+        self._owner = owner
+
+    def invalidate(self):
+        self._owner.invalidate()
+
+    def __getitem__(self, index):
+        value = list.__getitem__(self, index)
+        if isinstance(index, slice):
+            return value
+        tracked = _tracked(value, self._owner)
+        if tracked is not value:
+            list.__setitem__(self, index, tracked)
+        return tracked
+
+    __setitem__ = _invalidating(list.__setitem__)
+    __delitem__ = _invalidating(list.__delitem__)
+    __iadd__ = _invalidating(list.__iadd__)
+    __imul__ = _invalidating(list.__imul__)
+    append = _invalidating(list.append)
+    extend = _invalidating(list.extend)
+    insert = _invalidating(list.insert)
+    pop = _invalidating(list.pop)
+    remove = _invalidating(list.remove)
+    clear = _invalidating(list.clear)
+    sort = _invalidating(list.sort)
+    reverse = _invalidating(list.reverse)
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+class EventHandler(RenderCache, JS):
+    """
+    Attributes
+    -----------
+    bind: when the handler is bound. None binds it when the script runs.
+          "idle" binds handlers a few at a time while the browser is idle (requestIdleCallback or setTimeout),
+          "visible" binds it to each element when it scrolls into view (IntersectionObserver, or at once),
+          "first-interaction" binds it on the first pointerdown, focusin or keydown on the document.
+    """
+
+    # initial value of `window.__jsrope_bind`, the scheduler of deferred binding
+    runtime = ("(function(){"
+               "var q=[],t=0,f=[],o=null,done=0,v=[\"pointerdown\",\"focusin\",\"keydown\"];"
+               "function idle(c){(window.requestIdleCallback||function(c){return setTimeout(function(){"
+               "var s=Date.now();c({didTimeout:false,timeRemaining:function(){return Math.max(0,8-(Date.now()-s))}})"
+               "},1)})(c,{timeout:2000})}"
+               "function run(d){do{var b=q.shift();b[1](b[0]())}while(q.length&&(d.didTimeout||d.timeRemaining()>0));"
+               "if(q.length){idle(run)}else{t=0}}"
+               "function first(){if(done){return}done=1;"
+               "v.forEach(function(n){document.removeEventListener(n,first,true)});"
+               "var b=f;f=[];b.forEach(function(b){b[1](b[0]())})}"
+               "function on(n,h){return function(el){el.on(n,h)}}"
+               "return{idle:function(e,n,h){q.push([e,on(n,h)]);if(!t){t=1;idle(run)}},"
+               "\"first-interaction\":function(e,n,h){var b=on(n,h);if(done){return b(e())}if(!f.length){"
+               "v.forEach(function(n){document.addEventListener(n,first,true)})}"
+               "f.push([e,b])},"
+               "visible:function(e,n,h){var b=on(n,h);if(!window.IntersectionObserver){return b(e())}"
+               "o=o||new window.IntersectionObserver(function(es){es.forEach(function(x){if(!x.isIntersecting){return}"
+               "o.unobserve(x.target);var l=x.target.__jsrope_bind||[];x.target.__jsrope_bind=[];"
+               "l.forEach(function(b){b($(x.target))})})});"
+               "e().each(function(){if(this.nodeType!==1){return b($(this))}"
+               "(this.__jsrope_bind=this.__jsrope_bind||[]).push(b);o.observe(this)})}}})()")
+
+    def __init__(self, element, event, handler, bind=None):
         super().__init__()
+        if bind not in (None, "idle", "visible", "first-interaction"):
+            raise ValueError("bind of {} has to be None, 'idle', 'visible' or 'first-interaction', not {!r}".format(
+                type(self).__name__, bind))
         self.element = element
         self.event = event
         self.handler = handler
+        self.bind = bind
 
     def to_code(self):
-        return Code(str(self))
+        return self._cached_code()
 
     def __hash__(self):
         return id(self)
@@ -201,10 +546,20 @@ class EventHandler(JS):
         return "{}({},{},{})".format(type(self).__name__, repr(self.element), repr(self.event), repr(self.handler))
 
     def __str__(self):
-        return "{}.on('{}',function(e){{{}}})".format(self.element.to_code(), self.event, self.handler.to_code())
+        return self._cached_code()
+
+    def _render(self):
+        body = self.handler.to_code()
+        if telemetry.config:
+            body = telemetry.config.wrap_body("{}:{}".format(self.element.to_code(), self.event), body)
+        if self.bind:
+            mode = "[{}]".format(js_json(self.bind)) if "-" in self.bind else ".{}".format(self.bind)
+            return "{}{}(function(){{return {}}},'{}',function(e){{{}}})".format(
+                _runtime("__jsrope_bind", self.runtime), mode, self.element.to_code(), self.event, body)
+        return "{}.on('{}',function(e){{{}}})".format(self.element.to_code(), self.event, body)
 
     def prettify(self):
-        return jsbeautifier.beautify(str(self))
+        return beautify(str(self))
 
 
 class BaseJS(JS):
@@ -233,27 +588,30 @@ class BaseJS(JS):
         Returns jsrope.Int object made with self.code and explicit type declaration
         :return: Int()
         """
-        return Int(self._operation("parseInt").to_code(), True)
+        operation = self._operation("parseInt")
+        return _wrapped(Int(operation.to_code(), True), operation)
 
     def to_str(self):
         """
         Returns jsrope.Str object made with self.code and explicit type declaration
         :return: Str()
         """
-        return Str(self._operation("String").to_code(), True)
+        operation = self._operation("String")
+        return _wrapped(Str(operation.to_code(), True), operation)
 
     def to_float(self):
         """
         Returns jsrope.Float object made with self.code and explicit type declaration
         :return: Float()
         """
-        return Float(self._operation("parseFloat").to_code(), True)
+        operation = self._operation("parseFloat")
+        return _wrapped(Float(operation.to_code(), True), operation)
 
     def prettify(self):
         """
         Return prettified self.code
         """
-        return Code(jsbeautifier.beautify(self.to_code()))
+        return Code(beautify(self.to_code()))
 
     def to_code(self):
         return self.code
@@ -265,15 +623,81 @@ class BaseJS(JS):
         return self.to_code()
 
     def __hash__(self):
-        return id(self.__class__) + self.to_code().__hash__()
+        h = self.__dict__.get("_hash")
+        if h is None:
+            h = id(self.__class__) + self.to_code().__hash__()
+            if self.__dict__.get("_interned"):
+                self.__dict__["_hash"] = h
+        return h
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop("_hash", None)
+        state.pop("_interned", None)
+        return state
+
+
+class _Interning(threading.local):
+    def __init__(self):
+        self.enabled = False
+
+
+_interning = _Interning()
+_intern_table = weakref.WeakValueDictionary()
+_intern_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def interned(enabled=True):
+    """
+    Within the block, Object, Bool, Int, Str, Float and Promise made with the same arguments are the same object,
+    kept in a weak-value table, so repeated nodes share memory and equal nodes are found by identity.
+    The hash of interned node is computed once. Don't change attributes of interned nodes.
+    """
+    previous = _interning.enabled
+    _interning.enabled = enabled
+    try:
+        yield
+    finally:
+        _interning.enabled = previous
 
 
 class Object(BaseJS):
+    # whether instances are interned in `interned()`
+    _internable = True
+
+    def __new__(cls, *args, **kwargs):
+        if not (_interning.enabled and cls._internable and (args or "code" in kwargs)):
+            return super().__new__(cls)
+        code = args[0] if args else kwargs["code"]
+        code = code.to_code() if isinstance(code, JS) else code
+        if isinstance(code, str):
+            code = str(code)
+        elif not isinstance(code, (bool, int, float)):
+            return super().__new__(cls)
+        explicit = args[1] if len(args) > 1 else kwargs.get("explicit", False)
+        handler = args[2] if len(args) > 2 else kwargs.get("handler")
+        key = (cls, type(code), code, bool(explicit), handler)
+        try:
+            with _intern_lock:
+                obj = _intern_table.get(key)
+                if obj is None:
+                    obj = super().__new__(cls)
+                    obj.__dict__["_interned"] = True
+                    _intern_table[key] = obj
+        except TypeError:
+            # unhashable handler
+            return super().__new__(cls)
+        return obj
+
     def __init__(self, code, explicit=False, handler=None):
+        if self.__dict__.get("_interned") and "code" in self.__dict__:
+            # interned node made before
+            return
         super().__init__(code=code, explicit=explicit, handler=handler)
 
 
-class Element(BaseJS):
+class Element(RenderTracked, BaseJS):
     def __init__(self, selector=""):
         super().__init__()
         self.is_selector = False
@@ -306,6 +730,47 @@ class Element(BaseJS):
 
         return elem
 
+    @classmethod
+    def render_many(cls, tag, rows, compact=False, **attributes):
+        """
+        Return one HTML string of many `tag` elements, to insert them with one statement.
+        e.g. Element.by_tag("ul").change_inner_html(Element.render_many("li", rows, class_="item"))
+
+        :param tag: str
+        :param rows: iterable of text content, or of dict of attributes with text content as "content".
+                     Values are escaped.
+        :param compact: if True, return the code that builds the HTML in browser from one template and
+                        an array of per-row values, which is smaller when `attributes` are long.
+        :param attributes: attributes common to all rows. Trailing "_" is removed from names (`class_`),
+                           and other "_" are replaced by "-" (`data_id`).
+        :return: Code()
+        """
+        if not _tag_name.match(tag):
+            raise ValueError("Invalid tag name '{}' for jsrope.Element.render_many".format(tag))
+        common = "".join([_html_attribute(k, v) for k, v in attributes.items()])
+
+        data = []
+        has_attributes = False
+        for row in rows:
+            if isinstance(row, dict):
+                attrs = "".join([_html_attribute(k, v) for k, v in row.items() if k != "content"])
+                content = row.get("content")
+                has_attributes = has_attributes or bool(attrs)
+            else:
+                attrs, content = "", row
+            data.append((attrs, "" if content is None else html.escape(str(content))))
+
+        if not compact:
+            return Code(js_string("".join(["<{0}{1}{2}>{3}</{0}>".format(tag, common, attrs, content)
+                                           for attrs, content in data])))
+
+        if has_attributes:
+            row, data = "d[i][0]+\">\"+d[i][1]", [list(x) for x in data]
+        else:
+            row, data = "\">\"+d[i]", [content for _, content in data]
+        return Code("(function(d){{for(var h=\"\",i=0;i<d.length;i++){{h+={}+{}+{}}}return h}})({})".format(
+            js_string("<{}{}".format(tag, common)), row, js_string("</{}>".format(tag)), js_json(data)))
+
     @classmethod
     def by(cls, method, key):
         try:
@@ -337,14 +802,25 @@ class Element(BaseJS):
         elem.is_selector = True
         return elem
 
-    def on(self, event, flow):
-        return EventHandler(self, event, flow)
+    def on(self, event, flow, bind=None):
+        """
+        :param bind: None, "idle", "visible" or "first-interaction". See `EventHandler`.
+        """
+        return EventHandler(self, event, flow, bind=bind)
+
+    def _write(self, method, value, obj=None):
+        """
+        Return Expression that calls `method` with `value` (code of `obj`), which `Batch` can defer.
+        """
+        write = Expression("{}.{}({})".format(self.to_code(), method, value))
+        write._dom_write = (self.to_code(), method, value)
+        return _link(write, obj)
 
     def _change_attr(self, attr, value):
-        if isinstance(value, Code):
-            return Expression("{}.{}({})".format(self.to_code(), attr, value))
+        if isinstance(value, (Code, JS)):
+            return self._write(attr, str(value), value)
         elif isinstance(value, str):
-            return Expression("{}.{}('{}')".format(self.to_code(), attr, value.replace("'", "\\'")))
+            return self._write(attr, "'{}'".format(value.replace("'", "\\'")))
 
     def _get_attr(self, attr):
         return Object("{}.{}()".format(self.to_code(), attr))
@@ -431,15 +907,32 @@ class Element(BaseJS):
         return "\"{}\"+{}{}\"{}\"".format(o, content, "+" if content else "", e)
 
     def append(self, obj):
-        return "{}.append({})".format(str(self), escape(obj))
+        return self._write("append", escape(obj), obj)
 
     def __str__(self):
+        self._track()
         if self.is_selector:
             return str(self.element)
         else:
             return self.create_element()
 
 
+_tag_name = re.compile(r"^[A-Za-z][\w-]*$")
+
+
+def _html_attribute(name, value):
+    name = name.rstrip("_").replace("_", "-")
+    if not _tag_name.match(name):
+        raise ValueError("Invalid attribute name '{}'".format(name))
+    if value is None or value is False:
+        return ""
+    elif value is True:
+        return " {}".format(name)
+    elif isinstance(value, (list, tuple, set)):
+        value = " ".join([str(x) for x in value])
+    return " {}=\"{}\"".format(name, html.escape(str(value)))
+
+
 def find_element_by(method, key):
     if method not in element_by_methods:
         raise ValueError("Invalid argument '{}' for 'method' of jsrope.find_element_by".format(method))
@@ -544,6 +1037,68 @@ class Float(Object):
         return round(self, n)
 
 
+class Promise(Object):
+    """
+    The class that express Promise object.
+    Flows given to `then` and `catch` can use the resolved value (or the error) as `argument`.
+    """
+
+    def __init__(self, code="", explicit=False, handler=None):
+        super().__init__(code=code, explicit=explicit, handler=handler)
+
+    @staticmethod
+    def _callback(flow, argument):
+        if isinstance(flow, Function):
+            return flow.name or flow.to_code()
+        return "function({}){{{}}}".format(argument, flow)
+
+    def then(self, flow, argument="value"):
+        """
+        :param flow: Function, or Flow (or anything JS) to run with `argument`
+        :return: Promise()
+        """
+        return _link(Promise("{}.then({})".format(self.to_code(), self._callback(flow, argument))), self, flow)
+
+    def catch(self, flow, argument="error"):
+        """
+        :param flow: Function, or Flow (or anything JS) to run with `argument`
+        :return: Promise()
+        """
+        return _link(Promise("{}.catch({})".format(self.to_code(), self._callback(flow, argument))), self, flow)
+
+
+class Data(Object):
+    """
+    The class that embeds Python data (anything `json` can serialize) in the code.
+
+    Data longer than `threshold` characters is embedded as `JSON.parse('...')`,
+    which browsers parse faster than object literal. Code is safe to put in <script>.
+    NaN and infinity raise ValueError, as JSON can't express them.
+
+    Attributes
+    -----------
+    obj: The data
+    threshold: Length of JSON from which JSON.parse is used
+    """
+
+    threshold = 10 * 1024
+    _internable = False
+
+    def __init__(self, obj, threshold=None, handler=None):
+        if threshold is not None:
+            self.threshold = threshold
+        text = (json.dumps(obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+                .replace("<", "\\u003c").replace(">", "\\u003e")
+                .replace("\u2028", "\\u2028").replace("\u2029", "\\u2029"))
+        if len(text) > self.threshold:
+            text = "JSON.parse('{}')".format(text.replace("\\", "\\\\").replace("'", "\\'"))
+        super().__init__(code=text, explicit=True, handler=handler)
+        self.obj = obj
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, repr(self.obj))
+
+
 class Return(BaseJS):
     """
     The class for express return expression
@@ -583,6 +1138,153 @@ class If(JS):
         self.flow = flow
 
 
+_precedence = {"**": 14, "*": 13, "/": 13, "%": 13, "+": 12, "-": 12, "<<": 11, ">>": 11, ">>>": 11,
+               "<": 10, "<=": 10, ">": 10, ">=": 10, "==": 9, "!=": 9, "===": 9, "!==": 9,
+               "&": 8, "^": 7, "|": 6, "&&": 5, "||": 4}
+_right_associative = ("**",)
+# made by `iadd`, `isub`, `imul`, `idiv` and `ipow`. Their right side is always a unit.
+_assignment_operators = ("+=", "-=", "*=", "/=", "**=")
+_pure_functions = ("parseInt", "parseFloat", "String", "Number", "Boolean")
+_identifier = re.compile(r"^[A-Za-z_$][\w$]*$")
+_number = re.compile(r"^\d+(\.\d+)?$")
+_assignment = re.compile(r"(?<![\w$.])([A-Za-z_$][\w$]*)(?:\s*(?:\.[A-Za-z_$][\w$]*|\[[^\]]*\]))*"
+                         r"\s*(?:\*\*|<<|>>>|>>|[-+*/%&|^])?=(?!=)"
+                         r"|(?:\+\+|--)\s*([A-Za-z_$][\w$]*)|([A-Za-z_$][\w$]*)\s*(?:\+\+|--)")
+
+
+def _link(obj, *refs):
+    """
+    Let `obj` remember jsrope objects its code was made from (e.g. the Function it calls), for `Script`.
+    """
+    refs = [x for x in refs if isinstance(x, (JS, dict, list, tuple))]
+    if refs and hasattr(obj, "__dict__"):
+        obj._refs = refs
+    return obj
+
+
+def _built(obj, code, expr):
+    """
+    Let `obj` made from `code` remember how it was built. `expr` is (kind, operation, operands).
+    Some classes wrap the code with parentheses, which is kept as the 4th item.
+    """
+    if obj.to_code() == code:
+        obj._expr = (*expr, False)
+    elif obj.to_code() == "({})".format(code):
+        obj._expr = (*expr, True)
+    return obj
+
+
+def _wrapped(obj, operation):
+    """
+    Let `obj` made from the code of `operation` remember how `operation` was built.
+    """
+    expr = getattr(operation, "_expr", None)
+    if expr is not None and not expr[3]:
+        _built(obj, operation.to_code(), expr[:3])
+    elif expr is not None and obj.to_code() == operation.to_code():
+        obj._expr = expr
+    return obj
+
+
+def _expression_code(node, index, names):
+    """
+    Render `node` as `index`th operand of its parent, replacing nodes in `names` (id: name).
+    """
+    if id(node) in names:
+        return names[id(node)]
+    expr = getattr(node, "_expr", None) if isinstance(node, JS) else None
+    if expr is None:
+        return node.to_code() if index == 0 and isinstance(node, JS) else str(node)
+    kind, operation, operands, wrapped = expr
+    parts = [_expression_code(x, i, names) for i, x in enumerate(operands)]
+    if kind == "binary":
+        code = "{} {} {}".format(parts[0], operation, parts[1])
+    else:
+        code = "{}({})".format(operation, ", ".join(parts))
+    return "({})".format(code) if wrapped else code
+
+
+def _is_invariant(node, assigned, memo):
+    if id(node) in memo:
+        return memo[id(node)]
+    expr = getattr(node, "_expr", None) if isinstance(node, JS) else None
+    if expr is None:
+        if isinstance(node, (JS, str)):
+            code = str(node)
+            result = bool(_number.match(code) or (_identifier.match(code) and code not in assigned))
+        elif isinstance(node, (int, float)) and not isinstance(node, bool):
+            result = node >= 0
+        else:
+            result = False
+    else:
+        kind, operation, operands, _ = expr
+        if kind == "binary":
+            pure = operation in _precedence
+        else:
+            pure = operation in _pure_functions or (operation.startswith("Math.") and operation != "Math.random")
+        result = pure and all([_is_invariant(x, assigned, memo) for x in operands])
+    memo[id(node)] = result
+    return result
+
+
+def _find_invariants(node, assigned, unit, memo, found):
+    """
+    Collect the largest loop invariant operations in `node` which are also a unit in the rendered code.
+    """
+    expr = getattr(node, "_expr", None) if isinstance(node, JS) else None
+    if expr is None:
+        return
+    kind, operation, operands, _ = expr
+    if unit and _is_invariant(node, assigned, memo):
+        found.append(node)
+        return
+    for i, x in enumerate(operands):
+        child = getattr(x, "_expr", None) if isinstance(x, JS) else None
+        if kind != "binary" or child is None or child[0] != "binary" or child[3]:
+            child_unit = True
+        elif operation in _assignment_operators:
+            child_unit = i == 1
+        elif operation not in _precedence or child[1] not in _precedence:
+            child_unit = False
+        else:
+            outer, inner = _precedence[operation], _precedence[child[1]]
+            child_unit = unit and (inner > outer or (inner == outer and (i == 1) == (operation in _right_associative)))
+        _find_invariants(x, assigned, child_unit, memo, found)
+
+
+def hoist_invariants(targets, scope):
+    """
+    Find operations in `targets` which don't depend on variables assigned in `scope`,
+    and return (declarations, rewritten targets). Declarations are `const` statements to put before the loop.
+
+    Only operations built with jsrope operators (e.g. `num ** 0.5`, `Math.floor`, `parseInt`) are hoisted.
+    Variables assigned by functions called in the loop are not detected.
+    """
+    assigned = set()
+    for code in scope:
+        for match in _assignment.finditer(str(code)):
+            assigned.update([x for x in match.groups() if x])
+
+    names = {}
+    declarations = []
+    rewritten = []
+    memo = {}
+    for target in targets:
+        found = []
+        if _expression_code(target, -1, {}) != str(target):
+            rewritten.append(target)
+            continue
+        _find_invariants(target, assigned, True, memo, found)
+        for node in found:
+            code = _expression_code(node, -1, {})
+            if code not in names:
+                names[code] = "_jsrope_inv{}".format(len(declarations))
+                declarations.append("const {} = {};".format(names[code], code))
+        rewritten.append(_expression_code(target, -1, {id(node): names[_expression_code(node, -1, {})]
+                                                        for node in found}))
+    return "".join(declarations), rewritten
+
+
 class For(JS):
     """
     The class for express for expression
@@ -594,15 +1296,24 @@ class For(JS):
     condition: condition for for
     after: WHat to do after running flow
     flow: What to do if condition was truthy
+    hoist: Whether loop invariant operations in condition and after are computed once before the loop
     """
 
-    def __init__(self, init="", condition="", after="", flow=""):
+    def __init__(self, init="", condition="", after="", flow="", hoist=False):
         super().__init__()
-        self.code = Expression("for({};{};{}){{{}}}".format(init, condition, after, flow))
+        if hoist:
+            declarations, (_condition, _after) = hoist_invariants([condition, after], [init, condition, after, flow])
+        else:
+            declarations, _condition, _after = "", condition, after
+        if declarations:
+            self.code = Expression("{{{}for({};{};{}){{{}}}}}".format(declarations, init, _condition, _after, flow))
+        else:
+            self.code = Expression("for({};{};{}){{{}}}".format(init, _condition, _after, flow))
         self.init = init
         self.condition = condition
         self.after = after
         self.flow = flow
+        self.hoist = hoist
 
 
 class While(JS):
@@ -614,21 +1325,45 @@ class While(JS):
     code: The JavaScript code
     condition: condition for while
     flow: What to do if condition was truthy
+    hoist: Whether loop invariant operations in condition are computed once before the loop
     """
 
-    def __init__(self, condition="", flow=""):
+    def __init__(self, condition="", flow="", hoist=False):
         super().__init__()
-        self.code = Expression("while({}){{{}}}".format(condition, flow))
+        if hoist:
+            declarations, (_condition,) = hoist_invariants([condition], [condition, flow])
+        else:
+            declarations, _condition = "", condition
+        if declarations:
+            self.code = Expression("{{{}while({}){{{}}}}}".format(declarations, _condition, flow))
+        else:
+            self.code = Expression("while({}){{{}}}".format(_condition, flow))
+        self.condition = condition
+        self.flow = flow
+        self.hoist = hoist
 
 
-class Switch(dict, JS):
+class Switch(RenderCache, dict, JS):
     def __new__(cls, *args, **kwargs):
         return dict.__new__(cls, *args, **kwargs)
 
+    __setitem__ = _invalidating(dict.__setitem__)
+    __delitem__ = _invalidating(dict.__delitem__)
+    if hasattr(dict, "__ior__"):
+        __ior__ = _invalidating(dict.__ior__)
+    clear = _invalidating(dict.clear)
+    pop = _invalidating(dict.pop)
+    popitem = _invalidating(dict.popitem)
+    setdefault = _invalidating(dict.setdefault)
+    update = _invalidating(dict.update)
+
     def to_code(self):
-        return Code(str(self))
+        return self._cached_code()
 
     def __str__(self):
+        return self._cached_code()
+
+    def _render(self):
         code = ""
         for condition, action in self.items():
             if isinstance(condition, JS):
@@ -647,14 +1382,21 @@ class Switch(dict, JS):
         return "{}({})".format(type(self).__name__, dict(self))
 
     def prettify(self):
-        return jsbeautifier.beautify(str(self))
+        return beautify(str(self))
 
 
-class Flow(JS):
-    def __init__(self, *actions):
+class Flow(RenderCache, JS):
+    _page = True
+
+    def __init__(self, *actions, lazy=False):
+        """
+        :param lazy: if True (or `jsrope.chunks.ChunkRegistry`), actions are put in a chunk
+                     which is loaded when the flow runs first time
+        """
         super().__init__()
         self.events = []
         self.events.extend([*actions])
+        self.lazy = lazy
 
     def add(self, action):
         """
@@ -664,16 +1406,35 @@ class Flow(JS):
         """
         if not isinstance(action, str):
             raise TypeError("action has to be str")
+        code = self.__dict__.get("_render_code")
+        if self.__dict__.get("_render_generation") != RenderCache._generation:
+            code = None
+        runtimes = self.__dict__.get("_render_runtimes", {})
         self.events.append(action)
+        self.invalidate()
+        if code is not None and type(self)._render is Flow._render and not self.lazy:
+            action = action.to_code() if isinstance(action, JS) else action
+            self.__dict__["_render_code"] = Code("{};{}".format(code, action) if len(self.events) > 1 else action)
+            self.__dict__["_render_runtimes"] = runtimes
 
     def to_code(self):
-        return Code(str(self))
+        return self._cached_code()
 
     def __hash__(self):
         return id(self)
 
     def __str__(self):
-        return ";".join([e.to_code() if isinstance(e, JS) else e for e in self.events])
+        return self._cached_code()
+
+    def _render(self):
+        return self._chunked(";".join([e.to_code() if isinstance(e, JS) else e for e in self.events]))
+
+    def _chunked(self, code):
+        if not self.lazy:
+            return code
+        # `e` of EventHandler is passed if the flow is in it
+        return "{}.then(function(f){{f(typeof e===\"undefined\"?undefined:e)}})".format(
+            _registry(self.lazy).load("function(e){{{}}}".format(code)))
 
     def prettify(self):
         return Code(self.to_code().prettify())
@@ -682,8 +1443,66 @@ class Flow(JS):
         return "{}({})".format(type(self).__name__, repr(self.events))
 
 
-class Function(JS):
-    def __init__(self, name, arguments, flow):
+class Batch(Flow):
+    """
+    Flow that defers DOM writes (`Element.change_value`, `Element.change_inner_html` and `Element.append`)
+    to the next animation frame. Values of writes are evaluated in place, so all reads in the batch
+    happen before any write. Appends to one element are built into a DocumentFragment and inserted once.
+
+    Writes in nested Flow, If, For, While and Switch are deferred too, but not the ones in Function or EventHandler.
+    """
+
+    # code of `window.__jsrope_batch`, which is defined once per page
+    runtime = ("{q:[],m:new Map(),t:0,w:function(e,k,v){var s=this;"
+               "if(k===\"append\"&&e.length===1){var n=e[0],f=s.m.get(n);"
+               "if(!f){f=document.createDocumentFragment();s.m.set(n,f);s.q.push(function(){n.appendChild(f)})}"
+               "$(f).append(v)}"
+               "else{e.each(function(){s.m.delete(this)});s.q.push(function(){e[k](v)})}"
+               "if(!s.t){s.t=1;(window.requestAnimationFrame||function(c){return setTimeout(c,16)})(function(){"
+               "var q=s.q;s.q=[];s.m=new Map();s.t=0;for(var i=0;i<q.length;i++){q[i]()}})}}}")
+
+    def _render(self):
+        return self._chunked(";".join([_batched(e) for e in self.events]))
+
+
+def _registry(lazy):
+    """
+    Return ChunkRegistry for `lazy` option
+    """
+    return lazy if isinstance(lazy, chunks.ChunkRegistry) else chunks.registry
+
+
+def _batched(action):
+    """
+    Return `action` whose DOM writes are queued to `window.__jsrope_batch`.
+    """
+    if isinstance(action, str) and hasattr(action, "_dom_write"):
+        return "{}.w({},'{}',{})".format(_runtime("__jsrope_batch", Batch.runtime), *action._dom_write)
+    elif isinstance(action, RenderCache):
+        # keep tracking changes of the original node
+        action.to_code()
+    if isinstance(action, Flow):
+        return Flow(*[_batched(e) for e in action.events]).to_code()
+    elif isinstance(action, Switch):
+        return Switch({k: _batched(v) for k, v in action.items()}).to_code()
+    elif isinstance(action, If):
+        return If(action.condition, _batched(action.flow)).to_code()
+    elif isinstance(action, For):
+        return For(action.init, action.condition, action.after, _batched(action.flow), hoist=action.hoist).to_code()
+    elif isinstance(action, While):
+        return While(action.condition, _batched(action.flow), hoist=action.hoist).to_code()
+    return action.to_code() if isinstance(action, JS) else action
+
+
+class Function(RenderCache, JS):
+    def __init__(self, name, arguments, flow, worker=False, pool_size=4, lazy=False):
+        """
+        :param worker: if True, run `flow` in inline Web Workers. Calling the function returns `Promise`.
+                       `flow` can't touch DOM, and arguments and the returned value have to be cloneable.
+        :param pool_size: max number of workers kept for the function
+        :param lazy: if True (or `jsrope.chunks.ChunkRegistry`), the body is put in a chunk which is loaded
+                     on first call. Calling the function returns `Promise`.
+        """
         super().__init__()
         assert isinstance(name, str)
         assert isinstance(arguments, collections.abc.Mapping)
@@ -692,6 +1511,11 @@ class Function(JS):
         self.name = name
         self.arguments = arguments
         self.flow = flow
+        self.worker = worker
+        self.pool_size = pool_size
+        self.lazy = lazy
+        if worker and lazy:
+            raise ValueError("worker and lazy of {} can't be used together".format(type(self).__name__))
         self.code = self.to_code()
 
     def __call__(self, *args, **kwargs):
@@ -710,10 +1534,11 @@ class Function(JS):
 
         argument_str = ", ".join([str(v) if v is not None else "" for v in argument.values()])
 
+        result = Promise if self.worker or self.lazy else Object
         if self.name:
-            return Object("{}({})".format(self.name, argument_str))
+            return _link(result("{}({})".format(self.name, argument_str)), self, *argument.values())
         else:
-            return Object("({})({})".format(self.to_code(), argument_str))
+            return _link(result("({})({})".format(self.to_code(), argument_str)), self, *argument.values())
 
     def _argument_to_code(self):
         args = []
@@ -725,12 +1550,59 @@ class Function(JS):
         return ", ".join(args)
 
     def to_code(self):
-        return Code(str(self))
+        return self._cached_code()
 
     def prettify(self):
         return Code(self.to_code().prettify())
 
     def __str__(self):
+        return self._cached_code()
+
+    def _worker_pool(self):
+        """
+        Return the code that makes the worker pool, which is a function taking arguments array and returning Promise.
+
+        Message from page is {args: [...]}, and message from worker is {value: ...} or {error: "..."}.
+        """
+        source = ("self.onmessage=function(m){{Promise.resolve().then(function(){{"
+                  "return (function({}){{{}}}).apply(null,m.data.args)}})"
+                  ".then(function(v){{self.postMessage({{value:v}})}},"
+                  "function(e){{self.postMessage({{error:String(e)}})}})}}").format(", ".join(self.arguments),
+                                                                                  self.flow)
+        return ("(function(){{"
+                "var url=URL.createObjectURL(new Blob([{source}],{{type:\"text/javascript\"}})),"
+                "idle=[],all=0,queue=[];"
+                "function next(){{while(queue.length){{var w=idle.pop();"
+                "if(!w){{if(all>={size}){{return}}w=new Worker(url);all++}}run(w,queue.shift())}}}}"
+                "function run(w,t){{"
+                "w.onmessage=function(m){{idle.push(w);"
+                "if(\"error\" in m.data){{t[2](new Error(m.data.error))}}else{{t[1](m.data.value)}}next()}};"
+                "w.onerror=function(e){{e.preventDefault();w.terminate();all--;t[2](e);next()}};"
+                "w.postMessage({{args:t[0]}})}}"
+                "return function(args){{return new Promise(function(resolve,reject){{"
+                "queue.push([args,resolve,reject]);next()}})}}}})()").format(source=js_string(source),
+                                                                             size=int(self.pool_size))
+
+    def _render(self):
+        if self.lazy:
+            load = _registry(self.lazy).load("function({}){{{}}}".format(", ".join(self.arguments), self.flow))
+            # named arguments (with their defaults) are passed as an array made outside,
+            # so their names don't clash with the loaded function
+            call = "{{return {}.then(function(a){{return function(f){{return f.apply(null,a)}}}}([{}]))}}".format(
+                load, ", ".join(self.arguments))
+            if self.name:
+                return "function {}({}) {}".format(self.name, self._argument_to_code(), call)
+            return "function({}) {}".format(self._argument_to_code(), call)
+        if self.worker:
+            names = ", ".join(self.arguments)
+            if self.name:
+                return "function {name}({}) {{return ({name}.__jsrope_pool={name}.__jsrope_pool||{})([{}])}}".format(
+                    self._argument_to_code(), self._worker_pool(), names, name=self.name)
+            # one pool per body, shared by every place the function is rendered or called
+            pool = self._worker_pool()
+            key = hashlib.sha256(pool.encode()).hexdigest()[:16]
+            return "function({}) {{return {}([{}])}}".format(
+                self._argument_to_code(), _runtime("__jsrope_pool_{}".format(key), pool), names)
         if self.name:
             return "function {}({}) {{{}}}".format(self.name, self._argument_to_code(), self.flow)
         else:
@@ -740,8 +1612,22 @@ class Function(JS):
         return "{}({}, {}, {})".format(type(self).__name__, repr(self.name), repr(self.arguments), repr(self.flow))
 
 
-class Ajax(JS):
-    def __init__(self, url, settings, done=None, fail=None, always=None, ignore_error=True):
+class Ajax(RenderTracked, JS):
+    def __init__(self, url, settings, done=None, fail=None, always=None, ignore_error=True, delta=False,
+                 cache_ttl=None, cache_size=100, latest=False, packed=None):
+        """
+        :param delta: if True, send only the keys of settings["data"] changed since the last successful request.
+                      Server side has to merge them with `jsrope.flask.ajax_handler`.
+        :param cache_ttl: if given, keep responses of GET request in the page for `cache_ttl` seconds,
+                          keyed by url and data.
+        :param cache_size: max number of responses kept with `cache_ttl`
+        :param latest: if True (or name of the call site), abort the previous request of the same call site
+                       when new one starts, and ignore responses of superseded requests.
+                       Call sites are distinguished by url if True.
+        :param packed: dict of top-level key of settings["data"] and dtype ("int8", "uint8", "int16", "uint16",
+                       "int32", "uint32", "float32" or "float64"). The array is sent as one base64 string
+                       of its bytes, which `jsrope.flask.ajax_handler` decodes at once.
+        """
         super().__init__()
         self.url = url
         assert isinstance(settings, dict)
@@ -750,8 +1636,36 @@ class Ajax(JS):
         self.fail = fail
         self.always = always
         self.ignore_error = ignore_error
-
-    def parse_setting(self):
+        self.delta = delta
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.latest = latest
+        self.packed = packed or {}
+        for k, dtype in self.packed.items():
+            if dtype not in packed_types:
+                raise ValueError("dtype {!r} of {} can't be packed".format(dtype, k))
+        if latest and (delta or cache_ttl):
+            raise ValueError("latest of {} can't be used with delta or cache_ttl".format(type(self).__name__))
+        if cache_ttl:
+            if self.method != "GET":
+                raise ValueError("cache_ttl of {} is only for GET request".format(type(self).__name__))
+            if delta:
+                raise ValueError("cache_ttl and delta of {} can't be used together".format(type(self).__name__))
+
+    @property
+    def method(self):
+        """
+        HTTP method this request uses
+        """
+        if "dataType" in self.settings and self.settings["dataType"] == "script":
+            return "GET"
+        elif "type" in self.settings:
+            return self.settings["type"].upper()
+        elif "method" in self.settings:
+            return self.settings["method"].upper()
+        return "GET"
+
+    def parse_setting(self, skip=()):
         def bool_handler(_k, _v):
             return "{}: {}".format(_k, "true" if _v else "false")
 
@@ -769,6 +1683,11 @@ class Ajax(JS):
                    "traditional": bool_handler, "username": str_handler, "xhr": str_handler,
                    "xhrFields": str_handler, "method": str_handler}
         for k, v in self.settings.items():
+            if k in skip:
+                continue
+            if k == "data" and self.packed:
+                yield "data: {}".format(self._data())
+                continue
             if k not in handler and not self.ignore_error:
                 raise ValueError("{} for the key of {}.settings is not allowed".format(k, type(self).__name__))
             c_handler = handler[k]
@@ -783,9 +1702,99 @@ class Ajax(JS):
     def to_code(self):
         return Code(str(self))
 
-    def __str__(self):
+    def _data(self):
+        """
+        Return the code of settings["data"], with arrays in `packed` replaced by base64 strings.
+        """
+        data = self.settings.get("data", {})
+        if not self.packed:
+            return escape(data)
+        pack = _runtime("__jsrope_pack", "function(a,t){"
+                                         "var b=new Uint8Array(new window[t](a).buffer),s=\"\";"
+                                         "for(var i=0;i<b.length;i+=32768){"
+                                         "s+=String.fromCharCode.apply(null,b.subarray(i,i+32768))}"
+                                         "return btoa(s)}")
+        return escape({k: Code("{}({},'{}')".format(pack, escape(v), packed_types[self.packed[k]]))
+                       if k in self.packed else v for k, v in data.items()})
+
+    def _delta_request(self):
+        """
+        Return the code that sends only changed keys of settings["data"] with the version token.
+        Acknowledged values are kept per url in `window.__jsrope_delta`, and the whole data is resent
+        when the server answers 409 (state lost or out of date).
+        """
+        params = ",".join(self.parse_setting(skip=("data",)))
+        site = escape(self.url)
+        # data is evaluated outside, so the names of the function don't shadow the page's variables
+        return ("(function(f){{"
+                "var g=window.__jsrope_delta=window.__jsrope_delta||"
+                "{{id:Math.random().toString(36).slice(2),sites:{{}}}};"
+                "var s=g.sites[{site}]=g.sites[{site}]||{{n:0,v:0,d:{{}}}};"
+                "var r=$.Deferred();"
+                "function send(full){{"
+                "var d={{}},c={{}},k=[];"
+                "for(var i in f){{c[i]=JSON.stringify(f[i]);if(full||s.d[i]!==c[i]){{d[i]=f[i];k.push(i)}}}}"
+                "var v=++s.n;"
+                "d.{client}=g.id;d.{base}=full?0:s.v;d.{version}=v;d.{keys}=k;"
+                "$.ajax({{url: \"{url}\",{params}{sep}data: d}})"
+                ".done(function(a,b,x){{if(v>s.v){{s.v=v;s.d=c}}r.resolve(a,b,x)}})"
+                ".fail(function(x,b,e){{if(x.status===409&&!full){{s.v=0;s.d={{}};send(true)}}"
+                "else{{r.reject(x,b,e)}}}})}}"
+                "send(false);return r.promise()}})({data})").format(
+            site=site, data=self._data(), client=delta_client_field, base=delta_base_field,
+            version=delta_version_field, keys=delta_keys_field, url=self.url, params=params,
+            sep="," if params else "")
+
+    def _cached_request(self):
+        """
+        Return the code that answers from responses kept in `window.__jsrope_cache` while they are fresh.
+        """
+        params = ",".join(self.parse_setting(skip=("data",)))
+        # data is evaluated outside, so the names of the function don't shadow the page's variables
+        return ("(function(d){{"
+                "var c=window.__jsrope_cache=window.__jsrope_cache||{{}};"
+                "c=c[{site}]=c[{site}]||{{keys:[],items:{{}}}};"
+                "var k=$.param(d),e=c.items[k],r=$.Deferred();"
+                "if(e&&e.t>Date.now()){{r.resolve.apply(r,e.a)}}"
+                "else{{$.ajax({{url: \"{url}\",{params}{sep}data: d}})"
+                ".done(function(a,b,x){{if(!(k in c.items)){{c.keys.push(k)}}"
+                "c.items[k]={{t:Date.now()+{ttl},a:[a,b,x]}};"
+                "while(c.keys.length>{size}){{delete c.items[c.keys.shift()]}}r.resolve(a,b,x)}})"
+                ".fail(function(x,b,e){{r.reject(x,b,e)}})}}"
+                "return r.promise()}})({data})").format(site=escape(self.url), data=self._data(),
+                                                        url=self.url, params=params, sep="," if params else "",
+                                                        ttl=int(self.cache_ttl * 1000), size=int(self.cache_size))
+
+    def _latest_request(self):
+        """
+        Return the code that aborts the previous request of this call site and resolves only the latest one.
+        """
         params = ",".join(self.parse_setting())
-        code = """$.ajax({{url: "{}",{}}})""".format(self.url, params)
+        site = escape(self.latest if isinstance(self.latest, str) else self.url)
+        # settings are evaluated outside, so the names of the function don't shadow the page's variables
+        return ("(function(o){{"
+                "var s=window.__jsrope_latest=window.__jsrope_latest||{{}};"
+                "s=s[{site}]=s[{site}]||{{n:0,x:null}};"
+                "if(s.x){{s.x.abort()}}"
+                "var n=++s.n,r=$.Deferred();"
+                "s.x=$.ajax(o)"
+                ".done(function(a,b,x){{if(n===s.n){{s.x=null;r.resolve(a,b,x)}}}})"
+                ".fail(function(x,b,e){{if(n===s.n){{s.x=null;r.reject(x,b,e)}}}});"
+                "return r.promise()}})({{url: \"{url}\",{params}}})").format(site=site, url=self.url, params=params)
+
+    def __str__(self):
+        self._track()
+        if self.delta and "data" in self.settings:
+            code = self._delta_request()
+        elif self.cache_ttl:
+            code = self._cached_request()
+        elif self.latest:
+            code = self._latest_request()
+        else:
+            params = ",".join(self.parse_setting())
+            code = """$.ajax({{url: "{}",{}}})""".format(self.url, params)
+        if telemetry.config:
+            code = telemetry.config.wrap_request("{} {}".format(self.method, self.url), code)
         if self.done:
             code += ".done({})".format(str(self.done))
         if self.fail:
@@ -798,7 +1807,173 @@ class Ajax(JS):
         return "{}('{}')".format(type(self).__name__, self.url)
 
     def prettify(self):
-        return jsbeautifier.beautify(str(self))
+        return beautify(str(self))
+
+
+class EventSource(RenderTracked, JS):
+    """
+    The class that subscribes Server-Sent Events stream (e.g. made with `jsrope.flask.event_stream`).
+
+    Attributes
+    -----------
+    url: url of the stream
+    events: dict of event name and Flow (or anything JS) to run. Flow can use the event as `e`,
+            and JSON decoded data as `data`. Function is called with (data, e).
+    with_credentials: Whether to send cookies to other origin
+    """
+
+    def __init__(self, url, events, with_credentials=False):
+        super().__init__()
+        assert isinstance(events, dict)
+        self.url = url
+        self.events = events
+        self.with_credentials = with_credentials
+
+    @property
+    def _refs(self):
+        # listeners which are Functions are called by name, so `Script` defines them
+        return [x for x in self.events.values() if isinstance(x, Function)]
+
+    def _listener(self, flow):
+        if isinstance(flow, Function):
+            return "function(e){{{}(JSON.parse(e.data),e)}}".format(flow.name or "({})".format(flow.to_code()))
+        return "function(e){{var data=JSON.parse(e.data);{}}}".format(flow.to_code() if isinstance(flow, JS) else flow)
+
+    def to_code(self):
+        return Code(str(self))
+
+    def __str__(self):
+        self._track()
+        listeners = "".join(["s.addEventListener({},{});".format(js_string(name), self._listener(flow))
+                             for name, flow in self.events.items()])
+        return "(function(){{var s=new EventSource({}{});{}return s}})()".format(
+            js_string(self.url), ",{withCredentials:true}" if self.with_credentials else "", listeners)
+
+    def __repr__(self):
+        return "{}('{}')".format(type(self).__name__, self.url)
+
+    def prettify(self):
+        return beautify(str(self))
+
+
+class VirtualList(RenderTracked, JS):
+    """
+    The class that shows a long list in a scrolling `container`, making DOM nodes only for the visible rows.
+    Row nodes are reused while scrolling, and rows from `url` are fetched a page at a time when they come in view.
+
+    Attributes
+    -----------
+    container: Element of the list. Its height has to be fixed (e.g. by CSS).
+    row_height: height of a row in pixels
+    template: HTML of a row, with "{key}" replaced by escaped value of the row (`{0}` for rows of arrays)
+    data: list of rows (or JS of the array)
+    url: url that answers pages of rows, as `jsrope.flask.paged_response` does. Used when `data` is None.
+    page_size: number of rows fetched at once from `url`
+    total: number of rows of `url` if known. Otherwise it's learned from the first page.
+    overscan: number of rows rendered above and below the visible ones
+    placeholder: HTML of rows which are being fetched
+    tag, attributes: tag and attributes of row nodes, as `Element.render_many`
+    """
+
+    # code of `window.__jsrope_vlist`, which is defined once per page
+    runtime = ("function(c,o){"
+               "c=c[0]||c;var s=document.createElement(\"div\"),pool=[],pages={},loading={},"
+               "n=o.d?o.d.length:o.n||0,raf=0;"
+               "if(getComputedStyle(c).position===\"static\"){c.style.position=\"relative\"}"
+               "c.style.overflowY=\"auto\";c.innerHTML=\"\";s.style.position=\"relative\";c.appendChild(s);"
+               "function size(){s.style.height=n*o.h+\"px\"}"
+               "function row(i){if(o.d){return o.d[i]}var p=pages[Math.floor(i/o.s)];return p&&p[i%o.s]}"
+               "function load(p){if(pages[p]||loading[p]){return}loading[p]=1;"
+               "o.f(p*o.s,o.s,function(r){delete loading[p];pages[p]=r.rows||[];"
+               "if(typeof r.total===\"number\"&&r.total!==n){n=r.total;size()}draw()},"
+               "function(){delete loading[p]})}"
+               "function draw(){var a=Math.max(0,Math.floor(c.scrollTop/o.h)-o.o),"
+               "b=Math.min(n,Math.ceil((c.scrollTop+c.clientHeight)/o.h)+o.o),i,e,r;"
+               "if(pool.length<b-a){for(i=0;i<pool.length;i++){pool[i].__i=-1}"
+               "while(pool.length<b-a){e=document.createElement(o.tag);e.style.position=\"absolute\";"
+               "e.style.left=\"0\";e.style.right=\"0\";e.style.height=o.h+\"px\";e.__i=-1;"
+               "for(var k in o.a){e.setAttribute(k,o.a[k])}s.appendChild(e);pool.push(e)}}"
+               "for(i=0;i<pool.length;i++){e=pool[i];if(e.__i<a||e.__i>=b){e.style.display=\"none\"}}"
+               "for(i=a;i<b;i++){e=pool[i%pool.length];r=row(i);"
+               "if(r===undefined&&o.f){load(Math.floor(i/o.s))}"
+               "if(e.__i!==i||e.__r!==r){e.__i=i;e.__r=r;e.style.top=i*o.h+\"px\";"
+               "e.innerHTML=r===undefined?o.p:o.t(r)}e.style.display=\"\"}}"
+               "function schedule(){if(!raf){raf=(window.requestAnimationFrame||setTimeout)(function(){raf=0;draw()})}}"
+               "c.addEventListener(\"scroll\",schedule);window.addEventListener(\"resize\",schedule);"
+               "size();if(o.f&&!n){load(0)}draw();"
+               "return{refresh:function(d){if(d){o.d=d}pages={};n=o.d?o.d.length:n;size();"
+               "for(var i=0;i<pool.length;i++){pool[i].__i=-1}draw()}}}")
+
+    def __init__(self, container, row_height, template, data=None, url=None, page_size=100, total=None, overscan=5,
+                 placeholder="", tag="div", **attributes):
+        super().__init__()
+        if data is None and url is None:
+            raise ValueError("data or url of {} has to be given".format(type(self).__name__))
+        if not _tag_name.match(tag):
+            raise ValueError("Invalid tag name '{}' for {}".format(tag, type(self).__name__))
+        self.container = container
+        self.row_height = row_height
+        self.template = template
+        self.data = data
+        self.url = url
+        self.page_size = page_size
+        self.total = total
+        self.overscan = overscan
+        self.placeholder = placeholder
+        self.tag = tag
+        self.attributes = attributes
+
+    def _template(self):
+        """
+        Return the code of the function that makes HTML of a row from `template`
+        """
+        parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(self.template):
+            if literal:
+                parts.append(js_string(literal))
+            if field is None:
+                continue
+            if spec or conversion:
+                raise ValueError("format spec and conversion can't be used in template of {}".format(
+                    type(self).__name__))
+            key = js_json(int(field)) if field.isdigit() else js_string(field)
+            parts.append("e(r[{}])".format(key))
+        return ("function(r){{function e(v){{return v==null?\"\":String(v).replace(/[&<>\"']/g,"
+                "function(c){{return \"&#\"+c.charCodeAt(0)+\";\"}})}}return {}}}").format(
+            "+".join(parts) or "\"\"")
+
+    def _fetch(self):
+        """
+        Return the code of the function that fetches a page with `Ajax`
+        """
+        request = Ajax(self.url, {"method": "GET", "dataType": "json",
+                                  "data": {page_offset_field: Int("o"), page_limit_field: Int("l")}},
+                       done=Code("function(r){ok(r)}"), fail=Code("function(){fail()}"))
+        return "function(o,l,ok,fail){{{}}}".format(request)
+
+    def to_code(self):
+        return Code(str(self))
+
+    def __str__(self):
+        self._track()
+        if self.data is None:
+            data = "null"
+        elif isinstance(self.data, (JS, str)):
+            data = str(self.data)
+        else:
+            data = Data(list(self.data))
+        attributes = {(k[:-1] if k.endswith("_") else k).replace("_", "-"): str(v) for k, v in self.attributes.items()}
+        return ("{}({},{{h:{},n:{},o:{},s:{},t:{},d:{},f:{},p:{},tag:{},a:{}}})").format(
+            _runtime("__jsrope_vlist", VirtualList.runtime), self.container.to_code(), js_json(self.row_height),
+            js_json(self.total or 0), int(self.overscan), int(self.page_size), self._template(), data,
+            self._fetch() if self.data is None else "null", js_string(self.placeholder), js_string(self.tag),
+            js_json(attributes))
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, repr(self.container))
+
+    def prettify(self):
+        return beautify(str(self))
 
 
 class Date(JS):
@@ -885,37 +2060,53 @@ class Date(JS):
             return "{}()".format(type(self).__name__)
 
 
-class Array(list, JS):
+class Array(RenderCache, list, JS):
     def __new__(cls, *args, **kwargs):
         return list.__new__(cls, *args, **kwargs)
 
     def __init__(self, *args, **kwargs):
         super().__init__(args)
 
+    __setitem__ = _invalidating(list.__setitem__)
+    __delitem__ = _invalidating(list.__delitem__)
+    __iadd__ = _invalidating(list.__iadd__)
+    __imul__ = _invalidating(list.__imul__)
+    append = _invalidating(list.append)
+    extend = _invalidating(list.extend)
+    insert = _invalidating(list.insert)
+    pop = _invalidating(list.pop)
+    remove = _invalidating(list.remove)
+    clear = _invalidating(list.clear)
+    sort = _invalidating(list.sort)
+    reverse = _invalidating(list.reverse)
+
     def __hash__(self):
         return id(self)
 
     def to_code(self):
-        return Code(str(self))
+        return self._cached_code()
 
     def __str__(self):
+        return self._cached_code()
+
+    def _render(self):
         return "[{}]".format(",".join(list(map(escape, list(self)))))
 
     def __repr__(self):
         return "{}({})".format(type(self).__name__, list(self.__iter__()))
 
     def prettify(self):
-        return jsbeautifier.beautify(str(self))
+        return beautify(str(self))
 
 
 class Util:
     @staticmethod
     def alert(obj=""):
-        return Expression("alert({})".format(escape(obj)))
+        return _link(Expression("alert({})".format(escape(obj))), obj)
 
     @staticmethod
     def confirm(text):
-        return Expression("confirm({})".format(escape(text)))
+        return _link(Expression("confirm({})".format(escape(text))), text)
 
 
 true = Bool(True)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Metrics of requests handled by `jsrope.flask.ajax_handler`.
+
+Set `jsrope.metrics.default` (or pass `metrics=` to `ajax_handler`) to a `Metrics` to collect them.
+"""
+
+import collections
+import threading
+
+Sample = collections.namedtuple("Sample", ("endpoint", "decode_time", "view_time", "fields", "payload_size",
+                                           "failures"))
+Sample.__doc__ = """
+Metrics of one request. Times are seconds, and `view_time` is None if the view was not called.
+`failures` is the number of values which couldn't be converted (the request fails with the first one).
+"""
+
+
+def percentiles(values, percents=(50, 90, 99)):
+    """
+    Return dict of percent and value (nearest rank) of `values`. Values are None if `values` is empty.
+    """
+    values = sorted(values)
+    if not values:
+        return {p: None for p in percents}
+    return {p: values[min(len(values) - 1, max(0, -(-p * len(values) // 100) - 1))] for p in percents}
+
+
+class Metrics:
+    """
+    The base class of metrics, which records nothing.
+    Inherit this class, set `enabled` to True and override `record` to send metrics to other place (e.g. StatsD).
+    """
+
+    enabled = False
+
+    def record(self, sample):
+        """
+        :param sample: Sample
+        """
+
+
+class MemoryMetrics(Metrics):
+    """
+    Metrics that keeps last `max_samples` samples of each endpoint in memory of the process.
+    """
+
+    enabled = True
+    fields = ("decode_time", "view_time", "fields", "payload_size")
+
+    def __init__(self, max_samples=10000):
+        self.max_samples = max_samples
+        self._samples = {}
+        self._failures = collections.Counter()
+        self._counts = collections.Counter()
+        self._lock = threading.Lock()
+
+    def record(self, sample):
+        with self._lock:
+            samples = self._samples.get(sample.endpoint)
+            if samples is None:
+                samples = self._samples[sample.endpoint] = collections.deque(maxlen=self.max_samples)
+            samples.append(sample)
+            self._counts[sample.endpoint] += 1
+            self._failures[sample.endpoint] += sample.failures
+
+    def values(self, endpoint, field):
+        """
+        Return kept values of `field` (e.g. "decode_time") of `endpoint`
+        """
+        with self._lock:
+            samples = list(self._samples.get(endpoint, ()))
+        return [getattr(x, field) for x in samples if getattr(x, field) is not None]
+
+    def percentiles(self, endpoint, field, percents=(50, 90, 99)):
+        """
+        Return dict of percent and value (nearest rank) of `field` of `endpoint`. Values are None without samples.
+        """
+        return percentiles(self.values(endpoint, field), percents)
+
+    def histogram(self, endpoint, field, bounds):
+        """
+        Return list of counts of values of `field` of `endpoint` not above each of `bounds`, and above the last one.
+        """
+        counts = [0] * (len(bounds) + 1)
+        for value in self.values(endpoint, field):
+            counts[next((i for i, bound in enumerate(bounds) if value <= bound), len(bounds))] += 1
+        return counts
+
+    def summary(self):
+        """
+        Return dict of endpoint and its metrics: "count" and "failures" of all requests,
+        and "max" and percentiles of kept samples for each of `fields`.
+        """
+        with self._lock:
+            endpoints = list(self._samples)
+            counts = dict(self._counts)
+            failures = dict(self._failures)
+        result = {}
+        for endpoint in endpoints:
+            result[endpoint] = {"count": counts[endpoint], "failures": failures[endpoint]}
+            for field in self.fields:
+                values = self.values(endpoint, field)
+                result[endpoint][field] = dict(self.percentiles(endpoint, field), max=max(values, default=None))
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._failures.clear()
+
+
+default = Metrics()
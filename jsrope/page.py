@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Page-level script which defines every Function used by its nodes exactly once.
+"""
+
+import hashlib
+import re
+
+from .jsrope import JS, Code, Function, Return, _page_runtimes, _with_runtimes
+from .report import _children
+from .util import beautify
+
+
+def _references(node):
+    """
+    Return nodes `node` was made from: children and operands of operators.
+    """
+    refs = list(_children(node))
+    if isinstance(node, Return):
+        refs.append(node.value)
+    expr = getattr(node, "_expr", None)
+    if expr is not None:
+        refs.extend(expr[2])
+    return refs
+
+
+class Script(JS):
+    """
+    Script of a page.
+
+    Every named Function called from `nodes` (or given as one of `nodes`) is defined once before the other nodes,
+    after the Functions it calls. Runtimes used by the nodes (e.g. the scheduler of `EventHandler(bind=...)`)
+    are defined once at the beginning.
+
+    :param share_anonymous: if True, anonymous Function which appears twice or more is defined once
+                            as `_jsrope_fn_<hash of the body>` and the copies are replaced by the name.
+                            The body can't use variables of the scope where the Function is used.
+    """
+
+    def __init__(self, *nodes, share_anonymous=False):
+        super().__init__()
+        self.nodes = list(nodes)
+        self.share_anonymous = share_anonymous
+
+    def add(self, *nodes):
+        self.nodes.extend(nodes)
+
+    def functions(self):
+        """
+        Return (named Functions in dependency order, anonymous Functions).
+        """
+        named = {}
+        anonymous = {}
+        seen = set()
+
+        def visit(node, called):
+            if node is None or (isinstance(node, (str, int, float, bool)) and not isinstance(node, JS)):
+                return
+            if id(node) not in seen:
+                seen.add(id(node))
+                for child in _references(node):
+                    visit(child, False)
+                for ref in getattr(node, "_refs", ()):
+                    visit(ref, True)
+            if not isinstance(node, Function):
+                return
+            if not node.name:
+                anonymous.setdefault(id(node), node)
+            elif not called:
+                return
+            elif node.name not in named:
+                named[node.name] = node
+            elif named[node.name] is not node and named[node.name].to_code() != node.to_code():
+                raise ValueError("two different Functions are named {}".format(node.name))
+
+        for node in self.nodes:
+            visit(node, True)
+        return list(named.values()), list(anonymous.values())
+
+    def _share(self, texts, anonymous):
+        """
+        Replace anonymous Functions which appear twice or more in `texts` by shared definitions.
+        """
+        shared = []
+        codes = sorted({str(x) for x in anonymous if str(x).startswith("function(")}, key=len, reverse=True)
+        for code in codes:
+            if sum(text.count(code) for text in texts + shared) < 2:
+                continue
+            # named by the body, so Scripts on one page don't overwrite each other's definitions
+            name = "_jsrope_fn_{}".format(hashlib.sha256(code.encode()).hexdigest()[:12])
+            texts = [text.replace(code, name) for text in texts]
+            shared = [text.replace(code, name) for text in shared]
+            shared.append("function {}{}".format(name, code[len("function"):]))
+        return list(reversed(shared)), texts
+
+    def to_code(self):
+        named, anonymous = self.functions()
+        with _page_runtimes() as runtimes:
+            definitions = [str(x) for x in named]
+            body = [str(x) for x in self.nodes if not isinstance(x, Function) or not x.name]
+        for definition in definitions:
+            # Functions put in other nodes (e.g. `Flow(f, ...)`) are already defined above
+            inline = re.compile(r"(?:^|(?<=[;{{}}])){}(?:;|(?=}}|$))".format(re.escape(definition)))
+            body = [inline.sub("", text) for text in body]
+        if self.share_anonymous:
+            shared, texts = self._share(definitions + body, anonymous)
+            definitions, body = shared + texts[:len(definitions)], texts[len(definitions):]
+        return _with_runtimes(Code(";".join(definitions + body)), runtimes)
+
+    def prettify(self):
+        return Code(beautify(self.to_code()))
+
+    def __str__(self):
+        return self.to_code()
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join(repr(x) for x in self.nodes))
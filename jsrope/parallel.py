@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Render many trees at once with a process pool.
+"""
+
+import concurrent.futures
+import math
+import os
+import pickle
+
+from .jsrope import JS
+from .util import beautify, minify
+
+modes = {"raw": str, "prettify": lambda tree: beautify(str(tree)), "minify": lambda tree: minify(str(tree))}
+
+
+class RenderError(Exception):
+    """
+    Raised when rendering `trees[index]` failed. The original traceback is kept in `__cause__`.
+    """
+
+    def __init__(self, index, message):
+        super().__init__(index, message)
+        self.index = index
+        self.message = message
+
+    def __str__(self):
+        return "trees[{}]: {}".format(self.index, self.message)
+
+
+def _render_one(index, tree, mode):
+    try:
+        if callable(tree) and not isinstance(tree, JS):
+            tree = tree()
+        return modes[mode](tree)
+    except Exception as e:
+        raise RenderError(index, "{}: {}".format(type(e).__name__, e)) from e
+
+
+def _picklable(obj):
+    try:
+        pickle.dumps(obj)
+    except Exception:
+        return False
+    return True
+
+
+def _render_chunk(start, trees, mode):
+    return [_render_one(start + i, tree, mode) for i, tree in enumerate(trees)]
+
+
+def render_many(trees, mode="raw", workers=None, chunksize=None):
+    """
+    Return list of code of `trees` in the same order.
+
+    :param trees: iterable of jsrope objects, or of callables which build one. Both have to be picklable
+                  (callables have to be importable functions) unless `workers` is 1.
+    :param mode: "raw", "prettify" or "minify"
+    :param workers: number of processes. Default is `os.cpu_count()`. If 1, trees are rendered in this process.
+    :param chunksize: number of trees sent to a process at once. Default gives each process about 4 chunks.
+    :raise RenderError: rendering a tree failed. `index` is the index of the tree.
+    """
+    if mode not in modes:
+        raise ValueError("mode has to be one of {}, not {!r}".format(", ".join(modes), mode))
+    trees = list(trees)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(trees) <= 1:
+        return _render_chunk(0, trees, mode)
+
+    chunksize = chunksize or max(1, math.ceil(len(trees) / (workers * 4)))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        starts = range(0, len(trees), chunksize)
+        futures = [executor.submit(_render_chunk, start, trees[start:start + chunksize], mode) for start in starts]
+        codes = []
+        try:
+            for start, future in zip(starts, futures):
+                try:
+                    codes.extend(future.result())
+                except (RenderError, concurrent.futures.process.BrokenProcessPool):
+                    raise
+                except Exception as e:
+                    # the chunk couldn't be sent to the process
+                    index = next((start + i for i, tree in enumerate(trees[start:start + chunksize])
+                                  if not _picklable(tree)), start)
+                    raise RenderError(index, "{}: {}".format(type(e).__name__, e)) from e
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return codes
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Report how many bytes each node adds to the rendered code.
+"""
+
+import collections
+import gzip
+
+from .jsrope import JS, Flow, Switch, Array, Function, EventHandler, Ajax, If, For, While, EventSource, _page_runtimes
+
+NodeSize = collections.namedtuple("NodeSize", ("node", "kind", "depth", "raw", "gzip", "own"))
+
+
+def _gzip_size(code):
+    return len(gzip.compress(code.encode(), compresslevel=6, mtime=0))
+
+
+def _kind(node):
+    if hasattr(node, "_dom_write"):
+        return "Element"
+    return type(node).__name__
+
+
+def _children(node):
+    if isinstance(node, Flow):
+        return node.events
+    elif isinstance(node, Switch):
+        return [x for item in node.items() for x in item]
+    elif isinstance(node, Array):
+        return list(node)
+    elif isinstance(node, Function):
+        return [node.flow]
+    elif isinstance(node, EventHandler):
+        return [node.element, node.handler]
+    elif isinstance(node, Ajax):
+        return [node.settings, node.done, node.fail, node.always]
+    elif isinstance(node, If):
+        return [node.condition, node.flow]
+    elif isinstance(node, For):
+        return [node.init, node.condition, node.after, node.flow]
+    elif isinstance(node, While):
+        return [node.condition, node.flow]
+    elif isinstance(node, EventSource):
+        return list(node.events.values())
+    elif isinstance(node, dict):
+        return list(node.values())
+    elif isinstance(node, (list, tuple, set)):
+        return list(node)
+    return []
+
+
+def _js_nodes(obj):
+    """
+    Yield JS nodes directly under `obj`, looking through dicts and lists.
+    """
+    for child in _children(obj):
+        if isinstance(child, JS):
+            yield child
+        elif isinstance(child, (dict, list, tuple, set)):
+            yield from _js_nodes(child)
+
+
+class SizeReport:
+    """
+    Bytes of rendered code attributed to each node of `tree`.
+
+    Attributes
+    -----------
+    nodes: list of NodeSize. `raw` and `gzip` are the size of the node's code,
+           and `own` is `raw` minus the size of the nodes under it.
+    raw: bytes of the whole code
+    gzip: estimated bytes of the whole code after gzip
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.nodes = []
+        self._measure(tree, 0)
+        self.raw = self.nodes[0].raw if self.nodes else len(str(tree).encode())
+        self.gzip = self.nodes[0].gzip if self.nodes else _gzip_size(str(tree))
+
+    def _measure(self, node, depth):
+        if depth:
+            # runtimes are counted once in the tree, not in each node using them
+            with _page_runtimes():
+                code = str(node.to_code())
+        else:
+            code = str(node.to_code())
+        index = len(self.nodes)
+        self.nodes.append(None)
+        children = 0
+        for child in _js_nodes(node):
+            children += self._measure(child, depth + 1)
+        raw = len(code.encode())
+        self.nodes[index] = NodeSize(node, _kind(node), depth, raw, _gzip_size(code), max(raw - children, 0))
+        return raw
+
+    def by_kind(self):
+        """
+        Return dict of kind and its own bytes, largest first
+        """
+        kinds = collections.Counter()
+        for node in self.nodes:
+            kinds[node.kind] += node.own
+        return dict(kinds.most_common())
+
+    def table(self, limit=20):
+        """
+        Return table of bytes by kind and the largest `limit` nodes
+        """
+        lines = ["{:<16} {:>10} {:>7}".format("kind", "own bytes", "share")]
+        for kind, own in self.by_kind().items():
+            lines.append("{:<16} {:>10} {:>6.1%}".format(kind, own, own / self.raw if self.raw else 0))
+        lines.append("")
+        lines.append("{:<16} {:>10} {:>10} {:>10}  {}".format("kind", "own bytes", "raw bytes", "gzip bytes", "code"))
+        for node in sorted(self.nodes, key=lambda x: x.own, reverse=True)[:limit]:
+            label = " ".join(str(node.node.to_code()).split())
+            label = label if len(label) <= 60 else label[:57] + "..."
+            lines.append("{:<16} {:>10} {:>10} {:>10}  {}".format(node.kind, node.own, node.raw, node.gzip, label))
+        lines.append("")
+        lines.append("total: {} bytes ({} bytes gzipped)".format(self.raw, self.gzip))
+        return "\n".join(lines)
+
+    def check(self, max_raw=None, max_gzip=None):
+        """
+        Raise AssertionError if the code is larger than `max_raw` bytes or `max_gzip` gzipped bytes
+        """
+        if max_raw is not None and self.raw > max_raw:
+            raise AssertionError("script is {} bytes, over the budget of {} bytes\n{}".format(
+                self.raw, max_raw, self.table()))
+        if max_gzip is not None and self.gzip > max_gzip:
+            raise AssertionError("script is {} bytes gzipped, over the budget of {} bytes\n{}".format(
+                self.gzip, max_gzip, self.table()))
+
+    def __str__(self):
+        return self.table()
+
+
+def size_report(tree):
+    """
+    :param tree: jsrope object to render
+    :return: SizeReport()
+    """
+    return SizeReport(tree)
+
+
+def assert_size(tree, max_raw=None, max_gzip=None):
+    """
+    Raise AssertionError if rendered `tree` is over the budget
+    """
+    size_report(tree).check(max_raw=max_raw, max_gzip=max_gzip)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Serialize built jsrope trees, so they can be built once and loaded by other processes.
+
+Data is `pickle` with a small header, so node types and shared subtrees are preserved
+and `handler` callables are stored by their import path (lambdas can't be dumped).
+Load only data you dumped yourself.
+"""
+
+import gc
+import pickle
+import struct
+
+magic = b"JSRP"
+format_version = 1
+_header = struct.Struct(">4sH")
+
+
+def dumps(obj):
+    """
+    Return bytes of `obj`
+
+    :param obj: jsrope object (or any container of them)
+    :return: bytes
+    """
+    return _header.pack(magic, format_version) + pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def dump(obj, fp):
+    """
+    Write `obj` to binary file object `fp`
+    """
+    fp.write(dumps(obj))
+
+
+def loads(data):
+    """
+    Return jsrope object from bytes made with `dumps`
+    """
+    if len(data) < _header.size:
+        raise ValueError("data is too short to be jsrope serialized object")
+    _magic, version = _header.unpack_from(data)
+    if _magic != magic:
+        raise ValueError("data is not jsrope serialized object")
+    if version != format_version:
+        raise ValueError("unsupported format version {} (expected {})".format(version, format_version))
+    # loading makes many objects at once, which runs the cyclic GC over and over without freeing anything
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(memoryview(data)[_header.size:])
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def load(fp):
+    """
+    Read jsrope object from binary file object `fp`
+    """
+    return loads(fp.read())
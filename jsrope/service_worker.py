@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Service worker that caches scripts and GET responses, so pages work on flaky networks.
+
+Serve `ServiceWorker.code()` with `jsrope.flask.serve_service_worker`, and put `registration()` in pages.
+"""
+
+import hashlib
+
+from . import chunks
+from .jsrope import Code
+from .util import js_json, js_string, jquery3_url
+
+strategies = ("stale-while-revalidate", "network-first", "cache-first", "network-only")
+
+
+class ServiceWorker:
+    """
+    Attributes
+    -----------
+    url: url the worker is served at
+    scope: paths the worker controls
+    scripts: urls of scripts, which are cached on install and answered with stale-while-revalidate.
+             Chunks of `registry` are answered from the cache first, as their urls change with their code.
+    routes: dict of url (path of same origin, or full url) and one of `strategies`,
+            or list of (url or GET `Ajax`, strategy). Responses are cached per url with query.
+    registry: jsrope.chunks.ChunkRegistry. jsrope.chunks.registry by default.
+    versioned: code of scripts served by the app (e.g. rendered `Script`). The version changes when they change.
+    """
+
+    def __init__(self, url="/jsrope-sw.js", scope="/", scripts=(jquery3_url,), routes=None, registry=None,
+                 versioned=()):
+        self.url = url
+        self.scope = scope
+        self.scripts = list(scripts)
+        self.routes = {}
+        for target, strategy in (routes.items() if isinstance(routes, dict) else routes or ()):
+            if strategy not in strategies:
+                raise ValueError("strategy has to be one of {}, not {!r}".format(", ".join(strategies), strategy))
+            if not isinstance(target, str):
+                if target.method != "GET":
+                    raise ValueError("only GET Ajax can be cached by {}, not {} {}".format(
+                        type(self).__name__, target.method, target.url))
+                target = target.url
+            self.routes[target] = strategy
+        self.registry = registry if registry is not None else chunks.registry
+        self.versioned = list(versioned)
+
+    def version(self):
+        """
+        Return the hash of the configuration and `versioned`, which names the cache.
+        Chunks aren't in it, as their urls change with their code, so every process serves the same worker
+        whichever chunks it has rendered.
+        """
+        h = hashlib.sha256()
+        for part in [self.scope, *self.scripts, *sorted(self.routes.items()), self.registry.url_prefix,
+                     *[str(x) for x in self.versioned]]:
+            h.update(repr(part).encode())
+            h.update(b"\0")
+        return h.hexdigest()[:16]
+
+    def code(self):
+        """
+        Return the code of the worker
+        """
+        return Code(("var V={version},S={scripts},R={routes},P={prefix},C=\"jsrope-\"+V;"
+                     "function put(q,r){{if(r&&(r.ok||r.type===\"opaque\")){{"
+                     "var c=r.clone();caches.open(C).then(function(x){{x.put(q,c)}})}}"
+                     "return r}}"
+                     "function network(q){{return fetch(q).then(function(r){{return put(q,r)}})}}"
+                     "var handle={{"
+                     "\"stale-while-revalidate\":function(e,q){{return caches.match(q).then(function(h){{"
+                     "var n=network(q);if(h){{e.waitUntil(n.catch(function(){{}}));return h}}return n}})}},"
+                     "\"network-first\":function(e,q){{return network(q).catch(function(x){{"
+                     "return caches.match(q).then(function(h){{if(h){{return h}}throw x}})}})}},"
+                     "\"cache-first\":function(e,q){{return caches.match(q).then(function(h){{"
+                     "return h||network(q)}})}}}};"
+                     "self.addEventListener(\"install\",function(e){{e.waitUntil(caches.open(C).then(function(c){{"
+                     "return Promise.all(S.map(function(s){{return fetch(new Request(s,{{mode:\"no-cors\"}}))"
+                     ".then(function(r){{return c.put(s,r)}}).catch(function(){{}})}}))}})"
+                     ".then(function(){{return self.skipWaiting()}}))}});"
+                     "self.addEventListener(\"activate\",function(e){{e.waitUntil(caches.keys().then(function(k){{"
+                     "return Promise.all(k.filter(function(n){{return n.indexOf(\"jsrope-\")===0&&n!==C}})"
+                     ".map(function(n){{return caches.delete(n)}}))}})"
+                     ".then(function(){{return self.clients.claim()}}))}});"
+                     "self.addEventListener(\"fetch\",function(e){{var q=e.request;if(q.method!==\"GET\"){{return}}"
+                     "var u=new URL(q.url),same=u.origin===self.location.origin,"
+                     "s=R[same?u.pathname:u.origin+u.pathname];"
+                     "if(!s&&same&&u.pathname.indexOf(P)===0){{s=\"cache-first\"}}"
+                     "if(!s&&(S.indexOf(u.href)!==-1||same&&S.indexOf(u.pathname)!==-1)){{"
+                     "s=\"stale-while-revalidate\"}}"
+                     "if(s&&handle[s]){{e.respondWith(handle[s](e,q))}}}});").format(
+                         version=js_string(self.version()), scripts=js_json(self.scripts), routes=js_json(self.routes),
+                         prefix=js_string(self.registry.url_prefix)))
+
+    def registration(self):
+        """
+        Return the code that registers the worker
+        """
+        return Code(("if(\"serviceWorker\" in navigator){{navigator.serviceWorker.register({},{{scope:{}}})"
+                     ".catch(function(){{}})}}").format(js_string(self.url), js_string(self.scope)))
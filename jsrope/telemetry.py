@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Client side timing of EventHandler bodies and Ajax round trips.
+
+Call `enable()` before rendering, and `EventHandler` bodies and `Ajax` requests are measured in the browser
+with `performance.mark`/`measure`, and sampled durations are sent in batches with `navigator.sendBeacon`
+to the collector added by `jsrope.flask.collect_telemetry`. Without `enable()`, nothing is added to the code.
+"""
+
+import collections
+import threading
+
+from .metrics import percentiles
+from .util import js_json, js_string
+
+
+class Telemetry:
+    """
+    Attributes
+    -----------
+    url: url the durations are sent to
+    rate: ratio of measured calls (0 to 1)
+    batch_size: number of durations sent at once
+    flush_interval: seconds durations are kept before sent
+    """
+
+    def __init__(self, url="/_jsrope/telemetry", rate=1.0, batch_size=20, flush_interval=5):
+        if not 0 <= rate <= 1:
+            raise ValueError("rate of {} has to be between 0 and 1, not {!r}".format(type(self).__name__, rate))
+        self.url = url
+        self.rate = rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+    def runtime(self):
+        """
+        Return the initial value of `window.__jsrope_perf`, which has s(name) that starts measuring
+        and e(token, ok) that ends it.
+        """
+        return ("(function(){{"
+                "var P=window.performance||{{now:function(){{return Date.now()}}}},q=[],n=0,t=null;"
+                "function flush(){{clearTimeout(t);t=null;if(!q.length){{return}}"
+                "var b=JSON.stringify(q);q=[];"
+                "if(navigator.sendBeacon&&navigator.sendBeacon({url},b)){{return}}"
+                "var x=new XMLHttpRequest();x.open(\"POST\",{url});"
+                "x.setRequestHeader(\"Content-Type\",\"application/json\");x.send(b)}}"
+                "if(window.addEventListener){{window.addEventListener(\"pagehide\",flush);"
+                "document.addEventListener(\"visibilitychange\",function(){{"
+                "if(document.visibilityState===\"hidden\"){{flush()}}}})}}"
+                "return{{s:function(m){{if(Math.random()>={rate}){{return null}}"
+                "var i=\"jsrope:\"+m+\"#\"+(++n);if(P.mark){{P.mark(i)}}return[m,i,P.now()]}},"
+                "e:function(k,ok){{if(!k){{return}}var d=P.now()-k[2];"
+                "if(P.measure){{try{{P.measure(\"jsrope:\"+k[0],k[1])}}catch(x){{}}P.clearMarks(k[1])}}"
+                "q.push({{n:k[0],d:d,ok:ok===false?0:1}});"
+                "if(q.length>={size}){{flush()}}else if(!t){{t=setTimeout(flush,{interval})}}}}}}"
+                "}})()").format(url=js_string(self.url), rate=js_json(float(self.rate)), size=int(self.batch_size),
+                                  interval=int(self.flush_interval * 1000))
+
+    def wrap_body(self, name, body):
+        """
+        Return `body` (code of function body) that measures itself as `name`
+        """
+        from .jsrope import _runtime
+
+        return "var __jsrope_t={}.s({});try{{{}}}finally{{window.__jsrope_perf.e(__jsrope_t)}}".format(
+            _runtime("__jsrope_perf", self.runtime()), js_string(name), body)
+
+    def wrap_request(self, name, request):
+        """
+        Return `request` (code of jQuery promise) that measures the time until it is resolved or rejected
+        """
+        from .jsrope import _runtime
+
+        # the timer is started first, and request is evaluated outside, so `t` doesn't shadow the page's variables
+        return ("(function(t,r){{return r.done(function(){{window.__jsrope_perf.e(t,true)}})"
+                ".fail(function(){{window.__jsrope_perf.e(t,false)}})}})({}.s({}),{})").format(
+            _runtime("__jsrope_perf", self.runtime()), js_string(name), request)
+
+
+config = None
+
+
+def enable(url="/_jsrope/telemetry", rate=1.0, batch_size=20, flush_interval=5):
+    """
+    Measure EventHandlers and Ajax rendered from now on. Arguments are the ones of `Telemetry`.
+    Code rendered before is rendered again with the measurement.
+    """
+    from .jsrope import RenderCache
+
+    global config
+    config = Telemetry(url=url, rate=rate, batch_size=batch_size, flush_interval=flush_interval)
+    RenderCache.invalidate_all()
+    return config
+
+
+def disable():
+    """
+    Stop measuring. Code rendered before is rendered again without the measurement.
+    """
+    from .jsrope import RenderCache
+
+    global config
+    config = None
+    RenderCache.invalidate_all()
+
+
+class TelemetryStore:
+    """
+    Durations (milliseconds) sent by pages, keeping last `max_samples` of each name in memory of the process.
+    Names come from clients, so durations of names beyond the first `max_names` are kept as `other`.
+    """
+
+    # name of durations whose names are beyond `max_names`
+    other = "(other)"
+
+    def __init__(self, max_samples=10000, max_names=1000):
+        self.max_samples = max_samples
+        self.max_names = max_names
+        self._durations = {}
+        self._failures = collections.Counter()
+        self._lock = threading.Lock()
+
+    def record(self, name, duration, ok=True):
+        with self._lock:
+            durations = self._durations.get(name)
+            if durations is None:
+                if len(self._durations) >= self.max_names:
+                    name = self.other
+                    durations = self._durations.get(name)
+                if durations is None:
+                    durations = self._durations[name] = collections.deque(maxlen=self.max_samples)
+            durations.append(duration)
+            if not ok:
+                self._failures[name] += 1
+
+    def percentiles(self, name, percents=(50, 90, 99)):
+        with self._lock:
+            durations = list(self._durations.get(name, ()))
+        return percentiles(durations, percents)
+
+    def summary(self):
+        """
+        Return dict of name and its "count" (kept samples), "failures" and percentiles.
+        """
+        with self._lock:
+            names = {name: list(durations) for name, durations in self._durations.items()}
+            failures = dict(self._failures)
+        return {name: dict(percentiles(durations), count=len(durations), failures=failures.get(name, 0))
+                for name, durations in names.items()}
+
+    def clear(self):
+        with self._lock:
+            self._durations.clear()
+            self._failures.clear()
+
+
+store = TelemetryStore()
@@ -1,19 +1,122 @@
 # -*- coding: utf-8 -*-
+import json
+import re
+
 import jsrope
 
 
+def beautify(code):
+    """
+    jsbeautifier.beautify(code). jsbeautifier is imported on first call.
+    """
+    import jsbeautifier
+    return jsbeautifier.beautify(code)
+
+
+_word = re.compile(r"[\w$\\]")
+_regex_before = set("(,=:[!&|?{};+-*%<>~^")
+
+
+def _space(tokens, space):
+    """
+    Append whitespace token `space`, merging it with the previous whitespace (line breaks are kept)
+    """
+    if tokens and tokens[-1].isspace():
+        tokens[-1] = "\n" if "\n" in tokens[-1] + space else " "
+    else:
+        tokens.append(space)
+
+
+def minify(code):
+    """
+    Return `code` without comments and whitespace which JavaScript doesn't need.
+    Line breaks are kept where they may end a statement.
+    """
+    tokens = []
+    last = "("
+    i, n = 0, len(code)
+    while i < n:
+        c = code[i]
+        if c in "'\"`":
+            j = i + 1
+            while j < n and code[j] != c:
+                j += 2 if code[j] == "\\" else 1
+            tokens.append(code[i:j + 1])
+            i = j + 1
+        elif code.startswith("//", i):
+            j = code.find("\n", i)
+            i = n if j == -1 else j
+            continue
+        elif code.startswith("/*", i):
+            j = code.find("*/", i + 2)
+            i = n if j == -1 else j + 2
+            _space(tokens, " ")
+            continue
+        elif c == "/" and last in _regex_before:
+            j, klass = i + 1, False
+            while j < n and (klass or code[j] != "/"):
+                if code[j] == "\\":
+                    j += 1
+                elif code[j] in "[]":
+                    klass = code[j] == "["
+                j += 1
+            tokens.append(code[i:j + 1])
+            i = j + 1
+        elif c.isspace():
+            j = i
+            while j < n and code[j].isspace():
+                j += 1
+            _space(tokens, "\n" if "\n" in code[i:j] else " ")
+            i = j
+            continue
+        else:
+            tokens.append(c)
+            i += 1
+        last = tokens[-1][-1]
+
+    result = []
+    for k, token in enumerate(tokens):
+        if not token.isspace():
+            result.append(token)
+            continue
+        before = result[-1][-1] if result else ""
+        after = next((x[0] for x in tokens[k + 1:] if not x.isspace()), "")
+        if not before or not after or before.isspace():
+            continue
+        if token == "\n" and before not in "{(;,[=:" and after not in "});,]":
+            result.append("\n")
+        elif _word.match(before) and _word.match(after) or before + after in ("++", "--", "+-", "-+"):
+            result.append(" ")
+    return "".join(result)
+
+
+def js_json(obj):
+    """
+    Return JSON of `obj` as JavaScript literal which is safe to put in <script>.
+    Only "</" and "<!" are escaped, so HTML in strings stays short.
+    """
+    return json.dumps(obj, separators=(",", ":")).replace("</", "<\\/").replace("<!", "\\u003c!")
+
+
+def js_string(text):
+    """
+    Return JavaScript string literal of `text` which is safe to put in <script>.
+    """
+    return js_json(str(text))
+
+
 def substitute(left, right, define="let"):
     return jsrope.Expression("{} {} = {}".format(define, left, right))
 
 
 def negative(statement):
-    return type(statement)("!({})".format(statement))
+    return jsrope.jsrope._link(type(statement)("!({})".format(statement)), statement)
 
 
 def escape(obj):
     if isinstance(obj, dict):
         return "{{{}}}".format(", ".join(["{}: {}".format(repr(k), escape(v)) for k, v in obj.items()]))
-    elif isinstance(obj, jsrope.Code):
+    elif isinstance(obj, (jsrope.Code, jsrope.Array)):
         return str(obj)
     elif isinstance(obj, str):
         return '"{}"'.format(obj.replace('"', r'\"'))
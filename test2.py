@@ -1,6 +1,6 @@
 import flask
 
-from jsrope import Element, Flow, Switch, Int, For, Return, Function, If, true, false, Ajax, Util
+from jsrope import Element, Flow, Switch, Int, For, Return, Function, If, true, false, Ajax, Util, Script
 from jsrope.util import substitute, negative, jquery3_script
 
 app = flask.Flask(__name__)
@@ -23,13 +23,13 @@ def main():
                                              done=Util.alert(input_box.get_value())),
                                         Switch({is_prime(input_box.get_value().to_int()): p.change_inner_html("prime"),
                                                 "else": p.change_inner_html("not prime")})
-                                        )).prettify()
+                                        ))
 
     return flask.render_template_string("""
        <input id="name_input" type="text" style="width: 300px; height: 300px">
        <p>inner</p>
        {{ jquery3_url | safe}}
-       <script> {{ sc | safe }} </script>""", jquery3_url=jquery3_script, sc=Flow(input_box_event, is_prime.prettify()))
+       <script> {{ sc | safe }} </script>""", jquery3_url=jquery3_script, sc=Script(input_box_event).prettify())
 
 
 app.run(port=8888)
@@ -0,0 +1,31 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+
+@pytest.fixture
+def node():
+    """
+    Return function that runs JavaScript with node and returns its stdout. Tests using it are skipped without node.
+    """
+    path = shutil.which("node")
+    if path is None:
+        pytest.skip("node is not installed")
+
+    def run(code):
+        result = subprocess.run([path, "-e", code], capture_output=True, text=True, timeout=60)
+        assert result.returncode == 0, result.stderr
+        return result.stdout
+
+    return run
+
+
+@pytest.fixture
+def jquery():
+    """
+    Return JavaScript of jQuery stub whose `$.ajax` keeps requests in `requests`
+    """
+    with open(os.path.join(os.path.dirname(__file__), "jquery_stub.js")) as f:
+        return f.read()
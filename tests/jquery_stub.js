@@ -0,0 +1,49 @@
+// jQuery Deferred and $.ajax which keeps requests in `requests` to be answered by tests
+var requests = [];
+
+function Deferred() {
+    var callbacks = {resolved: [], rejected: []}, state = null, args;
+    var d = {
+        resolve: function () { return settle("resolved", arguments); },
+        reject: function () { return settle("rejected", arguments); },
+        done: function (f) { return on("resolved", f); },
+        fail: function (f) { return on("rejected", f); },
+        always: function (f) { return on("resolved", f), on("rejected", f); },
+        then: function (f, g) { return on("resolved", f), g ? on("rejected", g) : d; },
+        promise: function () { return d; },
+        state: function () { return state || "pending"; }
+    };
+
+    function settle(s, a) {
+        if (!state) {
+            state = s;
+            args = a;
+            callbacks[s].forEach(function (f) { f.apply(null, args); });
+        }
+        return d;
+    }
+
+    function on(s, f) {
+        if (state === s) {
+            f.apply(null, args);
+        } else if (!state) {
+            callbacks[s].push(f);
+        }
+        return d;
+    }
+
+    return d;
+}
+
+var $ = function () { throw new Error("no DOM in this stub"); };
+$.Deferred = Deferred;
+$.param = function (d) { return JSON.stringify(d); };
+$.ajax = function (options) {
+    var d = Deferred();
+    d.options = options;
+    d.aborted = false;
+    d.abort = function () { d.aborted = true; d.reject({status: 0}, "abort"); };
+    requests.push(d);
+    return d;
+};
+var window = global;
@@ -0,0 +1,76 @@
+import json
+
+from jsrope import Batch, Code, Element, Flow, For, Int
+from jsrope.util import substitute
+
+# elements with the ids `#a`, `#b` and `#list`, and frames run by `frame()`. DOM calls are kept in `log`.
+DOM = """
+var log = [], frames = [];
+function node(id) { return {id: id, value: "", html: "", children: [],
+                            appendChild: function (f) { log.push("insert " + id + " " + f.children.length);
+                                                        this.children = this.children.concat(f.children); }}; }
+var nodes = {a: node("a"), b: node("b"), list: node("list")};
+var document = {createDocumentFragment: function () { return {children: []}; }};
+function $(x) {
+    var n = typeof x === "string" ? nodes[x.slice(1)] : x;
+    return {length: 1, 0: n, each: function (f) { f.call(n); },
+            val: function (v) { if (arguments.length === 0) { return n.value; } log.push("val " + n.id); n.value = v; },
+            html: function (v) { log.push("html " + n.id); n.html = v; n.children = []; },
+            append: function (v) { if (n.id) { log.push("append " + n.id); } n.children.push(v); }};
+}
+var window = {requestAnimationFrame: function (f) { frames.push(f); }};
+function frame() { var f = frames; frames = []; f.forEach(function (f) { f(); }); }
+function state() { return JSON.stringify({log: log, frames: frames.length, a: nodes.a.value, b: nodes.b.value,
+                                          list: nodes.list.children, html: nodes.list.html}); }
+"""
+
+
+def run(node, batch, after=""):
+    out = node(DOM + "nodes.b.value = 'old';" + str(batch) + ";var before = state();frame();" + after +
+               "console.log('[' + before + ',' + state() + ']');")
+    return json.loads(out)
+
+
+def test_writes_wait_for_the_frame(node):
+    before, after = run(node, Batch(Element.by_id("a").change_value(Code("'x'")),
+                                    Element.by_id("b").change_value(Code("'y'"))))
+    assert before["log"] == [] and before["frames"] == 1
+    assert after["log"] == ["val a", "val b"] and after["a"] == "x" and after["b"] == "y"
+
+
+def test_reads_happen_before_writes(node):
+    a, b = Element.by_id("a"), Element.by_id("b")
+    _, after = run(node, Batch(b.change_value(Code("'new'")), a.change_value(b.get_value())))
+    assert after["a"] == "old" and after["b"] == "new"
+
+
+def test_appends_are_inserted_once(node):
+    items = Element.by_id("list")
+    i = Int("i")
+    batch = Batch(For(substitute(i, 0), i < Int(3), i.iadd(1), Flow(items.append(Code("'row' + i")))),
+                  items.append(Code("'last'")))
+    before, after = run(node, batch)
+    assert before["log"] == []
+    assert after["log"] == ["insert list 4"] and after["list"] == ["row0", "row1", "row2", "last"]
+
+
+def test_write_after_append_keeps_order(node):
+    items = Element.by_id("list")
+    _, after = run(node, Batch(items.append(Code("'a'")), items.change_inner_html(Code("'x'")),
+                               items.append(Code("'b'"))))
+    assert after["log"] == ["insert list 1", "html list", "insert list 1"]
+    assert after["list"] == ["b"] and after["html"] == "x"
+
+
+def test_batches_in_one_frame_share_it(node):
+    a = Element.by_id("a")
+    flow = Flow(Batch(a.change_value(Code("'1'"))), Code("var got = $('#a').val()"), Batch(a.change_value(Code("'2'"))))
+    before, after = run(node, flow, "got += ' ' + $('#a').val();log.push(got);")
+    assert before["frames"] == 1 and after["log"] == ["val a", "val a", " 2"]
+
+
+def test_runtime_is_defined_once_per_page():
+    a = Element.by_id("a")
+    code = str(Flow(Batch(a.change_value(Code("'1'"))), Batch(a.change_value(Code("'2'")))))
+    assert code.count("createDocumentFragment") == 1
+    assert code.endswith("window.__jsrope_batch.w($('#a'),'val','1');window.__jsrope_batch.w($('#a'),'val','2')")
@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+from jsrope import Data
+
+
+def test_small_data_is_literal():
+    assert str(Data({"a": [1, "x"]})) == '{"a":[1,"x"]}'
+
+
+def test_large_data_is_parsed():
+    code = str(Data({"a": "x" * 100}, threshold=10))
+    assert code == 'JSON.parse(\'{"a":"' + "x" * 100 + '"}\')'
+
+
+def test_safe_in_script():
+    code = str(Data({"a": "</script><!--", "b": "it's \\  "}, threshold=0))
+    assert "</script>" not in code and "<!--" not in code and " " not in code
+
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), -float("inf")])
+def test_nan_and_infinity_are_rejected(value):
+    with pytest.raises(ValueError):
+        Data({"x": value})
+
+
+def test_browser_reads_same_data(node):
+    data = {"text": "it's \"quoted\" \\ </script>   é", "n": [1, 2.5, None, True]}
+    for threshold in (0, 10 ** 6):
+        out = node("console.log(JSON.stringify({}))".format(Data(data, threshold=threshold)))
+        assert json.loads(out) == data
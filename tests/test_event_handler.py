@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from jsrope import Array, Element, Flow, Script
+from jsrope.jsrope import EventHandler
+from jsrope.util import substitute
+
+# minimal jQuery and DOM, enough for binding handlers
+dom = """
+var bound = [];
+function $(s) {
+    var el = {nodeType: 1, s: s};
+    var q = {length: 1, 0: el,
+             on: function (n, f) { bound.push([s, n]); return q; },
+             each: function (f) { f.call(el); return q; }};
+    return q;
+}
+var listeners = {};
+var document = {addEventListener: function (n, f) { (listeners[n] = listeners[n] || []).push(f); },
+                removeEventListener: function (n, f) {
+                    listeners[n] = (listeners[n] || []).filter(function (x) { return x !== f; }); }};
+var window = {requestIdleCallback: function (c) { setTimeout(function () {
+    c({didTimeout: false, timeRemaining: function () { return 1; }}); }, 0); }};
+global.window = window;
+"""
+
+
+def test_eager_handler():
+    assert str(Element("#a").on("click", Flow("f()"))) == "$('#a').on('click',function(e){f()})"
+
+
+def test_invalid_bind():
+    with pytest.raises(ValueError):
+        Element("#a").on("click", Flow("f()"), bind="later")
+
+
+def test_runtime_is_defined_once_per_page():
+    handlers = [Element("#a{}".format(i)).on("click", Flow("f()"), bind="idle") for i in range(100)]
+    for page in (Flow(*handlers), Script(*handlers)):
+        code = str(page)
+        assert code.count(EventHandler.runtime) == 1
+        assert code.startswith("window.__jsrope_bind=window.__jsrope_bind||")
+    eager = str(Flow(*[Element("#a{}".format(i)).on("click", Flow("f()")) for i in range(100)]))
+    assert len(str(Flow(*handlers))) < len(eager) * 2.5 + len(EventHandler.runtime)
+
+
+def test_standalone_handler_makes_runtime_in_place():
+    code = str(Element("#a").on("click", Flow("f()"), bind="visible"))
+    assert code.count(EventHandler.runtime) == 1
+    assert code.startswith("(window.__jsrope_bind||(window.__jsrope_bind=")
+
+
+def test_handler_in_expression_stays_expression(node):
+    handler = Element("#a").on("click", Flow("f()"), bind="idle")
+    out = node(dom + str(Array([handler])) + ";" + str(substitute("h", handler, "var")) + ";"
+               "setTimeout(function () { console.log(JSON.stringify([typeof h, bound])); }, 20);")
+    assert json.loads(out) == ["undefined", [["#a", "click"], ["#a", "click"]]]
+
+
+def test_idle_binding_runs(node):
+    page = Script(*[Element("#a{}".format(i)).on("click", Flow("f()"), bind="idle") for i in range(3)])
+    out = node(dom + str(page) + ";var before = bound.length;"
+               "setTimeout(function () { console.log(JSON.stringify([before, bound])); }, 20);")
+    before, bound = json.loads(out)
+    assert before == 0
+    assert bound == [["#a0", "click"], ["#a1", "click"], ["#a2", "click"]]
+
+
+def test_first_interaction_binding_runs(node):
+    page = Flow(Element("#a").on("keyup", Flow("f()"), bind="first-interaction"),
+                Element("#b").on("keyup", Flow("f()"), bind="first-interaction"))
+    out = node(dom + str(page) + ";var before = bound.length;listeners.keydown[0]();"
+               "console.log(JSON.stringify([before, bound, (listeners.keydown || []).length]));")
+    assert json.loads(out) == [0, [["#a", "keyup"], ["#b", "keyup"]], 0]
+
+
+def test_visible_without_observer_binds_at_once(node):
+    out = node(dom + str(Element("#a").on("click", Flow("f()"), bind="visible")) +
+               ";console.log(JSON.stringify(bound));")
+    assert json.loads(out) == [["#a", "click"]]
+
+
+def test_visible_binds_when_element_is_seen(node):
+    # one element per selector, so both handlers wait for the same element
+    observer = ("var els = {}, observed = [], seen;"
+                "$ = function (s) { var el = typeof s === 'string' ? (els[s] = els[s] || {nodeType: 1, s: s}) : s;"
+                "var q = {length: 1, 0: el, on: function (n) { bound.push([el.s, n]); return q; },"
+                "each: function (f) { f.call(el); return q; }};return q; };"
+                "window.IntersectionObserver = function (f) { seen = f;"
+                "this.observe = function (el) { observed.push(el); };"
+                "this.unobserve = function (el) { observed = observed.filter(function (x) { return x !== el; }); }; };")
+    page = Flow(Element("#a").on("click", Flow("f()"), bind="visible"),
+                Element("#a").on("focus", Flow("g()"), bind="visible"))
+    out = node(dom + observer + str(page) + ";var before = bound.length;"
+               "seen([{isIntersecting: false, target: observed[0]}]);var hidden = bound.length;"
+               "seen([{isIntersecting: true, target: observed[0]}]);"
+               "console.log(JSON.stringify([before, hidden, bound, observed.length]));")
+    assert json.loads(out) == [0, 0, [["#a", "click"], ["#a", "focus"]], 0]
@@ -0,0 +1,96 @@
+import array
+import json
+import sys
+from urllib.parse import urlencode
+
+import flask
+import pytest
+
+from jsrope import Ajax, Array, Float, Flow, Int, Object
+from jsrope.flask import ajax_handler, decode_array, decode_packed
+
+
+@pytest.fixture
+def numpy():
+    # NumPy is optional, and arrays are array.array without it
+    return pytest.importorskip("numpy")
+
+
+def route(ajax, **options):
+    app = flask.Flask(__name__)
+
+    @app.route("/data", methods=["GET", "POST"])
+    @ajax_handler(ajax, **options)
+    def data(ajax_data):
+        flask.g.data = ajax_data
+        return "ok"
+
+    return app
+
+
+def call(app, query):
+    with app.test_request_context("/data?" + query):
+        app.preprocess_request()
+        app.view_functions["data"]()
+        return flask.g.data
+
+
+def test_typed_arrays_are_decoded(numpy):
+    ajax = Ajax("/data", {"data": {"ints": Array(), "floats": Array(), "plain": Array(), "n": Int("n"),
+                                   "nested": {"xs": Array()}}})
+    app = route(ajax, arrays={"ints": Int, "floats": Float, ("nested", "xs"): "uint8"})
+    data = call(app, urlencode([("ints[]", "1"), ("ints[]", "-2"), ("floats[]", "0.5"), ("plain[]", "1"),
+                                ("plain[]", "2"), ("n", "3"), ("nested[xs][]", "255")]))
+    assert data["ints"].dtype == numpy.int64 and data["ints"].tolist() == [1, -2]
+    assert data["floats"].dtype == numpy.float64 and data["floats"].tolist() == [0.5]
+    assert data["nested"]["xs"].dtype == numpy.uint8 and data["nested"]["xs"].tolist() == [255]
+    assert data["plain"] == ["1", "2"] and data["n"] == 3
+
+
+def test_empty_and_invalid_arrays():
+    app = route(Ajax("/data", {"data": {"xs": Array()}}), arrays={"xs": Int})
+    assert call(app, "")["xs"].tolist() == []
+    with pytest.raises(ValueError):
+        call(app, "xs[]=a")
+
+
+def test_without_numpy(monkeypatch):
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    ints = decode_array(["1", "2"], Int)
+    assert isinstance(ints, array.array) and ints.typecode == "q" and ints.tolist() == [1, 2]
+    packed = decode_packed("AACAPwAAAEA=", "float32")
+    assert isinstance(packed, array.array) and packed.tolist() == [1.0, 2.0]
+
+
+def test_packed_array_is_writable():
+    values = decode_packed("AQACAA==", "int16")
+    values[0] = 5
+    assert values.tolist() == [5, 2]
+
+
+@pytest.mark.parametrize("dtype, values", [("int8", [-128, 0, 127]), ("uint16", [0, 65535]),
+                                           ("int32", [-2 ** 31, 2 ** 31 - 1]), ("float32", [0.5, -1.25]),
+                                           ("float64", [0.1, 1e300])])
+def test_packed_client_round_trip(node, jquery, numpy, dtype, values):
+    ajax = Ajax("/data", {"method": "POST", "data": {"xs": Object("xs"), "n": Int("n")}}, packed={"xs": dtype})
+    out = node(jquery + "var btoa = global.btoa, xs = {}, n = 7;".format(json.dumps(values)) + str(ajax) +
+               ";console.log(JSON.stringify(requests[0].options.data));")
+    sent = json.loads(out)
+    app = route(ajax)
+    with app.test_request_context("/data", method="POST", data=sent):
+        app.preprocess_request()
+        app.view_functions["data"]()
+        data = flask.g.data
+    assert data["xs"].dtype == numpy.dtype(dtype) and data["xs"].tolist() == values and data["n"] == 7
+
+
+def test_unknown_packed_type():
+    with pytest.raises(ValueError):
+        Ajax("/data", {"data": {"xs": Array()}}, packed={"xs": "int64"})
+
+
+def test_encoder_is_defined_once_per_page():
+    ajax = Ajax("/data", {"method": "POST", "data": {"xs": Object("xs"), "ys": Object("ys")}},
+                packed={"xs": "int8", "ys": "float32"})
+    code = str(Flow(ajax, ajax))
+    assert code.count("fromCharCode") == 1 and code.count("window.__jsrope_pack(") == 4
@@ -0,0 +1,103 @@
+import datetime
+import json
+
+import flask
+import pytest
+
+from jsrope import Ajax, Code, Int, Object
+from jsrope.flask import ajax_handler
+
+
+def cached_client(node, jquery, script, ttl=10, size=100):
+    """
+    Run `script` where `ajax()` sends cached request of {q: d.q} and `now` is the time of Date.now(),
+    and return [data of requests sent, responses got]
+    """
+    ajax = Ajax("/search", {"data": {"q": Object("d.q")}}, cache_ttl=ttl, cache_size=size,
+                done=Code("function(r){got.push(r)}"))
+    out = node(jquery + "var got = [], now = 0, d = {q: 1};Date.now = function () { return now; };"
+               "function ajax(){" + str(ajax) + "}" + script +
+               "console.log(JSON.stringify([requests.map(function (r) { return r.options.data; }), got]));")
+    return json.loads(out)
+
+
+def test_same_data_is_answered_from_cache(node, jquery):
+    sent, got = cached_client(node, jquery, "ajax();requests[0].resolve('one');ajax();now = 9999;ajax();")
+    assert sent == [{"q": 1}] and got == ["one", "one", "one"]
+
+
+def test_different_data_is_sent(node, jquery):
+    sent, got = cached_client(node, jquery, "ajax();requests[0].resolve('one');d.q = 2;ajax();"
+                                            "requests[1].resolve('two');d.q = 1;ajax();")
+    assert sent == [{"q": 1}, {"q": 2}] and got == ["one", "two", "one"]
+
+
+def test_expired_response_is_sent_again(node, jquery):
+    sent, got = cached_client(node, jquery, "ajax();requests[0].resolve('one');now = 10000;ajax();"
+                                            "requests[1].resolve('two');ajax();")
+    assert len(sent) == 2 and got == ["one", "two", "two"]
+
+
+def test_failed_response_is_not_kept(node, jquery):
+    sent, got = cached_client(node, jquery, "ajax();requests[0].reject({status: 500}, 'error');ajax();")
+    assert len(sent) == 2 and got == []
+
+
+def test_oldest_response_is_dropped(node, jquery):
+    sent, got = cached_client(node, jquery, "[1, 2, 3, 1, 3].forEach(function (q) {"
+                                            "d.q = q;ajax();var r = requests[requests.length - 1];"
+                                            "if (r.state() === 'pending') { r.resolve(q); } });", size=2)
+    assert [x["q"] for x in sent] == [1, 2, 3, 1] and got == [1, 2, 3, 1, 3]
+
+
+def test_cache_is_only_for_get():
+    with pytest.raises(ValueError):
+        Ajax("/save", {"method": "POST", "data": {}}, cache_ttl=10)
+
+
+@pytest.fixture
+def app():
+    return flask.Flask(__name__)
+
+
+def route(app, calls, **options):
+    ajax = Ajax("/item", {"data": {"id": Int("id")}})
+
+    @app.route("/item")
+    @ajax_handler(ajax, **options)
+    def item(ajax_data):
+        calls.append(ajax_data)
+        return "item {}".format(ajax_data["id"])
+
+    return app.test_client()
+
+
+def test_etag(app):
+    calls = []
+    client = route(app, calls, etag=lambda data: "v{}".format(data["id"]))
+    response = client.get("/item?id=1")
+    assert response.status_code == 200 and response.headers["ETag"] == '"v1"'
+    assert client.get("/item?id=1", headers={"If-None-Match": '"v1"'}).status_code == 304
+    assert client.get("/item?id=2", headers={"If-None-Match": '"v1"'}).status_code == 200
+    assert calls == [{"id": 1}, {"id": 2}]
+
+
+def test_last_modified(app):
+    calls = []
+    modified = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    client = route(app, calls, last_modified=lambda data: modified)
+    assert client.get("/item?id=1").headers["Last-Modified"] == "Wed, 01 Jan 2020 00:00:00 GMT"
+    later = "Thu, 02 Jan 2020 00:00:00 GMT"
+    earlier = "Tue, 31 Dec 2019 00:00:00 GMT"
+    assert client.get("/item?id=1", headers={"If-Modified-Since": later}).status_code == 304
+    assert client.get("/item?id=1", headers={"If-Modified-Since": earlier}).status_code == 200
+    assert len(calls) == 2
+
+
+def test_conditional(app):
+    calls = []
+    client = route(app, calls, conditional=True)
+    tag = client.get("/item?id=1").headers["ETag"]
+    response = client.get("/item?id=1", headers={"If-None-Match": tag})
+    assert response.status_code == 304 and response.data == b""
+    assert client.get("/item?id=2", headers={"If-None-Match": tag}).status_code == 200
@@ -0,0 +1,81 @@
+import json
+
+import flask
+import pytest
+
+from jsrope import Ajax, Code, Int, Object, Str
+from jsrope.flask import ajax_handler, MemoryDeltaStore
+
+
+@pytest.fixture
+def client():
+    app = flask.Flask(__name__)
+    ajax = Ajax("/save", {"method": "POST", "data": {"name": Str("n"), "count": Int("c")}}, delta=True)
+
+    @app.route("/save", methods=["POST"])
+    @ajax_handler(ajax, delta_store=MemoryDeltaStore())
+    def save(ajax_data):
+        return flask.jsonify(ajax_data)
+
+    return app.test_client()
+
+
+def send(client, base, version, **data):
+    form = {"_jsrope_client": "c1", "_jsrope_base": base, "_jsrope_version": version, "_jsrope_keys[]": list(data)}
+    form.update(data)
+    return client.post("/save", data=form)
+
+
+def test_full_then_delta(client):
+    assert send(client, 0, 1, name="a", count="3").get_json() == {"name": "a", "count": 3}
+    assert send(client, 1, 2, count="4").get_json() == {"name": "a", "count": 4}
+    assert send(client, 2, 3, name="b").get_json() == {"name": "b", "count": 4}
+
+
+def test_unknown_base_is_conflict(client):
+    assert send(client, 5, 6, count="4").status_code == 409
+    send(client, 0, 1, name="a", count="3")
+    assert send(client, 7, 8, count="4").status_code == 409
+
+
+def test_malformed_tokens_are_bad_request(client):
+    assert send(client, "x", 1, count="4").status_code == 400
+    assert send(client, 0, "1.5", count="4").status_code == 400
+
+
+def test_request_without_delta_fields(client):
+    assert client.post("/save", data={"name": "a", "count": "3"}).get_json() == {"name": "a", "count": 3}
+
+
+def delta_client(node, jquery, script):
+    """
+    Run `script` where `ajax()` sends the delta request of form {name, count}, and return data of the requests
+    """
+    ajax = Ajax("/save", {"method": "POST", "data": {"name": Object("f.name"), "count": Object("f.count")}},
+                delta=True, done=Code("function(r){got.push(r)}"))
+    out = node(jquery + "var got = [], f = {name: 'a', count: 3};function ajax(){" + str(ajax) + "}" + script +
+               "console.log(JSON.stringify(requests.map(function (r) { return r.options.data; })));")
+    return [{k: v for k, v in data.items() if k != "_jsrope_client"} for data in json.loads(out)]
+
+
+def test_client_sends_changed_keys(node, jquery):
+    sent = delta_client(node, jquery, "ajax();requests[0].resolve('ok');f.count = 4;ajax();requests[1].resolve('ok');"
+                                      "ajax();")
+    assert sent == [
+        {"name": "a", "count": 3, "_jsrope_base": 0, "_jsrope_version": 1, "_jsrope_keys": ["name", "count"]},
+        {"count": 4, "_jsrope_base": 1, "_jsrope_version": 2, "_jsrope_keys": ["count"]},
+        {"_jsrope_base": 2, "_jsrope_version": 3, "_jsrope_keys": []},
+    ]
+
+
+def test_client_resends_everything_on_conflict(node, jquery):
+    sent = delta_client(node, jquery, "ajax();requests[0].resolve('ok');f.name = 'b';ajax();"
+                                      "requests[1].reject({status: 409}, 'error');requests[2].resolve('ok');")
+    assert sent[1]["_jsrope_keys"] == ["name"]
+    assert sent[2] == {"name": "b", "count": 3, "_jsrope_base": 0, "_jsrope_version": 3,
+                       "_jsrope_keys": ["name", "count"]}
+
+
+def test_failed_request_is_not_acknowledged(node, jquery):
+    sent = delta_client(node, jquery, "ajax();requests[0].reject({status: 500}, 'error');ajax();")
+    assert sent[1]["_jsrope_base"] == 0 and sent[1]["_jsrope_keys"] == ["name", "count"]
@@ -0,0 +1,103 @@
+import queue
+import threading
+import time
+
+import flask
+import pytest
+
+from jsrope.flask import event_stream, format_event, no_event
+
+
+def test_format_event():
+    assert format_event({"a": 1}, "tick", 3) == 'id: 3\nevent: tick\ndata: {"a": 1}\n\n'
+    with pytest.raises(ValueError):
+        format_event(1, "a\nb")
+
+
+def make_app(source, **kwargs):
+    app = flask.Flask(__name__)
+
+    @app.route("/events")
+    def events():
+        return event_stream(source, **kwargs)
+
+    return app.test_client()
+
+
+def test_events_and_resume():
+    def source(last_id):
+        start = int(last_id) + 1 if last_id else 0
+        for i in range(start, 3):
+            yield "tick", {"i": i}, i
+
+    client = make_app(source, retry=1000)
+    response = client.get("/events")
+    assert response.mimetype == "text/event-stream"
+    assert response.get_data(as_text=True) == "retry: 1000\n\n" + "".join(
+        [format_event({"i": i}, "tick", i) for i in range(3)])
+    resumed = client.get("/events", headers={"Last-Event-ID": "1"}).get_data(as_text=True)
+    assert resumed == "retry: 1000\n\n" + format_event({"i": 2}, "tick", 2)
+
+
+def test_heartbeat_while_source_waits():
+    def source():
+        time.sleep(0.3)
+        yield 1
+
+    text = make_app(source(), heartbeat=0.1).get("/events").get_data(as_text=True)
+    assert text.startswith(": heartbeat\n\n") and text.endswith(format_event(1))
+
+
+def test_source_is_closed_when_client_is_gone():
+    closed = threading.Event()
+    produced = []
+
+    def source():
+        try:
+            i = 0
+            while True:
+                time.sleep(0.01)
+                produced.append(i)
+                yield no_event if i % 2 else i
+                i += 1
+        finally:
+            closed.set()
+
+    response = make_app(source()).get("/events", buffered=False)
+    first = next(response.response)
+    assert first == format_event(0).encode()
+    response.close()
+    assert closed.wait(2)
+    count = len(produced)
+    time.sleep(0.1)
+    assert len(produced) == count
+
+
+def test_queue_is_bounded():
+    produced = []
+    closed = threading.Event()
+
+    def source():
+        try:
+            for i in range(1000):
+                produced.append(i)
+                yield i
+        finally:
+            closed.set()
+
+    response = make_app(source(), max_queue=5).get("/events", buffered=False)
+    next(response.response)
+    time.sleep(0.2)
+    assert len(produced) <= 8
+    response.close()
+    assert closed.wait(2)
+
+
+def test_source_error_is_raised():
+    def source():
+        yield 1
+        raise RuntimeError("broken")
+
+    client = make_app(source())
+    with pytest.raises(RuntimeError):
+        client.get("/events").get_data()
@@ -0,0 +1,95 @@
+import json
+import socket
+
+import flask
+import pytest
+
+from jsrope import Ajax, Code, Int, Object
+from jsrope.flask import ajax_handler, client_disconnected
+
+
+class ProbeSocket:
+    """
+    Socket whose peek answers `peek`, or raises it
+    """
+
+    def __init__(self, peek):
+        self.a, self.b = socket.socketpair()
+        self.a.send(b"x")
+        self.peek = peek
+
+    def fileno(self):
+        return self.b.fileno()
+
+    def recv(self, size, flags=0):
+        if isinstance(self.peek, Exception):
+            raise self.peek
+        return self.peek
+
+    def close(self):
+        self.a.close()
+        self.b.close()
+
+
+@pytest.fixture
+def app():
+    return flask.Flask(__name__)
+
+
+@pytest.mark.parametrize("peek, expected", [(b"x", False), (b"", True), (OSError(), True),
+                                            (ValueError("flags are not allowed"), False)])
+def test_client_disconnected(app, peek, expected):
+    sock = ProbeSocket(peek)
+    try:
+        with app.test_request_context(environ_base={"werkzeug.socket": sock}):
+            assert client_disconnected() is expected
+    finally:
+        sock.close()
+
+
+def test_without_socket(app):
+    with app.test_request_context():
+        assert client_disconnected() is False
+
+
+def test_view_of_gone_client_is_skipped(app):
+    ajax = Ajax("/search", {"data": {"q": Int("q")}}, latest=True)
+    calls = []
+
+    @app.route("/search")
+    @ajax_handler(ajax)
+    def search(ajax_data):
+        calls.append(ajax_data)
+        return "ok"
+
+    client = app.test_client()
+    assert client.get("/search?q=1").data == b"ok"
+    closed = ProbeSocket(b"")
+    try:
+        assert client.get("/search?q=2", environ_base={"werkzeug.socket": closed}).status_code == 499
+    finally:
+        closed.close()
+    assert calls == [{"q": 1}]
+
+
+def test_latest_aborts_previous_request(node, jquery):
+    ajax = Ajax("/search", {"data": {"q": Int("q")}}, latest=True, done=Code("function(r){got.push(r)}"))
+    out = node(jquery + "var got = [], q = 1;" + str(ajax) + ";q = 2;" + str(ajax) + ";"
+               "requests[0].resolve('first');requests[1].resolve('second');"
+               "console.log(JSON.stringify([requests.map(function (r) { return r.aborted; }), got]));")
+    assert json.loads(out) == [[True, False], ["second"]]
+
+
+def test_call_sites_are_independent(node, jquery):
+    a = Ajax("/search", {"data": {}}, latest="a")
+    b = Ajax("/search", {"data": {}}, latest="b")
+    out = node(jquery + str(a) + ";" + str(b) + ";"
+               "console.log(JSON.stringify(requests.map(function (r) { return r.aborted; })));")
+    assert json.loads(out) == [False, False]
+
+
+def test_data_may_use_any_variable_name(node, jquery):
+    ajax = Ajax("/search", {"data": {"q": Object("s + n + r + o")}}, latest=True)
+    out = node(jquery + "var s = 1, n = 2, r = 3, o = 4;" + str(ajax) + ";"
+               "console.log(JSON.stringify(requests[0].options.data));")
+    assert json.loads(out) == {"q": 10}
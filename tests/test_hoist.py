@@ -0,0 +1,59 @@
+import pytest
+
+from jsrope import Code, Flow, For, Function, If, Int, Return, While, false, true
+from jsrope.util import negative, substitute
+
+
+def is_prime_loop(hoist):
+    number = Int("num")
+    i = Int("i")
+    return For(substitute(i, 2), i < (number ** 0.5).to_int() + 1, i.iadd(1),
+               Flow(If(negative(number % i), Flow(Return(false)))), hoist=hoist)
+
+
+def test_for_condition_is_hoisted():
+    assert str(is_prime_loop(True)) == ("{const _jsrope_inv0 = parseInt(num ** 0.5) + 1;"
+                                        "for(let i = 2;(i < _jsrope_inv0);i += 1){if (!(num % i)){return false}}}")
+
+
+def test_without_hoist_loop_is_unchanged():
+    assert str(is_prime_loop(False)).startswith("for(let i = 2;(i < parseInt(num ** 0.5) + 1);")
+
+
+def test_operand_of_loop_variable_stays_in_loop():
+    i = Int("i")
+    code = str(For(substitute(i, 2), (i < (Int("num") ** 0.5)).to_int() + 1, i.iadd(1), Flow(Code("c()")),
+                   hoist=True))
+    assert code == "{const _jsrope_inv0 = num ** 0.5;for(let i = 2;(parseInt((i < _jsrope_inv0))) + 1;i += 1){c()}}"
+
+
+def test_variables_assigned_in_loop_are_not_hoisted():
+    i, n = Int("i"), Int("n")
+    assert str(While(i < n * 2, Flow(n.iadd(1)), hoist=True)) == "while((i < n * 2)){n += 1}"
+    assert str(While(i < n * 2, Flow(Code("n = f()")), hoist=True)) == "while((i < n * 2)){n = f()}"
+    assert str(While(i < n * 2, Flow(Code("n++")), hoist=True)) == "while((i < n * 2)){n++}"
+
+
+def test_while_condition_is_hoisted():
+    i, n = Int("i"), Int("n")
+    code = str(While(i < n * 2, Flow(i.iadd(1)), hoist=True))
+    assert code == "{const _jsrope_inv0 = n * 2;while((i < _jsrope_inv0)){i += 1}}"
+
+
+def test_same_operation_is_declared_once():
+    i, n = Int("i"), Int("n")
+    code = str(For(substitute(i, 0), i < n.floor() * 2, i.iadd(n.floor() * 2), Flow(Code("c()")), hoist=True))
+    assert code.count("const ") == 1 and code.count("_jsrope_inv0") == 3
+
+
+def test_impure_and_raw_code_are_not_hoisted():
+    i = Int("i")
+    assert str(While(i < Code("f()"), Flow(i.iadd(1)), hoist=True)) == "while((i < f())){i += 1}"
+    assert str(While(Code("i < g(n)"), Flow(i.iadd(1)), hoist=True)) == "while(i < g(n)){i += 1}"
+
+
+@pytest.mark.parametrize("hoist", [False, True])
+def test_hoisted_loop_computes_the_same(node, hoist):
+    is_prime = Function("is_prime", {"num": None}, Flow(is_prime_loop(hoist), Return(true)))
+    out = node(str(is_prime) + ";console.log([2, 9, 13, 25, 97, 100].map(is_prime).join())")
+    assert out.strip() == "true,false,true,false,true,false"
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+# microseconds of `import jsrope` (cumulative, as reported by -X importtime); it takes well under 1ms
+# when nothing heavy is imported, and tens of ms once jsbeautifier or jsrope.jsrope is pulled in
+BUDGET_US = 20000
+
+
+def _run(code, *options):
+    return subprocess.run([sys.executable, *options, "-c", code], capture_output=True, text=True, check=True)
+
+
+def _import_time(module):
+    stderr = _run("import " + module, "-X", "importtime").stderr
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1])
+    raise AssertionError("no import time of {} in\n{}".format(module, stderr))
+
+
+def test_import_time_budget():
+    # best of three, so a busy machine doesn't fail the budget
+    spent = min(_import_time("jsrope") for _ in range(3))
+    assert spent < BUDGET_US, "import jsrope took {}us, over the budget of {}us".format(spent, BUDGET_US)
+
+
+def test_import_loads_nothing_heavy():
+    out = _run("import sys, jsrope; print(' '.join(sorted(sys.modules)))").stdout.split()
+    for module in ("jsbeautifier", "jsrope.jsrope", "flask", "django", "jinja2", "numpy"):
+        assert module not in out
+
+
+def test_beautifier_loaded_on_prettify():
+    out = _run("import sys, jsrope; from jsrope import Flow, Code; f = Flow(Code('a()'));"
+               "print('jsbeautifier' in sys.modules); f.prettify(); print('jsbeautifier' in sys.modules)").stdout
+    assert out.split() == ["False", "True"]
@@ -0,0 +1,80 @@
+import gc
+import pickle
+import threading
+
+from jsrope import Flow, Int, Object, Str, interned
+from jsrope.jsrope import _intern_table
+
+
+def test_same_arguments_make_same_object():
+    with interned():
+        assert Int("a") is Int("a") is Int(code="a")
+        assert Str("'a'") is Str("'a'")
+        assert Int("a") is not Object("a")
+        assert Int("a") is not Int("a", True)
+        assert Int("a", handler=int) is not Int("a")
+        assert Int(1) is not Int(True) and Int(1) is not Int("1")
+    assert Int("a") is not Int("a")
+
+
+def test_interned_node_keeps_its_attributes():
+    with interned():
+        a = Int("a", handler=int)
+        assert Int("a", handler=int).handler is int and a.to_code() == "a"
+
+
+def test_unhashable_handler_is_not_interned():
+    handler = [int]
+    with interned():
+        assert Int("a", handler=handler) is not Int("a", handler=handler)
+
+
+def test_hash_is_cached_only_when_interned():
+    with interned():
+        a = Int("a")
+        assert hash(a) == hash(Int("a")) and a.__dict__["_hash"] == hash(a)
+    b = Int("a")
+    assert hash(b) == hash(a) and "_hash" not in b.__dict__
+
+
+def test_nested_block_can_disable():
+    with interned():
+        with interned(False):
+            assert Int("a") is not Int("a")
+        assert Int("a") is Int("a")
+
+
+def test_other_threads_are_not_interned():
+    got = []
+    with interned():
+        thread = threading.Thread(target=lambda: got.append(Int("a") is Int("a")))
+        thread.start()
+        thread.join()
+    assert got == [False]
+
+
+def test_unused_nodes_are_released():
+    with interned():
+        a = Int("released")
+        assert a in _intern_table.values()
+        del a
+        gc.collect()
+        assert all(x.to_code() != "released" for x in _intern_table.values())
+
+
+def test_pickled_node_is_not_interned():
+    with interned():
+        a = Int("a")
+        hash(a)
+        loaded = pickle.loads(pickle.dumps(a))
+    assert loaded is not a and "_interned" not in loaded.__dict__ and "_hash" not in loaded.__dict__
+    assert str(loaded) == "a"
+
+
+def test_rendered_code_is_unchanged():
+    def build():
+        return Flow(*[Int("n") + Int(i % 3) for i in range(10)])
+
+    plain = str(build())
+    with interned():
+        assert str(build()) == plain
@@ -0,0 +1,71 @@
+import json
+
+import jinja2
+import pytest
+
+from jsrope import Element, Flow, Script, Util
+from jsrope.jinja import JsropeExtension, builder
+from jsrope.util import minify
+
+
+@pytest.fixture
+def env():
+    env = jinja2.Environment(extensions=[JsropeExtension], autoescape=True)
+    calls = []
+
+    @builder(env)
+    def main(user_id=None, name=None):
+        calls.append((user_id, name))
+        flow = Flow(Util.alert(user_id)) if user_id is not None else Flow(Util.alert("'hi'"))
+        return Script(Element("#a").on("click", flow))
+
+    env.calls = calls
+    return env
+
+
+def test_tag_renders_when_compiled(env):
+    template = env.from_string('<script>{% jsrope "main" %}</script>')
+    first, second = template.render(), template.render()
+    assert len(env.calls) == 1
+    assert first == second == "<script>{}</script>".format(env.jsrope_builders["main"]())
+
+
+def test_params_are_passed_as_json(env, node):
+    template = env.from_string('{% jsrope "main", user_id=uid %}')
+    first = template.render(uid="</script><b>")
+    second = template.render(uid=3)
+    assert len(env.calls) == 1 and "&lt;" not in first and "</script>" not in first
+    assert first.endswith("({})".format(json.dumps("</script><b>").replace("</", "<\\/")))
+    out = node("""
+        var alerted = [];
+        function alert(x) { alerted.push(x); }
+        function $() { return {on: function (n, f) { f(); }}; }
+        """ + second + ";" + first + ";console.log(JSON.stringify(alerted));")
+    assert json.loads(out) == [3, "</script><b>"]
+
+
+def test_mode(env):
+    code = env.from_string('{% jsrope "main", mode="minify" %}').render()
+    assert code == minify(str(env.jsrope_builders["main"]()))
+
+
+@pytest.mark.parametrize("source, message", [
+    ('{% jsrope "missing" %}', "not registered"),
+    ('{% jsrope "main", mode="fast" %}', "mode has to be one of"),
+    ('{% jsrope name %}', "has to be a constant"),
+    ('{% jsrope "main", mode=m %}', "has to be a constant"),
+])
+def test_errors_at_compile_time(env, source, message):
+    with pytest.raises(jinja2.TemplateSyntaxError, match=message):
+        env.from_string(source)
+
+
+def test_global_is_cached_per_names(env):
+    template = env.from_string('{{ jsrope("main", user_id=uid) }}|{{ jsrope("main", mode="minify") }}')
+    first = template.render(uid=1)
+    second = template.render(uid=2)
+    assert len(env.calls) == 2
+    assert first.split("|")[0].endswith("(1)") and second.split("|")[0].endswith("(2)")
+    assert first.split("|")[1] == second.split("|")[1]
+    with pytest.raises(KeyError):
+        env.from_string('{{ jsrope("missing") }}').render()
@@ -0,0 +1,103 @@
+import json
+import os
+
+import flask
+import pytest
+
+from jsrope import Code, Flow, Function, Int
+from jsrope.chunks import ChunkRegistry
+from jsrope.flask import serve_chunks
+
+# document whose <script> elements run chunks of `chunks` (url: code), or fail for urls not in it
+DOM = """
+var window = global, loads = [];
+var document = {
+    createElement: function () { return {}; },
+    head: {appendChild: function (s) {
+        loads.push(s.src);
+        setTimeout(function () { if (s.src in chunks) { eval(chunks[s.src]); s.onload(); } else { s.onerror({}); } });
+    }}
+};
+"""
+
+
+@pytest.fixture
+def registry():
+    return ChunkRegistry(url_prefix="/chunks/")
+
+
+def run(node, registry, code, script):
+    chunks = {registry.url(i): registry.get(i) for i in registry}
+    return json.loads(node(DOM + "var chunks = {};".format(json.dumps(chunks)) + str(code) + ";" + script))
+
+
+def test_body_is_split_into_chunk(registry):
+    f = Function("f", {"a": None}, Flow(Code("return secret(a)")), lazy=registry)
+    code = str(f)
+    assert "secret" not in code and len(registry) == 1
+    chunk_id = next(iter(registry))
+    assert code.count(chunk_id) == 2 and "secret(a)" in registry.get(chunk_id)
+
+
+def test_same_body_is_one_chunk(registry):
+    Function("f", {"a": None}, Flow(Code("return a")), lazy=registry).to_code()
+    Function("g", {"a": None}, Flow(Code("return a")), lazy=registry).to_code()
+    Flow(Code("x()"), lazy=registry).to_code()
+    assert len(registry) == 2
+
+
+def test_loader_is_defined_once_per_page(registry):
+    f = Function("f", {"a": None}, Flow(Code("return a")), lazy=registry)
+    code = str(Flow(f, f(Int(1)), Flow(Code("x()"), lazy=registry), Flow(Code("y()"), lazy=registry)))
+    assert code.count("createElement") == 1 and code.count("window.__jsrope_load(") == 3
+
+
+def test_chunk_is_loaded_once(node, registry):
+    f = Function("f", {"a": None, "f": None}, Flow(Code("return a * f")), lazy=registry)
+    out = run(node, registry, f, "Promise.all([f(2, 3), f(4, 5)]).then(function (r) {"
+                                 "return f(6, 7).then(function (x) { console.log(JSON.stringify([r, x, loads])); });"
+                                 "});")
+    assert out == [[6, 20], 42, ["/chunks/{}.js".format(next(iter(registry)))]]
+
+
+def test_defaults_are_passed(node, registry):
+    f = Function("lz", {"x": "5", "a": "1"}, Flow(Code("return x * 2 + a")), lazy=registry)
+    out = run(node, registry, f, "Promise.all([lz(), lz(3)]).then(function (r) { console.log(JSON.stringify(r)); });")
+    assert out == [11, 7]
+
+
+def test_lazy_flow_gets_event(node, registry):
+    flow = Flow(Code("got.push(e.type)"), lazy=registry)
+    out = run(node, registry, "var got = [];function handler(e){" + str(flow) + "}",
+              "handler({type: 'click'});setTimeout(function () { console.log(JSON.stringify(got)); }, 10);")
+    assert out == ["click"]
+
+
+def test_failed_load_is_retried(node, registry):
+    f = Function("f", {}, Flow(Code("return 1")), lazy=registry)
+    out = run(node, registry, f, "var url = Object.keys(chunks)[0], code = chunks[url];delete chunks[url];"
+                                 "f().catch(function () { chunks[url] = code;return f(); })"
+                                 ".then(function (x) { console.log(JSON.stringify([x, loads.length])); });")
+    assert out == [1, 2]
+
+
+def test_serve_chunks(registry):
+    Function("f", {}, Flow(Code("return 1")), lazy=registry).to_code()
+    chunk_id = next(iter(registry))
+    app = flask.Flask(__name__)
+    serve_chunks(app, registry)
+    client = app.test_client()
+    response = client.get(registry.url(chunk_id))
+    assert response.status_code == 200 and response.mimetype == "text/javascript"
+    assert response.get_data(as_text=True) == registry.get(chunk_id)
+    assert "immutable" in response.headers["Cache-Control"] and "max-age=31536000" in response.headers["Cache-Control"]
+    assert client.get(registry.url(chunk_id), headers={"If-None-Match": '"{}"'.format(chunk_id)}).status_code == 304
+    assert client.get("/chunks/unknown.js").status_code == 404
+
+
+def test_save(registry, tmp_path):
+    Flow(Code("x()"), lazy=registry).to_code()
+    registry.save(str(tmp_path))
+    chunk_id = next(iter(registry))
+    assert os.listdir(str(tmp_path)) == ["{}.js".format(chunk_id)]
+    assert (tmp_path / "{}.js".format(chunk_id)).read_text(encoding="utf-8") == registry.get(chunk_id)
@@ -0,0 +1,100 @@
+import flask
+import pytest
+
+import jsrope.metrics
+from jsrope import Ajax, Int, Str
+from jsrope.flask import ajax_handler
+from jsrope.metrics import MemoryMetrics, Metrics, Sample, percentiles
+
+
+def route(metrics=None, view=None):
+    app = flask.Flask(__name__)
+    ajax = Ajax("/save", {"method": "POST", "data": {"count": Int("c"), "user": {"name": Str("n")}}})
+
+    @app.route("/save", methods=["POST"])
+    @ajax_handler(ajax, metrics=metrics)
+    def save(ajax_data):
+        return view(ajax_data) if view else "ok"
+
+    return app.test_client()
+
+
+def test_request_is_recorded():
+    metrics = MemoryMetrics()
+    client = route(metrics)
+    assert client.post("/save", data={"count": "3", "user[name]": "a"}).status_code == 200
+    (sample,) = metrics._samples["save"]
+    assert sample.fields == 2 and sample.failures == 0 and sample.payload_size == len("count=3&user%5Bname%5D=a")
+    assert sample.decode_time >= 0 and sample.view_time >= 0
+
+
+def test_conversion_failure_is_recorded():
+    metrics = MemoryMetrics()
+    client = route(metrics)
+    assert client.post("/save", data={"count": "x", "user[name]": "a"}).status_code == 500
+    (sample,) = metrics._samples["save"]
+    assert sample.failures == 1 and sample.view_time is None
+    assert metrics.summary()["save"]["failures"] == 1
+
+
+def test_error_of_view_is_not_a_failure():
+    metrics = MemoryMetrics()
+
+    def view(data):
+        raise KeyError("x")
+
+    assert route(metrics, view).post("/save", data={"count": "1", "user[name]": "a"}).status_code == 500
+    (sample,) = metrics._samples["save"]
+    assert sample.failures == 0 and sample.view_time is not None
+
+
+def test_http_errors_are_not_failures():
+    metrics = MemoryMetrics()
+    assert route(metrics, lambda data: flask.abort(404)).post("/save", data={"count": "1"}).status_code == 404
+    assert metrics._samples["save"][0].failures == 0
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    class Recording(Metrics):
+        def record(self, sample):
+            raise AssertionError("recorded while disabled")
+
+    monkeypatch.setattr(jsrope.metrics, "default", Recording())
+    assert route().post("/save", data={"count": "1", "user[name]": "a"}).status_code == 200
+
+
+def test_default_metrics(monkeypatch):
+    metrics = MemoryMetrics()
+    monkeypatch.setattr(jsrope.metrics, "default", metrics)
+    route().post("/save", data={"count": "1", "user[name]": "a"})
+    assert metrics.summary()["save"]["count"] == 1
+
+
+def sample(value, endpoint="e"):
+    return Sample(endpoint, value, None, int(value), 0, 0)
+
+
+def test_percentiles_and_histogram():
+    metrics = MemoryMetrics()
+    for value in range(1, 101):
+        metrics.record(sample(value))
+    assert metrics.percentiles("e", "decode_time") == {50: 50, 90: 90, 99: 99}
+    assert metrics.histogram("e", "fields", [10, 50]) == [10, 40, 50]
+    assert metrics.values("e", "view_time") == []
+    summary = metrics.summary()["e"]
+    assert summary["count"] == 100 and summary["decode_time"]["max"] == 100 and summary["view_time"][50] is None
+    metrics.clear()
+    assert metrics.summary() == {}
+
+
+def test_only_last_samples_are_kept():
+    metrics = MemoryMetrics(max_samples=10)
+    for value in range(100):
+        metrics.record(sample(value))
+    assert metrics.values("e", "fields") == list(range(90, 100))
+    assert metrics.summary()["e"]["count"] == 100
+
+
+@pytest.mark.parametrize("values, expected", [([], {50: None}), ([3], {50: 3}), ([4, 1, 3, 2], {50: 2})])
+def test_nearest_rank(values, expected):
+    assert percentiles(values, (50,)) == expected
@@ -0,0 +1,34 @@
+import pytest
+
+from jsrope import Element, Flow, Script
+from jsrope.util import beautify, minify
+
+
+@pytest.mark.parametrize("code, expected", [
+    ("x = y // c\nz()", "x=y\nz()"),
+    ("x = y\t// c\n  // d\nz()", "x=y\nz()"),
+    ("a /* c */\n b", "a\nb"),
+    ("var  a = 1 ;\n\n if ( a ) { b ( ) }", "var a=1;if(a){b()}"),
+    ("a = 'x  // y' + \"/* z */\"", "a='x  // y'+\"/* z */\""),
+    ("a = b / c / d; e = /[/]x/g.test(f)", "a=b/c/d;e=/[/]x/g.test(f)"),
+    ("a + +b; c - -d; return x", "a+ +b;c- -d;return x"),
+])
+def test_minify(code, expected):
+    assert minify(code) == expected
+
+
+def test_minified_code_runs(node):
+    code = """
+    // comment at the beginning
+    var total = 0   // line comment after whitespace
+    var items = [1, 2, 3] /* block comment */
+    for (var i = 0; i < items.length; i++) { total += items[i] }
+    console.log(total)
+    """
+    assert node(minify(code)).strip() == "6"
+
+
+def test_prettified_script_is_minified(node):
+    script = Script(Element("#a").on("click", Flow("f()")), "console.log('ok')")
+    code = "var $ = function () { return {on: function () {}}; };" + minify(beautify(str(script)))
+    assert node(code).strip() == "ok"
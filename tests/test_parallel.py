@@ -0,0 +1,53 @@
+import functools
+
+import pytest
+
+from jsrope import Code, Element, Flow, Int, render_many
+from jsrope.parallel import RenderError
+
+
+def build(i):
+    return Flow(Element.by_id("e{}".format(i)).change_inner_html(Int(i)), Code("if (x) {{ y({}) }}".format(i)))
+
+
+def broken(i):
+    if i == 5:
+        raise KeyError("no locale")
+    return build(i)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_order_is_kept(workers):
+    trees = [build(i) for i in range(20)]
+    assert render_many(trees, workers=workers, chunksize=3) == [str(tree) for tree in trees]
+
+
+def test_builders():
+    builders = [functools.partial(build, i) for i in range(10)]
+    assert render_many(builders, workers=2) == [str(build(i)) for i in range(10)]
+
+
+@pytest.mark.parametrize("mode", ["prettify", "minify"])
+def test_modes(mode):
+    codes = render_many([build(i) for i in range(4)], mode=mode, workers=2)
+    assert codes[0] == (build(0).prettify() if mode == "prettify" else render_many([build(0)], mode, workers=1)[0])
+    assert "\n" in codes[0] if mode == "prettify" else "\n" not in codes[0]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_error_has_index(workers):
+    with pytest.raises(RenderError) as error:
+        render_many([functools.partial(broken, i) for i in range(10)], workers=workers, chunksize=2)
+    assert error.value.index == 5 and "KeyError" in str(error.value) and str(error.value).startswith("trees[5]")
+
+
+def test_unpicklable_tree_has_index():
+    trees = [build(0), build(1), lambda: build(2), build(3)]
+    with pytest.raises(RenderError) as error:
+        render_many(trees, workers=2, chunksize=2)
+    assert error.value.index == 2
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        render_many([build(0)], mode="gzip")
@@ -0,0 +1,102 @@
+import pickle
+
+from jsrope import Ajax, Array, Code, Element, EventSource, Flow, Function, Int, Switch, VirtualList
+from jsrope.jsrope import EventHandler
+
+
+def test_cached_code_is_reused():
+    flow = Flow("a()", "b()")
+    assert str(flow) is str(flow)
+
+
+def test_change_of_child_drops_parent_cache():
+    inner = Flow("a()")
+    outer = Flow(inner, "b()")
+    assert str(outer) == "a();b()"
+    inner.add("c()")
+    assert str(outer) == "a();c();b()"
+
+
+def test_unrelated_cache_is_kept():
+    inner = Flow("a()")
+    other = Flow("z()")
+    outer = Flow(inner, other)
+    str(outer)
+    other_code = str(other)
+    inner.add("c()")
+    assert str(other) is other_code
+
+
+def test_ajax_changes_reach_cached_parent():
+    ajax = Ajax("/a", {"data": {"x": Int("1")}})
+    flow = Flow(ajax)
+    assert '"/a"' in str(flow)
+    ajax.url = "/b"
+    ajax.settings["data"]["x"] = Int("y")
+    assert str(flow) == str(ajax)
+    assert '"/b"' in str(flow) and "'x': y" in str(flow)
+
+
+def test_nested_change_through_get_and_setdefault():
+    ajax = Ajax("/a", {"data": {}})
+    flow = Flow(ajax)
+    str(flow)
+    ajax.settings.get("data")["x"] = Int("1")
+    assert "'x': 1" in str(flow)
+    ajax.settings.setdefault("headers", {})
+    assert "headers" in str(flow)
+
+
+def test_element_changes_reach_cached_handler():
+    element = Element("#a")
+    handler = EventHandler(element, "click", Flow("f()"))
+    assert str(handler).startswith("$('#a')")
+    element.element = "$('#b')"
+    assert str(handler).startswith("$('#b')")
+
+
+def test_event_source_and_virtual_list_changes_reach_cached_parent():
+    source = EventSource("/s", {"a": Flow("f()")})
+    rows = VirtualList(Element("#l"), 20, "<b>{0}</b>", data=[[1]])
+    flow = Flow(source, rows)
+    str(flow)
+    source.events["b"] = Flow("g()")
+    rows.row_height = 30
+    assert '"b"' in str(flow) and "h:30" in str(flow)
+
+
+def test_containers_and_functions():
+    array = Array(1, 2)
+    switch = Switch({"a": "b()"})
+    function = Function("f", {}, Flow(array, switch))
+    str(function)
+    array.append(3)
+    switch["else"] = "c()"
+    assert "[1,2,3]" in str(function) and "else {c()}" in str(function)
+    function.flow.events.append("d()")
+    assert str(function).endswith("d()}")
+
+
+def test_tracking_survives_pickle():
+    flow = pickle.loads(pickle.dumps(Flow(Ajax("/a", {"data": {"x": Int("1")}}))))
+    str(flow)
+    flow.events[0].settings["data"]["x"] = Int("2")
+    assert "'x': 2" in str(flow)
+    assert type(pickle.loads(pickle.dumps(flow.events[0].settings))) is dict
+
+
+def test_given_dict_is_copied_when_rendered():
+    settings = {"data": {"x": Int("1")}}
+    ajax = Ajax("/a", settings)
+    assert ajax.settings is settings
+    flow = Flow(ajax)
+    str(flow)
+    assert ajax.settings == settings and ajax.settings is not settings
+    ajax.settings["data"]["y"] = Int("3")
+    assert "'y': 3" in str(flow)
+
+
+def test_nodes_being_built_are_not_tracked():
+    ajax = Ajax("/a", {"data": {}})
+    ajax.done = Code("function(){}")
+    assert "_render_watched" not in ajax.__dict__ and type(ajax.settings) is dict
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from jsrope import Element
+
+ROWS = ["a & b", {"content": "<c>", "data_id": 3, "hidden": True}, {"title": "\"t\""}, 4]
+
+
+def test_one_escaped_string():
+    code = str(Element.render_many("li", ROWS, class_="item"))
+    assert json.loads(code) == ('<li class="item">a &amp; b</li><li class="item" data-id="3" hidden>&lt;c&gt;</li>'
+                                '<li class="item" title="&quot;t&quot;"></li><li class="item">4</li>')
+
+
+def test_safe_in_script():
+    code = str(Element.render_many("p", ["</script><!--", " "]))
+    assert "</script>" not in code and "<!--" not in code and " " not in code
+
+
+@pytest.mark.parametrize("rows", [ROWS, ["x", "</script>", "y"], []])
+def test_compact_builds_the_same_html(node, rows):
+    full = json.loads(str(Element.render_many("li", rows, class_=["a", "b"])))
+    compact = Element.render_many("li", rows, compact=True, class_=["a", "b"])
+    assert json.loads(node("console.log(JSON.stringify({}))".format(compact))) == full
+
+
+def test_compact_is_smaller_with_long_attributes():
+    rows = ["row {}".format(i) for i in range(100)]
+    attributes = {"class_": "list-group-item list-group-item-action", "data_toggle": "list"}
+    assert len(str(Element.render_many("a", rows, compact=True, **attributes))) < \
+        len(str(Element.render_many("a", rows, **attributes))) / 2
+
+
+def test_inserted_with_one_write():
+    code = str(Element.by_id("items").change_inner_html(Element.render_many("li", ["a", "b"])))
+    assert code == "$('#items').html(\"<li>a<\\/li><li>b<\\/li>\")"
+
+
+@pytest.mark.parametrize("tag, attributes", [("li onclick=x", {}), ("li", {"on click": "x"})])
+def test_invalid_names(tag, attributes):
+    with pytest.raises(ValueError):
+        Element.render_many(tag, ["a"], **attributes)
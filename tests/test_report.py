@@ -0,0 +1,54 @@
+import pytest
+
+from jsrope import Ajax, Array, Code, Element, Flow, Function, Int, Object, Str, Switch, assert_size, size_report
+
+
+def page(forms=1):
+    show = Function("show", {"t": None}, Flow(Element.by_id("o").change_inner_html(Object("t"))))
+    events = [show]
+    for i in range(forms):
+        events.append(Element.by_id("b{}".format(i)).on("click", Flow(Ajax("/x", {"data": {"a": Int("a")}}),
+                                                                      show(Str("hi")))))
+        events.append(Switch({Code("x"): Flow(Code("a()")), "else": Flow(Array([1, 2, 3]))}))
+    return Flow(*events)
+
+
+def test_bytes_are_attributed_to_nodes():
+    report = size_report(page())
+    assert report.raw == len(str(page()).encode())
+    kinds = report.by_kind()
+    for kind in ("Element", "Ajax", "Function", "Switch", "Array", "EventHandler"):
+        assert kinds[kind] > 0
+    assert sum(kinds.values()) == report.raw
+    assert list(kinds.values()) == sorted(kinds.values(), reverse=True)
+
+
+def test_nodes_are_ranked_in_table():
+    table = size_report(page()).table(limit=3)
+    lines = table.splitlines()
+    assert lines[0].split() == ["kind", "own", "bytes", "share"]
+    assert lines[-1].startswith("total: {} bytes".format(len(str(page()).encode())))
+    ranked = lines[lines.index("") + 2:lines.index("") + 5]
+    own = [int(line.split()[1]) for line in ranked]
+    assert own == sorted(own, reverse=True)
+
+
+def test_runtimes_are_counted_once():
+    handlers = Flow(*[Element.by_id("b{}".format(i)).on("click", Flow(Code("f()")), bind="idle") for i in range(3)])
+    report = size_report(handlers)
+    assert sum(node.own for node in report.nodes) == report.raw == len(str(handlers).encode())
+
+
+def test_budget():
+    size = size_report(page()).raw
+    assert_size(page(), max_raw=size, max_gzip=size)
+    with pytest.raises(AssertionError, match="over the budget of {} bytes".format(size - 1)):
+        assert_size(page(), max_raw=size - 1)
+
+
+def test_doubled_page_fails_its_budget():
+    budget = size_report(page(10)).raw * 3 // 2
+    assert_size(page(10), max_raw=budget)
+    with pytest.raises(AssertionError) as error:
+        assert_size(page(20), max_raw=budget)
+    assert "EventHandler" in str(error.value)
@@ -0,0 +1,95 @@
+import json
+import re
+
+import pytest
+
+from jsrope import Code, Element, EventSource, Flow, Function, Int, Object, Return, Script, Util
+
+
+def functions():
+    square = Function("square", {"x": None}, Flow(Return(Object("x") * Object("x"))))
+    area = Function("area", {"r": None}, Flow(Return(square(Object("r")) * Code("3"))))
+    return square, area
+
+
+def names(code):
+    return re.findall(r"function (\w+)\(", str(code))
+
+
+def test_called_functions_are_defined_once_in_dependency_order():
+    square, area = functions()
+    script = Script(Element.by_id("a").on("click", Flow(area(Int(1)))),
+                    Element.by_id("b").on("click", Flow(area(Int(2)))),
+                    Element.by_id("c").on("click", Flow(square(Int(3)))))
+    assert names(script) == ["square", "area"]
+
+
+def test_given_function_is_defined_before_other_nodes():
+    square, area = functions()
+    code = str(Script(Code("log(1)"), area))
+    assert names(code) == ["square", "area"] and code.endswith(";log(1)")
+
+
+def test_same_code_under_one_name_is_allowed():
+    first, _ = functions()
+    second, _ = functions()
+    assert names(Script(first(Int(1)), second(Int(2)))) == ["square"]
+
+
+def test_different_functions_with_one_name():
+    first = Function("f", {}, Flow(Code("a()")))
+    second = Function("f", {}, Flow(Code("b()")))
+    with pytest.raises(ValueError, match="named f"):
+        Script(first(), second()).to_code()
+
+
+def test_function_in_node_is_defined_once(node):
+    square, _ = functions()
+    code = str(Script(Flow(square, Code("console.log({})".format(square(Int(2)))))))
+    assert names(code) == ["square"]
+    assert node(code).strip() == "4"
+
+
+def test_event_source_listener_is_defined():
+    square, _ = functions()
+    assert names(Script(EventSource("/s", {"tick": square}))) == ["square"]
+
+
+def test_script_runs(node):
+    _, area = functions()
+    out = node(str(Script(Code("console.log(JSON.stringify([{}, {}]))".format(area(Int(1)), area(Int(2)))), area)))
+    assert json.loads(out) == [3, 12]
+
+
+def test_runtimes_are_defined_once_at_the_beginning():
+    handlers = [Element.by_id(x).on("click", Flow(Code("f()")), bind="idle") for x in "abc"]
+    code = str(Script(*handlers))
+    assert code.startswith("window.__jsrope_bind=") and code.count("window.__jsrope_bind=") == 1
+
+
+def anonymous():
+    return Function("", {"x": None}, Flow(Return(Object("x") + Code("1"))))
+
+
+def test_repeated_anonymous_function_is_shared(node):
+    inc = anonymous()
+    code = str(Script(Util.alert(inc(Int(1))), Util.alert(inc(Int(2))), Util.alert(anonymous()(Int(3))),
+                      share_anonymous=True))
+    assert code.count("function") == 1 and code.count("_jsrope_fn_") == 4
+    assert node("var alert = console.log;" + code).split() == ["2", "3", "4"]
+
+
+def test_anonymous_function_used_once_is_kept():
+    code = str(Script(Util.alert(anonymous()(Int(1))), share_anonymous=True))
+    assert "_jsrope_fn" not in code
+
+
+def test_scripts_on_one_page_share_names(node):
+    inc = anonymous()
+    first = Script(Element.by_id("a").on("click", Flow(Util.alert(inc(Int(1))), Util.alert(inc(Int(2))))),
+                   share_anonymous=True)
+    times = Function("", {"x": None}, Flow(Return(Object("x") * Code("10"))))
+    second = Script(Util.alert(times(Int(1))), Util.alert(times(Int(2))), share_anonymous=True)
+    out = node("var alert = console.log, click;function $() { return {on: function (e, f) { click = f; }}; }" +
+               str(first) + ";" + str(second) + ";click();")
+    assert out.split() == ["10", "20", "2", "3"]
@@ -0,0 +1,71 @@
+import io
+import json
+
+import pytest
+
+from jsrope import (Ajax, Code, Element, Flow, Function, If, Int, Object, Str, Switch, dump, dumps, load, loads)
+from jsrope.serialization import format_version
+
+
+def parse_count(value):
+    return int(value)
+
+
+def build():
+    count = Int("count", handler=parse_count)
+    show = Function("show", {"text": None}, Flow(Element.by_id("out").change_inner_html(Object("text"))))
+    ajax = Ajax("/count", {"data": {"count": count, "name": Str("name", handler=str.strip)}},
+                done=Code("function(r){show(r)}"))
+    switch = Switch({Code("'a'"): Flow(show("a")), Code("'b'"): Flow(ajax)})
+    return Flow(show, If(count > Int(3), Flow(ajax)), Element.by_id("go").on("click", Flow(switch)))
+
+
+def test_loaded_tree_renders_the_same():
+    tree = build()
+    assert str(loads(dumps(tree))) == str(tree)
+
+
+def test_file_round_trip():
+    tree = build()
+    fp = io.BytesIO()
+    dump(tree, fp)
+    fp.seek(0)
+    assert str(load(fp)) == str(tree)
+
+
+def test_handlers_and_types_are_kept():
+    ajax = loads(dumps(build())).events[1].flow.events[0]
+    data = ajax.settings["data"]
+    assert type(data["count"]) is Int and data["count"].handler is parse_count
+    assert data["name"].handler is str.strip
+
+
+def test_shared_subtrees_stay_shared():
+    shared = Flow(Code("a()"))
+    tree = loads(dumps(Flow(If(Code("x"), shared), If(Code("y"), shared))))
+    assert tree.events[0].flow is tree.events[1].flow
+
+
+def test_lambda_handler_is_rejected():
+    with pytest.raises(Exception):
+        dumps(Int("x", handler=lambda x: int(x)))
+
+
+def test_loaded_tree_notices_changes():
+    tree = loads(dumps(build()))
+    before = str(tree)
+    tree.events[1].flow.events[0].settings["data"]["extra"] = Int("extra")
+    assert str(tree) != before and "extra" in str(tree)
+
+
+@pytest.mark.parametrize("data, message", [(b"JS", "too short"), (b"XXXX\x00\x01", "not jsrope"),
+                                           (b"JSRP\x00\x63", "unsupported format version 99")])
+def test_bad_data(data, message):
+    with pytest.raises(ValueError, match=message):
+        loads(data)
+
+
+def test_header():
+    data = dumps(Code("a()"))
+    assert data[:4] == b"JSRP" and int.from_bytes(data[4:6], "big") == format_version
+    assert json.dumps(str(loads(data))) == json.dumps("a()")
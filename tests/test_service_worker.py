@@ -0,0 +1,90 @@
+import json
+
+import flask
+import pytest
+
+from jsrope import Ajax
+from jsrope.chunks import ChunkRegistry
+from jsrope.flask import serve_service_worker
+from jsrope.service_worker import ServiceWorker
+
+
+def worker(**kwargs):
+    kwargs.setdefault("registry", ChunkRegistry())
+    return ServiceWorker(scripts=["/static/app.js", "https://cdn.example/lib.js"], **kwargs)
+
+
+def test_served_with_scope_and_revalidation():
+    sw = worker(scope="/app/")
+    app = flask.Flask(__name__)
+    serve_service_worker(app, sw)
+    client = app.test_client()
+    response = client.get("/jsrope-sw.js")
+    assert response.status_code == 200 and response.mimetype == "text/javascript"
+    assert response.headers["Service-Worker-Allowed"] == "/app/"
+    assert "no-cache" in response.headers["Cache-Control"]
+    assert response.headers["ETag"] == '"{}"'.format(sw.version())
+    assert response.get_data(as_text=True) == str(sw.code())
+    assert client.get("/jsrope-sw.js", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_version_changes_with_contents():
+    registry = ChunkRegistry()
+    sw = worker(registry=registry, versioned=["a()"])
+    version = sw.version()
+    assert worker(registry=ChunkRegistry(), versioned=["a()"]).version() == version
+    assert worker(registry=ChunkRegistry(), versioned=["b()"]).version() != version
+    assert worker(registry=ChunkRegistry(), versioned=["a()"], routes={"/x": "network-first"}).version() != version
+    assert worker(registry=ChunkRegistry("/other/"), versioned=["a()"]).version() != version
+    assert json.dumps(version) in str(sw.code())
+
+
+def test_version_doesnt_depend_on_rendered_chunks():
+    registry = ChunkRegistry()
+    sw = worker(registry=registry)
+    version, code = sw.version(), str(sw.code())
+    registry.add("function(){}")
+    assert sw.version() == version and str(sw.code()) == code
+
+
+def test_routes():
+    sw = worker(routes=[(Ajax("/items", {"method": "GET"}), "network-first"), ("/static/x.json", "cache-first")])
+    assert sw.routes == {"/items": "network-first", "/static/x.json": "cache-first"}
+    with pytest.raises(ValueError):
+        worker(routes={"/x": "cache-only"})
+    with pytest.raises(ValueError):
+        worker(routes=[(Ajax("/items", {"method": "POST"}), "network-first")])
+
+
+def test_requests_are_routed(node):
+    sw = worker(routes={"/items": "network-first", "/live": "network-only"})
+    out = node("""
+        var listeners = {}, answered = [];
+        var self = {location: {origin: "https://site.example"},
+                    addEventListener: function (n, f) { listeners[n] = f; }};
+        var caches = {match: function () { return Promise.resolve("cached"); },
+                      open: function () { return Promise.resolve({put: function () {}}); }};
+        function fetch() { return Promise.reject(new Error("offline")); }
+        """ + str(sw.code()) + """;
+        var urls = ["https://site.example/items?page=2", "https://site.example/live",
+                    "https://site.example/_jsrope/chunks/abc.js", "https://site.example/static/app.js",
+                    "https://cdn.example/lib.js", "https://site.example/other"];
+        Promise.all(urls.map(function (u) {
+            var got = null;
+            listeners.fetch({request: {method: "GET", url: u}, respondWith: function (p) { got = p; },
+                             waitUntil: function () {}});
+            return Promise.resolve(got).then(function (r) { return r && [u, r]; });
+        })).then(function (r) {
+            listeners.fetch({request: {method: "POST", url: urls[0]}, respondWith: function () { r.push("post"); }});
+            console.log(JSON.stringify(r));
+        });
+        """)
+    items, live, chunk, script, cdn, other = json.loads(out)
+    assert items == ["https://site.example/items?page=2", "cached"]
+    assert live is None and other is None
+    assert chunk[1] == script[1] == cdn[1] == "cached"
+
+
+def test_registration():
+    code = str(worker(scope="/app/").registration())
+    assert 'navigator.serviceWorker.register("/jsrope-sw.js",{scope:"/app/"})' in code
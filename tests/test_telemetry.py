@@ -0,0 +1,127 @@
+import json
+
+import flask
+import pytest
+
+from jsrope import Ajax, Element, Flow, Int, Script, telemetry
+from jsrope.flask import collect_telemetry
+from jsrope.util import substitute
+
+
+@pytest.fixture
+def enabled():
+    config = telemetry.enable(rate=1.0, batch_size=2)
+    yield config
+    telemetry.disable()
+
+
+def handlers(n):
+    return [Element("#a{}".format(i)).on("click", Flow(Ajax("/x", {"data": {"i": Int(str(i))}})))
+            for i in range(n)]
+
+
+def test_nothing_is_added_when_disabled():
+    code = str(Flow(*handlers(3)))
+    assert "__jsrope_perf" not in code
+
+
+def test_runtime_is_defined_once_per_page(enabled):
+    runtime = enabled.runtime()
+    for page in (Flow(*handlers(50)), Script(*handlers(50))):
+        code = str(page)
+        assert code.count(runtime) == 1
+        assert code.count("window.__jsrope_perf.s(") == 100
+
+
+def test_standalone_ajax_makes_runtime_in_place(enabled):
+    assert str(Ajax("/x", {})).count(enabled.runtime()) == 1
+
+
+def test_measured_handler_runs(node, enabled):
+    code = str(Element("#a").on("click", Flow("done()")))
+    out = node("""
+        var sent = [], marks = [];
+        var window = {performance: {now: function () { return 1; }, mark: function (m) { marks.push(m); },
+                                    measure: function () {}, clearMarks: function () {}},
+                      addEventListener: function () {}};
+        var document = {addEventListener: function () {}};
+        var navigator = {sendBeacon: function (u, b) { sent.push([u, JSON.parse(b)]); return true; }};
+        var handler;
+        function $(s) { return {on: function (n, f) { handler = f; }}; }
+        function done() {}
+        """ + code + """;
+        handler(); handler();
+        console.log(JSON.stringify([sent, marks.length]));
+        """)
+    sent, marks = json.loads(out)
+    assert marks == 2
+    assert sent == [["/_jsrope/telemetry", [{"n": "$('#a'):click", "d": 0, "ok": 1}] * 2]]
+
+
+def test_collector():
+    app = flask.Flask(__name__)
+    store = collect_telemetry(app, store=telemetry.TelemetryStore())
+    client = app.test_client()
+    assert client.post("/_jsrope/telemetry", json=[{"n": "a", "d": 3}, {"n": "a", "d": 5, "ok": 0}]).status_code == 204
+    assert client.post("/_jsrope/telemetry", json={"n": "a"}).status_code == 400
+    assert client.post("/_jsrope/telemetry", json=[{"n": "a", "d": "x"}]).status_code == 400
+    summary = store.summary()["a"]
+    assert summary["count"] == 2 and summary["failures"] == 1 and summary[50] == 3
+
+
+def test_enable_and_disable_drop_cached_code():
+    handler = Element("#a").on("click", Flow(Ajax("/x", {})))
+    page = Flow(handler)
+    assert "__jsrope_perf" not in str(page)
+    try:
+        telemetry.enable()
+        assert "__jsrope_perf" in str(page) and "__jsrope_perf" in str(handler)
+    finally:
+        telemetry.disable()
+    assert "__jsrope_perf" not in str(page) and "__jsrope_perf" not in str(handler)
+
+
+def test_flow_add_after_disable():
+    flow = Flow(Element("#a").on("click", Flow("f()")))
+    try:
+        telemetry.enable()
+        str(flow)
+    finally:
+        telemetry.disable()
+    flow.add("g()")
+    assert str(flow) == "$('#a').on('click',function(e){f()});g()"
+
+
+def test_measured_request_may_use_any_variable_name(node, jquery, enabled):
+    ajax = Ajax("/x", {"data": {"t": Int("t"), "r": Int("r")}})
+    out = node(jquery + """
+        var sent = [], t = 1, r = 2;
+        var navigator = {sendBeacon: function (u, b) { sent.push.apply(sent, JSON.parse(b)); return true; }};
+        """ + str(ajax) + ";" + str(ajax) + """;
+        requests[0].resolve(); requests[1].reject();
+        console.log(JSON.stringify([requests[0].options.data, sent.map(function (x) { return x.ok; })]));
+        """)
+    data, sent = json.loads(out)
+    assert data == {"t": 1, "r": 2}
+    assert sent == [1, 0]
+
+
+def test_measured_handler_in_expression_stays_expression(node, enabled):
+    code = str(substitute("h", Element("#a").on("click", Flow("f()")), "var"))
+    assert code.startswith("var h = $(")
+    out = node("""
+        var window = {performance: {now: function () { return 1; }}};
+        var document = {};
+        function $(s) { return {on: function () { return "bound"; }}; }
+        """ + code + ";console.log(JSON.stringify(h));")
+    assert json.loads(out) == "bound"
+
+
+def test_names_are_capped():
+    store = telemetry.TelemetryStore(max_names=3)
+    for i in range(10):
+        store.record("n{}".format(i), i)
+    store.record("n0", 1)
+    summary = store.summary()
+    assert sorted(summary) == ["(other)", "n0", "n1", "n2"]
+    assert summary["n0"]["count"] == 2 and summary["(other)"]["count"] == 7
@@ -0,0 +1,73 @@
+import json
+
+import flask
+import pytest
+
+from jsrope import Element, Flow, VirtualList
+from jsrope.flask import paged_response
+
+rows = [{"name": "row {}".format(i)} for i in range(250)]
+
+
+def app_of(source, max_limit=100):
+    app = flask.Flask(__name__)
+
+    @app.route("/rows")
+    def page():
+        return paged_response(source, max_limit=max_limit)
+
+    return app.test_client()
+
+
+def test_page():
+    body = app_of(rows).get("/rows?offset=240&limit=20").get_json()
+    assert body == {"total": 250, "offset": 240, "rows": rows[240:]}
+
+
+def test_limit_is_capped():
+    body = app_of(rows, max_limit=30).get("/rows?offset=10&limit=1000").get_json()
+    assert body["rows"] == rows[10:40]
+    assert len(app_of(rows, max_limit=30).get("/rows").get_json()["rows"]) == 30
+
+
+@pytest.mark.parametrize("query", ["offset=x", "limit=1.5", "offset=-1", "limit=-5"])
+def test_bad_page_is_400(query):
+    assert app_of(rows).get("/rows?" + query).status_code == 400
+
+
+def test_callable_rows():
+    asked = []
+
+    def source(offset, limit):
+        asked.append((offset, limit))
+        return iter(rows[offset:offset + limit]), 1000
+
+    body = app_of(source).get("/rows?offset=5&limit=2").get_json()
+    assert asked == [(5, 2)] and body == {"total": 1000, "offset": 5, "rows": rows[5:7]}
+
+
+def test_runtime_is_defined_once_per_page():
+    lists = [VirtualList(Element("#l{}".format(i)), 20, "<b>{name}</b>", url="/rows") for i in range(3)]
+    code = str(Flow(*lists))
+    assert code.count(VirtualList.runtime) == 1 and code.count("window.__jsrope_vlist(") == 3
+
+
+def test_pages_are_fetched_from_paged_response(node, jquery):
+    vlist = VirtualList(Element("#l"), 20, "<b>{name}</b>", url="/rows", page_size=50)
+    out = node(jquery + """
+        var options, stub = $;
+        $ = function () { return {}; };
+        $.ajax = stub.ajax;
+        $.param = stub.param;
+        window.__jsrope_vlist = function (c, o) { options = o; };
+        """ + str(vlist) + """;
+        options.f(100, 50, function () {}, function () {});
+        options.f(200, 50, function () {}, function () {});
+        console.log(JSON.stringify([requests.map(function (x) { return [x.options.url, x.options.data]; }),
+                                    options.t({name: "<i>"})]));
+        """)
+    asked, html = json.loads(out)
+    assert html == "<b>&#60;i&#62;</b>"
+    client = app_of(rows)
+    responses = [client.get(url, query_string=data).get_json() for url, data in asked]
+    assert [r["rows"] for r in responses] == [rows[100:150], rows[200:250]]
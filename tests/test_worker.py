@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from jsrope import Flow, Function, Int, Return
+
+# Blob, URL and Worker which run the worker source in this process
+workers = """
+var blobs = [], spawned = 0;
+function Blob(parts) { this.source = parts.join(""); }
+var URL = {createObjectURL: function (b) { blobs.push(b.source); return blobs.length - 1; }};
+function Worker(url) {
+    var page = this, self = {postMessage: function (d) { setTimeout(function () { page.onmessage({data: d}); }); }};
+    spawned++;
+    new Function("self", blobs[url])(self);
+    this.postMessage = function (d) { setTimeout(function () { self.onmessage({data: d}); }); };
+    this.terminate = function () {};
+}
+var window = global;
+"""
+
+
+def square(name=""):
+    return Function(name, {"x": None}, Flow(Return(Int("x") * Int("x"))), worker=True, pool_size=2)
+
+
+def test_worker_and_lazy_are_exclusive():
+    with pytest.raises(ValueError):
+        Function("f", {}, Flow("a()"), worker=True, lazy=True)
+
+
+def test_anonymous_pool_is_shared_by_calls(node):
+    f = square()
+    calls = [f(Int(str(i))) for i in range(5)]
+    out = node(workers + "Promise.all([" + ",".join(str(x) for x in calls) + "]).then(function (r) {"
+               "console.log(JSON.stringify([r, blobs.length, spawned])); });")
+    assert json.loads(out) == [[0, 1, 4, 9, 16], 1, 2]
+
+
+def test_anonymous_pool_is_defined_once_per_page():
+    f = square()
+    assert str(Flow(f, f)).count("createObjectURL") == 1
+
+
+def test_named_pool(node):
+    f = square("sq")
+    out = node(workers + str(f) + ";Promise.all([sq(3), sq(4), sq(5)]).then(function (r) {"
+               "console.log(JSON.stringify([r, blobs.length, spawned])); });")
+    assert json.loads(out) == [[9, 16, 25], 1, 2]
+
+
+def test_error_rejects(node):
+    f = Function("bad", {}, Flow("throw new Error('no')"), worker=True)
+    out = node(workers + str(f) + ";bad().catch(function (e) { console.log(e.message); });")
+    assert out.strip() == "Error: no"